@@ -1,5 +1,5 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_migrate, post_save, post_delete
 
 
 class AccountsConfig(AppConfig):
@@ -8,5 +8,9 @@ class AccountsConfig(AppConfig):
     
     def ready(self):
         # Import signal handlers
-        from .signals import create_admin_user
-        post_migrate.connect(create_admin_user, sender=self)
\ No newline at end of file
+        from .signals import create_admin_user, invalidate_cached_identity
+        post_migrate.connect(create_admin_user, sender=self)
+
+        FirebaseUser = self.get_model('FirebaseUser')
+        post_save.connect(invalidate_cached_identity, sender=FirebaseUser)
+        post_delete.connect(invalidate_cached_identity, sender=FirebaseUser)
\ No newline at end of file
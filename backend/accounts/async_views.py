@@ -0,0 +1,187 @@
+"""
+Native async versions of the accounts endpoints that block on Firebase.
+
+Used instead of their accounts.views counterparts when ASYNC_API_VIEWS is on
+(i.e. when serving backend.asgi under uvicorn). The firebase_admin SDK only
+offers blocking calls, so each one runs on a worker thread with
+thread_sensitive=False. The event loop stays free and slow Firebase calls no
+longer queue behind each other on Django's single sync thread.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+import firebase_admin
+from firebase_admin import auth as firebase_auth
+import json
+import logging
+
+from .middleware import lazy_auth
+from .token_cache import averify_id_token
+from .views import admin_required
+
+User = get_user_model()
+logger = logging.getLogger('accounts')
+
+ADMIN_EMAILS = ['admin@railmadad.in', 'adm.railmadad@gmail.com']
+
+
+def firebase_call(func, *args, **kwargs):
+    """Run a blocking firebase_admin call off the event loop."""
+    return sync_to_async(func, thread_sensitive=False)(*args, **kwargs)
+
+
+def request_data(request):
+    """Parsed request body for plain (non-DRF) views: JSON or form data."""
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+@admin_required
+async def create_staff(request):
+    """Create a new staff member (admin only)"""
+    try:
+        data = request_data(request)
+        email = data.get('email')
+        password = data.get('password')
+        full_name = data.get('full_name')
+        phone_number = data.get('phone_number')
+
+        if not email or not password:
+            return JsonResponse({'error': 'Email and password are required'}, status=400)
+
+        # Check if a user with this email already exists
+        if await User.objects.filter(email=email).aexists():
+            return JsonResponse({'error': 'User with this email already exists'}, status=400)
+
+        # Create the user in Firebase
+        try:
+            firebase_user = await firebase_call(
+                firebase_auth.create_user,
+                email=email,
+                password=password,
+                email_verified=True
+            )
+            firebase_uid = firebase_user.uid
+        except firebase_admin.exceptions.FirebaseError as e:
+            return JsonResponse({'error': f'Firebase error: {str(e)}'}, status=400)
+
+        # Create the Django user
+        user = await User.objects.acreate(
+            email=email,
+            firebase_uid=firebase_uid,
+            full_name=full_name,
+            phone_number=phone_number,
+            user_type='staff',
+            is_staff=True
+        )
+
+        return JsonResponse({
+            'message': 'Staff user created successfully',
+            'user': {
+                'id': user.id,
+                'email': user.email,
+                'full_name': user.full_name,
+                'user_type': user.user_type
+            }
+        }, status=201)
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@lazy_auth
+@csrf_exempt
+@require_POST
+async def verify_admin(request):
+    """
+    Verify if the authenticated user has admin privileges
+    """
+    try:
+        auth_header = request.headers.get('Authorization')
+
+        if not auth_header or not auth_header.startswith(('Bearer ', 'Token ')):
+            return JsonResponse({
+                'is_admin': False,
+                'error': 'Invalid authorization header'
+            }, status=401)
+
+        token = auth_header.split(' ')[1]
+
+        try:
+            decoded_token = await averify_id_token(token)
+            uid = decoded_token['uid']
+            email = decoded_token.get('email', '')
+
+            is_admin_email = email in ADMIN_EMAILS
+
+            # Check if user is an admin in Firebase custom claims
+            is_admin_in_firebase = bool(
+                decoded_token.get('admin', False)
+                or decoded_token.get('claims', {}).get('admin', False)
+            )
+
+            # For admin emails, consider them as admins
+            if is_admin_email:
+                is_admin_in_firebase = True
+
+                # Make sure to set this user as an admin in Firebase as well
+                try:
+                    await firebase_call(firebase_auth.set_custom_user_claims, uid, {'admin': True})
+                    logger.info(f"Set admin claim for user {email} with uid {uid}")
+                except Exception as e:
+                    logger.error(f"Failed to set admin claim: {str(e)}")
+
+            # Check if user exists in our database
+            try:
+                user = await User.objects.aget(email=email)
+                # Update admin status in our database if they're an admin
+                if is_admin_in_firebase and not user.is_admin:
+                    user.is_admin = True
+                    user.is_staff = True
+                    user.user_type = 'admin'
+                    await user.asave()
+                    logger.info(f"Updated user {email} to admin in database")
+
+                # Use the database value for final determination
+                is_admin = user.is_admin or user.user_type == 'admin' or is_admin_email
+
+            except User.DoesNotExist:
+                # Create new user if they're an admin
+                if is_admin_in_firebase or is_admin_email:
+                    await User.objects.acreate(
+                        firebase_uid=uid,
+                        email=email,
+                        user_type='admin',
+                        is_admin=True,
+                        is_staff=True
+                    )
+                    logger.info(f"Created new admin user {email} in database")
+                    is_admin = True
+                else:
+                    is_admin = False
+
+            return JsonResponse({
+                'is_admin': is_admin,
+                'user_id': uid,
+                'email': email
+            })
+
+        except Exception as e:
+            logger.error(f"Admin verification error: {str(e)}")
+            return JsonResponse({
+                'is_admin': False,
+                'error': str(e)
+            }, status=401)
+
+    except Exception as e:
+        logger.error(f"Unexpected error in verify_admin: {str(e)}")
+        return JsonResponse({
+            'is_admin': False,
+            'error': 'Server error'
+        }, status=500)
@@ -0,0 +1,88 @@
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+import threading
+import time
+
+# Compact per-user record: everything the middleware needs to populate a request
+Identity = namedtuple('Identity', ['id', 'user_type', 'is_admin', 'is_staff'])
+
+
+class IdentityCache:
+    """
+    Per-process ``firebase_uid -> Identity`` cache.
+
+    Entries are dropped by the FirebaseUser post_save/post_delete handlers in
+    ``accounts.signals``. Those only fire in the process that wrote the row,
+    so entries also expire after ``ttl`` seconds to bound how long another
+    worker can serve a stale role.
+    """
+
+    def __init__(self, max_entries=4096, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._uid_by_id = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, firebase_uid):
+        if not firebase_uid:
+            return None
+        with self._lock:
+            entry = self._entries.get(firebase_uid)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(firebase_uid)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(firebase_uid)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, firebase_uid, user):
+        """Cache the identity of a FirebaseUser instance under ``firebase_uid``."""
+        if not firebase_uid or self.max_entries <= 0:
+            return None
+        identity = Identity(user.id, user.user_type, user.is_admin, user.is_staff)
+        with self._lock:
+            self._remove_id(user.id)
+            self._entries[firebase_uid] = (time.monotonic() + self.ttl, identity)
+            self._uid_by_id[user.id] = firebase_uid
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+        return identity
+
+    def invalidate(self, user):
+        """Forget ``user`` under its current and any previously cached uid."""
+        with self._lock:
+            self._remove_id(user.pk)
+            if user.firebase_uid:
+                self._remove(user.firebase_uid)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._uid_by_id.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _remove(self, firebase_uid):
+        entry = self._entries.pop(firebase_uid, None)
+        if entry is not None and self._uid_by_id.get(entry[1].id) == firebase_uid:
+            del self._uid_by_id[entry[1].id]
+
+    def _remove_id(self, user_id):
+        firebase_uid = self._uid_by_id.pop(user_id, None)
+        if firebase_uid is not None:
+            self._entries.pop(firebase_uid, None)
+
+
+identity_cache = IdentityCache(
+    max_entries=getattr(settings, 'FIREBASE_IDENTITY_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'FIREBASE_IDENTITY_CACHE_TTL', 300),
+)
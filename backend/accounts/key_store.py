@@ -0,0 +1,165 @@
+from django.conf import settings
+from firebase_admin import auth, _token_gen
+import firebase_admin
+import requests
+import threading
+import json
+import re
+import time
+import logging
+
+logger = logging.getLogger('accounts')
+
+DEFAULT_MAX_AGE = 3600
+
+
+class _CertResponse:
+    """Minimal google.auth.transport.Response served from the local store."""
+
+    def __init__(self, data, status=200):
+        self.status = status
+        self.headers = {'content-type': 'application/json'}
+        self.data = data
+
+
+class FirebaseKeyStore:
+    """
+    Local copy of Google's public certificates for Firebase ID tokens.
+
+    firebase_admin normally fetches the certificates lazily from inside
+    ``verify_id_token``, which makes the first request of a cold worker (and
+    the first request after a key rotation) block on an HTTP call. This store
+    loads the certificates once at worker start and a daemon thread refreshes
+    them ``refresh_margin`` seconds before the Cache-Control max-age runs out,
+    so verification inside a request only ever reads memory.
+
+    The store is also a ``google.auth.transport.Request`` callable: the
+    firebase_admin token verifier is pointed at it, keeping all of the SDK's
+    claim checks (issuer, audience, subject, algorithm) in place.
+    """
+
+    def __init__(self, cert_url=_token_gen.ID_TOKEN_CERT_URI, refresh_margin=300,
+                 retry_interval=60, timeout=10):
+        self.cert_url = cert_url
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self._certs = {}
+        self._payload = None
+        self.expires_at = None
+        self.last_refresh = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._token_verifier = None
+
+    @property
+    def is_ready(self):
+        return self._payload is not None
+
+    @property
+    def key_ids(self):
+        return list(self._certs)
+
+    def load(self, certs, max_age=None):
+        """Replace the stored certificates; ``max_age`` None means never stale."""
+        if not certs:
+            raise ValueError('Refusing to load an empty certificate set')
+        payload = json.dumps(certs).encode('utf-8')
+        with self._lock:
+            self._certs = dict(certs)
+            self._payload = payload
+            self.last_refresh = time.time()
+            self.expires_at = self.last_refresh + max_age if max_age is not None else None
+        logger.info(f"Loaded {len(certs)} Firebase signing keys")
+
+    def load_file(self, path):
+        """Load certificates from a ``{"kid": "PEM certificate"}`` JSON file."""
+        with open(path) as fh:
+            self.load(json.load(fh))
+
+    def refresh(self):
+        """Fetch the current certificates from Google."""
+        response = requests.get(self.cert_url, timeout=self.timeout)
+        response.raise_for_status()
+        self.load(response.json(), self._max_age(response.headers.get('Cache-Control', '')))
+
+    @staticmethod
+    def _max_age(cache_control):
+        match = re.search(r'max-age=(\d+)', cache_control)
+        return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+    def seconds_until_refresh(self):
+        if self.expires_at is None:
+            return None
+        return max(0, self.expires_at - self.refresh_margin - time.time())
+
+    def start(self, path=None):
+        """
+        Load the certificates and start the refresh thread.
+
+        With ``path`` the certificates come from a local file and are never
+        refreshed (used by tests and air-gapped deployments).
+        """
+        if path:
+            self.load_file(path)
+            return
+
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Initial Firebase key fetch failed: {str(e)}")
+
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='firebase-key-store', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.seconds_until_refresh() if self.is_ready else 0
+            if wait is None or self._stop.wait(wait):
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Firebase key refresh failed: {str(e)}")
+                if self._stop.wait(self.retry_interval):
+                    return
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        if url != self.cert_url or self._payload is None:
+            return _CertResponse(b'{}', status=503)
+        return _CertResponse(self._payload)
+
+    def verify_id_token(self, token):
+        """
+        Verify a Firebase ID token against the stored keys.
+
+        Falls back to firebase_admin's own (network-bound) lookup until the
+        store has been loaded. Raises the same exceptions as
+        ``auth.verify_id_token``.
+        """
+        if not self.is_ready:
+            return auth.verify_id_token(token)
+
+        if self._token_verifier is None:
+            verifier = _token_gen.TokenVerifier(firebase_admin.get_app())
+            verifier.request = self
+            self._token_verifier = verifier
+        return self._token_verifier.verify_id_token(token)
+
+
+key_store = FirebaseKeyStore(
+    refresh_margin=getattr(settings, 'FIREBASE_KEY_REFRESH_MARGIN', 300),
+)
+
+
+def start_key_store():
+    """Load the signing keys at worker start (see backend/wsgi.py and asgi.py)."""
+    key_store.start(path=getattr(settings, 'FIREBASE_PUBLIC_KEYS_FILE', None))
@@ -1,121 +1,305 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from firebase_admin import auth, credentials
 from django.http import JsonResponse
 from django.conf import settings
 from django.apps import apps
 from django.contrib.auth import get_user_model
-from django.urls import resolve, Resolver404
+from django.utils.functional import SimpleLazyObject
+from functools import partial
+from .identity_cache import identity_cache
+from .token_cache import verify_id_token, averify_id_token
 import logging
 import firebase_admin
 import json
 
 logger = logging.getLogger('accounts')
 
-# Enhanced middleware.py to better handle Google auth and ensure user_id is stored
+# Authentication modes a view can declare (see firebase_auth below)
+AUTH_EAGER = 'eager'    # verify the token before the view runs
+AUTH_LAZY = 'lazy'      # on GET/HEAD/OPTIONS, verify only when the view reads an identity attribute
+AUTH_EXEMPT = 'exempt'  # never authenticate (identity attributes are not set)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+IDENTITY_ATTRIBUTES = (
+    'firebase_user', 'firebase_email', 'firebase_uid', 'user_type',
+    'is_authenticated', 'is_admin', 'is_staff', 'user', 'user_id',
+)
+
+
+def firebase_auth(mode):
+    """
+    Route-level metadata telling FirebaseAuthMiddleware how to treat a view.
+    Apply it above @api_view so it lands on the function the URLconf sees.
+    """
+    def decorator(view_func):
+        view_func.firebase_auth = mode
+        return view_func
+    return decorator
+
+
+lazy_auth = firebase_auth(AUTH_LAZY)
+auth_exempt = firebase_auth(AUTH_EXEMPT)
+
+
+class FirebaseIdentity:
+    """The Firebase identity carried by one request's bearer token."""
+
+    def __init__(self, auth_header):
+        self.token = None
+        if auth_header and auth_header.startswith('Bearer '):
+            self.token = auth_header.split(' ')[1]
+
+        self.resolved = False
+        self.error = None
+        self.overrides = {}
+        self._set_anonymous()
+
+    def _set_anonymous(self):
+        self.firebase_user = None
+        self.firebase_email = None
+        self.firebase_uid = None
+        self.user_type = 'passenger'  # Default type
+        self.is_authenticated = False
+        self.is_admin = False
+        self.is_staff = False
+        self.user = None
+        self.user_id = None
+
+    def resolve(self):
+        """Verify the token and look the user up; raises firebase_admin auth errors."""
+        if not self._begin():
+            return
+
+        # Verify the token with Firebase (repeat tokens are served from the cache)
+        self._set_claims(verify_id_token(self.token))
+
+        # Known users are resolved from the identity cache without touching the DB
+        identity = identity_cache.get(self.firebase_uid)
+        if identity is None:
+            identity = self._load_identity()
+        self._set_identity(identity)
+
+    async def aresolve(self):
+        """Async ``resolve``: only an identity-cache miss leaves the event loop."""
+        if not self._begin():
+            return
+
+        self._set_claims(await averify_id_token(self.token))
+
+        identity = identity_cache.get(self.firebase_uid)
+        if identity is None:
+            identity = await sync_to_async(self._load_identity)()
+        self._set_identity(identity)
+
+    def _begin(self):
+        if self.resolved:
+            return False
+        self.resolved = True
+        return bool(self.token)
+
+    def _set_claims(self, decoded_token):
+        # Store Firebase user info
+        self.firebase_user = decoded_token
+        self.firebase_email = decoded_token.get('email')
+        self.firebase_uid = decoded_token.get('uid')
+        self.is_authenticated = True
+
+    def _set_identity(self, identity):
+        if identity is None:
+            return
+
+        # Set user ID explicitly
+        self.user_id = identity.id
+
+        # Set user type and permissions based on DB values
+        self.user_type = identity.user_type
+        self.is_admin = identity.is_admin
+        self.is_staff = identity.is_staff
+
+        # Only load the full row if a view actually reads request.user
+        if self.user is None:
+            User = get_user_model()
+            self.user = SimpleLazyObject(partial(User.objects.get, pk=identity.id))
+
+    def resolve_quietly(self):
+        """Resolve for lazy mode, where a bad token just means an anonymous request."""
+        try:
+            self.resolve()
+        except Exception as e:
+            self._fail(e)
+
+    async def aresolve_quietly(self):
+        try:
+            await self.aresolve()
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        logger.error(f"Firebase auth error: {str(error)}")
+        self.error = error
+        self._set_anonymous()
+
+    def get(self, name):
+        if name in self.overrides:
+            return self.overrides[name]
+        self.resolve_quietly()
+        return getattr(self, name)
+
+    def apply(self, request):
+        for name in IDENTITY_ATTRIBUTES:
+            setattr(request, name, getattr(self, name))
+
+    def _load_identity(self):
+        """Look the user up in the database and cache their identity."""
+        User = get_user_model()
+        try:
+            user = User.objects.get(firebase_uid=self.firebase_uid)
+        except User.DoesNotExist:
+            # Try to find by email
+            try:
+                user = User.objects.get(email=self.firebase_email)
+                # Update firebase_uid
+                user.firebase_uid = self.firebase_uid
+                user.save()
+
+                logger.info(f"User authenticated: {user.email}, is_admin: {user.is_admin}, is_staff: {user.is_staff}")
+
+            except User.DoesNotExist:
+                # User doesn't exist in DB yet - this should not happen in normal flow
+                # Users should register through the proper signup process
+                logger.warning(f"User {self.firebase_email} authenticated with Firebase but not found in database")
+                return None
+
+        # Authenticate the request with this user
+        self.user = user
+        return identity_cache.set(self.firebase_uid, user)
+
+
+def _identity_property(name):
+    def fget(request):
+        return request._firebase_identity.get(name)
+
+    def fset(request, value):
+        # Writes (e.g. DRF replacing request.user) must not trigger verification
+        request._firebase_identity.overrides[name] = value
+
+    return property(fget, fset)
+
+
+LazyIdentityMixin = type('LazyIdentityMixin', (), {
+    '__doc__': 'Request mixin whose identity attributes verify the token on first read.',
+    **{name: _identity_property(name) for name in IDENTITY_ATTRIBUTES},
+})
+
+_lazy_request_classes = {}
+
+
+def _make_lazy(request, identity):
+    request_class = type(request)
+    lazy_class = _lazy_request_classes.get(request_class)
+    if lazy_class is None:
+        lazy_class = type(f'Lazy{request_class.__name__}', (LazyIdentityMixin, request_class), {})
+        _lazy_request_classes[request_class] = lazy_class
+    request._firebase_identity = identity
+    request.__class__ = lazy_class
+
+
+async def aresolve_identity(request):
+    """
+    Resolve a lazy request's identity without blocking the event loop.
+    Async views on @lazy_auth routes await this before reading identity attributes.
+    """
+    identity = getattr(request, '_firebase_identity', None)
+    if identity is not None:
+        await identity.aresolve_quietly()
+
 
 class FirebaseAuthMiddleware:
+    """
+    Authenticates requests carrying a Firebase ID token.
+
+    Each view declares how it wants to be treated with @lazy_auth or
+    @auth_exempt; undecorated views use settings.FIREBASE_AUTH_DEFAULT_MODE.
+    Eager views get their token verified before they run and a 401 on a bad
+    token. Lazy views get request attributes that verify the token the first
+    time one is read, so public endpoints that never look at the caller pay
+    nothing for auth; writes to them (anything but GET, HEAD and OPTIONS) are
+    still verified eagerly.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.default_mode = getattr(settings, 'FIREBASE_AUTH_DEFAULT_MODE', AUTH_EAGER)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django wraps a sync process_view in a thread under ASGI; hand it a coroutine instead
+            self.process_view = self.aprocess_view
 
     def __call__(self, request):
-        # Try to resolve the url and get the url name
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        identity = self._eager_identity(request, view_func)
+        if identity is None:
+            return None
+        try:
+            identity.resolve()
+        except Exception as e:
+            return self._auth_error_response(e)
+        identity.apply(request)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        identity = self._eager_identity(request, view_func)
+        if identity is None:
+            return None
         try:
-            current_url_match = resolve(request.path_info)
-            current_path = current_url_match.url_name
-        except Resolver404:
-            # If URL doesn't match any pattern, just continue
-            current_path = None
-        
-        # Skip middleware for certain paths (like authentication endpoints)
-        exempt_paths = ['login', 'signup', 'public-endpoints']
-        
-        if current_path in exempt_paths:
-            return self.get_response(request)
+            await identity.aresolve()
+        except Exception as e:
+            return self._auth_error_response(e)
+        identity.apply(request)
+        return None
+
+    def _eager_identity(self, request, view_func):
+        """The identity to resolve before the view runs, or None for lazy and exempt views."""
+        mode = getattr(view_func, 'firebase_auth', self.default_mode)
+        if mode == AUTH_EXEMPT:
+            return None
 
         # Extract the token from Authorization header
-        auth_header = request.META.get('HTTP_AUTHORIZATION')
-        
-        # Initialize user attributes
-        request.firebase_user = None
-        request.firebase_email = None
-        request.firebase_uid = None
-        request.user_type = 'passenger'  # Default type
-        request.is_authenticated = False
-        request.is_admin = False
-        request.is_staff = False
-        request.user = None
-        request.user_id = None
+        identity = FirebaseIdentity(request.META.get('HTTP_AUTHORIZATION'))
 
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            
-            try:
-                # Verify the token with Firebase
-                decoded_token = auth.verify_id_token(token)
-                
-                # Store Firebase user info in request
-                request.firebase_user = decoded_token
-                request.firebase_email = decoded_token.get('email')
-                request.firebase_uid = decoded_token.get('uid')
-                request.is_authenticated = True
-                
-                # Check if user exists in our database
-                User = get_user_model()
-                try:
-                    user = User.objects.get(firebase_uid=request.firebase_uid)
-                    
-                    # Set user ID explicitly
-                    request.user_id = user.id
-                    
-                    # Set user type and permissions based on DB values
-                    request.user_type = user.user_type
-                    request.is_admin = user.is_admin
-                    request.is_staff = user.is_staff
-                    
-                    # Authenticate the request with this user
-                    request.user = user
-                    
-                except User.DoesNotExist:
-                    # Try to find by email
-                    try:
-                        user = User.objects.get(email=request.firebase_email)
-                        # Update firebase_uid
-                        user.firebase_uid = request.firebase_uid
-                        user.save()
-                        
-                        request.user_id = user.id
-                        request.user_type = user.user_type
-                        request.is_admin = user.is_admin
-                        request.is_staff = user.is_staff
-                        request.user = user
-                        
-                        logger.info(f"User authenticated: {user.email}, is_admin: {user.is_admin}, is_staff: {user.is_staff}")
-                        
-                    except User.DoesNotExist:
-                        # User doesn't exist in DB yet - this should not happen in normal flow
-                        # Users should register through the proper signup process
-                        logger.warning(f"User {request.firebase_email} authenticated with Firebase but not found in database")
-                        request.user_type = 'passenger'
-                        request.is_admin = False
-                        request.is_staff = False
-                
-            except auth.ExpiredIdTokenError:
-                logger.error("Firebase token expired")
-                return JsonResponse({
-                    'error': 'Token expired. Please refresh and try again.',
-                    'code': 'TOKEN_EXPIRED'
-                }, status=401)
-            except auth.InvalidIdTokenError:
-                logger.error("Invalid Firebase token")
-                return JsonResponse({
-                    'error': 'Invalid authentication token',
-                    'code': 'INVALID_TOKEN'
-                }, status=401)
-            except Exception as e:
-                logger.error(f"Firebase auth error: {str(e)}")
-                return JsonResponse({
-                    'error': f'Authentication error: {str(e)}',
-                    'code': 'AUTH_ERROR'
-                }, status=401)
-        
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        # Writes stay eager even on lazy views, so a bad token is a 401 rather than an anonymous write
+        if mode == AUTH_LAZY and request.method in SAFE_METHODS:
+            _make_lazy(request, identity)
+            return None
+        return identity
+
+    def _auth_error_response(self, error):
+        if isinstance(error, auth.ExpiredIdTokenError):
+            logger.error("Firebase token expired")
+            return JsonResponse({
+                'error': 'Token expired. Please refresh and try again.',
+                'code': 'TOKEN_EXPIRED'
+            }, status=401)
+        if isinstance(error, auth.InvalidIdTokenError):
+            logger.error("Invalid Firebase token")
+            return JsonResponse({
+                'error': 'Invalid authentication token',
+                'code': 'INVALID_TOKEN'
+            }, status=401)
+        logger.error(f"Firebase auth error: {str(error)}")
+        return JsonResponse({
+            'error': f'Authentication error: {str(error)}',
+            'code': 'AUTH_ERROR'
+        }, status=401)
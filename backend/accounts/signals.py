@@ -67,4 +67,12 @@ def create_admin_user(sender, **kwargs):
             logger.info(f"Admin user already exists: {admin_email}")
             
     except Exception as e:
-        logger.error(f"Error creating admin user: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error creating admin user: {str(e)}")
+
+def invalidate_cached_identity(sender, instance, **kwargs):
+    """
+    Drop the cached identity of a FirebaseUser whenever its row is saved or
+    deleted, so role changes are picked up on the next request.
+    """
+    from .identity_cache import identity_cache
+    identity_cache.invalidate(instance)
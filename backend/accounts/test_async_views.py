@@ -0,0 +1,118 @@
+"""
+Tests for the async middleware path and the async accounts/complaints views.
+"""
+
+from django.test import TestCase
+from django.test.client import AsyncRequestFactory
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from asgiref.sync import iscoroutinefunction
+from types import SimpleNamespace
+from unittest.mock import patch, AsyncMock
+import json
+
+from accounts import async_views
+from accounts.identity_cache import identity_cache
+from accounts.middleware import FirebaseAuthMiddleware
+from complaints import async_views as complaint_async_views
+from complaints.models import Complaint
+
+User = get_user_model()
+
+
+async def async_view(request):
+    return HttpResponse()
+
+
+class AsyncMiddlewareTest(TestCase):
+    """Test that the middleware runs natively in both modes."""
+
+    def setUp(self):
+        identity_cache.clear()
+        self.addCleanup(identity_cache.clear)
+        self.admin = User.objects.create_user(
+            email='admin@example.com',
+            firebase_uid='admin_uid',
+            user_type='admin',
+            is_admin=True
+        )
+
+    def test_sync_mode_stays_sync(self):
+        middleware = FirebaseAuthMiddleware(lambda request: HttpResponse())
+        self.assertFalse(iscoroutinefunction(middleware))
+        self.assertFalse(iscoroutinefunction(middleware.process_view))
+
+    async def test_async_mode_authenticates_on_the_event_loop(self):
+        middleware = FirebaseAuthMiddleware(async_view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertTrue(iscoroutinefunction(middleware.process_view))
+
+        request = AsyncRequestFactory().get('/', headers={'Authorization': 'Bearer token'})
+        claims = {'uid': 'admin_uid', 'email': 'admin@example.com'}
+        with patch('accounts.middleware.averify_id_token', AsyncMock(return_value=claims)):
+            response = await middleware.process_view(request, async_view, (), {})
+        self.assertIsNone(response)
+        self.assertTrue(request.is_admin)
+        self.assertEqual(request.user_id, self.admin.id)
+
+
+class AsyncViewsTest(TestCase):
+    """Test the async endpoints against the behaviour of their sync versions."""
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+
+    def post(self, path, data, **extra):
+        return self.factory.post(path, json.dumps(data), content_type='application/json', **extra)
+
+    async def test_verify_admin_promotes_admin_email(self):
+        await User.objects.acreate(email='adm.railmadad@gmail.com', firebase_uid='root_uid')
+        claims = {'uid': 'root_uid', 'email': 'adm.railmadad@gmail.com'}
+        with patch('accounts.async_views.averify_id_token', AsyncMock(return_value=claims)), \
+                patch('accounts.async_views.firebase_auth.set_custom_user_claims') as set_claims:
+            response = await async_views.verify_admin(
+                self.post('/api/accounts/admin/verify/', {}, headers={'Authorization': 'Bearer token'})
+            )
+        self.assertEqual(json.loads(response.content)['is_admin'], True)
+        set_claims.assert_called_once_with('root_uid', {'admin': True})
+        user = await User.objects.aget(firebase_uid='root_uid')
+        self.assertEqual(user.user_type, 'admin')
+
+    async def test_create_staff_requires_admin(self):
+        request = self.post('/api/accounts/staff/create/', {'email': 'a@b.c', 'password': 'x'})
+        request.is_authenticated = True
+        request.is_admin = False
+        response = await async_views.create_staff(request)
+        self.assertEqual(response.status_code, 403)
+
+    async def test_create_staff_creates_firebase_and_django_user(self):
+        request = self.post('/api/accounts/staff/create/', {
+            'email': 'staff@example.com', 'password': 'secret123', 'full_name': 'Staff'
+        })
+        request.is_authenticated = True
+        request.is_admin = True
+        with patch('accounts.async_views.firebase_auth.create_user',
+                   return_value=SimpleNamespace(uid='new_uid')):
+            response = await async_views.create_staff(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await User.objects.filter(firebase_uid='new_uid', is_staff=True).aexists())
+
+    async def test_file_complaint(self):
+        request = self.post('/api/complaints/file/', {
+            'type': 'Coach - Cleanliness',
+            'description': 'Dirty coach',
+            'train_number': '12345',
+            'pnr_number': '1234567890',
+            'location': 'Delhi',
+            'date_of_incident': '2025-01-01',
+        })
+        response = await complaint_async_views.file_complaint(request)
+        self.assertEqual(response.status_code, 201)
+        complaint = await Complaint.objects.aget(id=json.loads(response.content)['complaint_id'])
+        self.assertEqual(complaint.priority, 'Medium')
+
+    async def test_file_complaint_reports_missing_fields(self):
+        response = await complaint_async_views.file_complaint(
+            self.post('/api/complaints/file/', {'type': 'Security'})
+        )
+        self.assertEqual(response.status_code, 400)
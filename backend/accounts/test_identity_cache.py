@@ -0,0 +1,67 @@
+"""
+Tests for the firebase_uid -> identity cache used by FirebaseAuthMiddleware.
+"""
+
+from django.test import TestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from unittest.mock import patch
+
+from accounts.identity_cache import identity_cache
+from accounts.middleware import FirebaseAuthMiddleware
+
+User = get_user_model()
+
+
+class IdentityCacheTest(TestCase):
+    """Test that authenticated requests resolve identity without queries."""
+
+    def setUp(self):
+        identity_cache.clear()
+        self.addCleanup(identity_cache.clear)
+        self.user = User.objects.create_user(
+            email='staff@example.com',
+            firebase_uid='staff_uid',
+            user_type='staff',
+            is_staff=True
+        )
+        self.factory = RequestFactory()
+        self.middleware = FirebaseAuthMiddleware(lambda request: HttpResponse())
+        patcher = patch(
+            'accounts.middleware.verify_id_token',
+            return_value={'uid': 'staff_uid', 'email': 'staff@example.com'}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self):
+        request = self.factory.get('/api/complaints/', HTTP_AUTHORIZATION='Bearer token')
+        self.middleware.process_view(request, lambda request: HttpResponse(), (), {})
+        return request
+
+    def test_cached_identity_needs_no_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            request = self.authenticate()
+        self.assertEqual(request.user_id, self.user.id)
+        self.assertTrue(request.is_staff)
+        self.assertFalse(request.is_admin)
+
+    def test_user_row_is_loaded_lazily(self):
+        self.authenticate()
+        request = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual(request.user.email, 'staff@example.com')
+
+    def test_save_invalidates_identity(self):
+        self.authenticate()
+        self.user.is_admin = True
+        self.user.save()
+        self.assertIsNone(identity_cache.get('staff_uid'))
+        self.assertTrue(self.authenticate().is_admin)
+
+    def test_delete_invalidates_identity(self):
+        self.authenticate()
+        self.user.delete()
+        self.assertIsNone(identity_cache.get('staff_uid'))
+        self.assertIsNone(self.authenticate().user_id)
@@ -0,0 +1,110 @@
+"""
+Tests for the local Firebase signing-key store.
+"""
+
+from django.test import SimpleTestCase
+from unittest.mock import patch
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import tempfile
+import time
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from firebase_admin import auth
+from google.auth import crypt, jwt
+
+from accounts.key_store import FirebaseKeyStore
+
+PROJECT_ID = 'test-project'
+KEY_ID = 'test-kid'
+
+
+def make_signing_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'test')])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class FirebaseKeyStoreTest(SimpleTestCase):
+    """Test offline token verification against locally stored keys."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.private_pem, cls.cert_pem = make_signing_key()
+
+    def setUp(self):
+        fd, self.keys_file = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump({KEY_ID: self.cert_pem}, fh)
+        self.store = FirebaseKeyStore()
+        self.store.start(path=self.keys_file)
+        app = SimpleNamespace(options={}, project_id=PROJECT_ID)
+        patcher = patch('accounts.key_store.firebase_admin.get_app', return_value=app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.remove(self.keys_file)
+
+    def make_token(self, **overrides):
+        now = int(time.time())
+        payload = {
+            'iss': f'https://securetoken.google.com/{PROJECT_ID}',
+            'aud': PROJECT_ID,
+            'sub': 'firebase-uid',
+            'email': 'user@example.com',
+            'iat': now,
+            'auth_time': now,
+            'exp': now + 3600,
+        }
+        payload.update(overrides)
+        signer = crypt.RSASigner.from_string(self.private_pem, key_id=KEY_ID)
+        return jwt.encode(signer, payload).decode()
+
+    def test_loads_keys_from_file(self):
+        self.assertTrue(self.store.is_ready)
+        self.assertEqual(self.store.key_ids, [KEY_ID])
+        self.assertIsNone(self.store.seconds_until_refresh())
+
+    def test_verifies_token_without_network(self):
+        with patch('accounts.key_store.requests.get') as get:
+            claims = self.store.verify_id_token(self.make_token())
+        get.assert_not_called()
+        self.assertEqual(claims['uid'], 'firebase-uid')
+
+    def test_rejects_wrong_audience(self):
+        with self.assertRaises(auth.InvalidIdTokenError):
+            self.store.verify_id_token(self.make_token(aud='other-project'))
+
+    def test_refresh_honours_cache_control(self):
+        response = SimpleNamespace(
+            headers={'Cache-Control': 'public, max-age=21600, must-revalidate'},
+            json=lambda: {KEY_ID: self.cert_pem},
+            raise_for_status=lambda: None,
+        )
+        with patch('accounts.key_store.requests.get', return_value=response):
+            self.store.refresh()
+        remaining = self.store.seconds_until_refresh()
+        self.assertAlmostEqual(remaining, 21600 - self.store.refresh_margin, delta=5)
@@ -0,0 +1,106 @@
+"""
+Tests for FirebaseAuthMiddleware's eager, lazy and exempt modes.
+"""
+
+from django.test import TestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from firebase_admin import auth
+from unittest.mock import patch
+
+from accounts.identity_cache import identity_cache
+from accounts.middleware import FirebaseAuthMiddleware, lazy_auth, auth_exempt
+from complaints.models import Staff
+
+User = get_user_model()
+
+
+def view(request):
+    return HttpResponse()
+
+
+class FirebaseAuthMiddlewareTest(TestCase):
+    """Test when the bearer token gets verified."""
+
+    def setUp(self):
+        identity_cache.clear()
+        self.addCleanup(identity_cache.clear)
+        self.user = User.objects.create_user(
+            email='admin@example.com',
+            firebase_uid='admin_uid',
+            user_type='admin',
+            is_admin=True
+        )
+        self.factory = RequestFactory()
+        self.middleware = FirebaseAuthMiddleware(view)
+        patcher = patch(
+            'accounts.middleware.verify_id_token',
+            return_value={'uid': 'admin_uid', 'email': 'admin@example.com'}
+        )
+        self.verify = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def process(self, view_func):
+        request = self.factory.get('/api/complaints/', HTTP_AUTHORIZATION='Bearer token')
+        response = self.middleware.process_view(request, view_func, (), {})
+        return request, response
+
+    def test_eager_view_verifies_before_running(self):
+        request, response = self.process(view)
+        self.assertIsNone(response)
+        self.verify.assert_called_once_with('token')
+        self.assertTrue(request.is_admin)
+
+    def test_eager_view_rejects_expired_token(self):
+        self.verify.side_effect = auth.ExpiredIdTokenError('expired', None)
+        _, response = self.process(view)
+        self.assertEqual(response.status_code, 401)
+
+    def test_lazy_view_verifies_on_first_read(self):
+        request, response = self.process(lazy_auth(view))
+        self.assertIsNone(response)
+        self.verify.assert_not_called()
+
+        self.assertTrue(request.is_authenticated)
+        self.assertTrue(request.is_admin)
+        self.assertEqual(request.user_id, self.user.id)
+        self.verify.assert_called_once_with('token')
+
+    def test_lazy_view_writes_do_not_verify(self):
+        request, _ = self.process(lazy_auth(view))
+        request.user = None
+        self.assertIsNone(request.user)
+        self.verify.assert_not_called()
+
+    def test_lazy_view_treats_bad_token_as_anonymous(self):
+        self.verify.side_effect = auth.InvalidIdTokenError('bad token')
+        request, _ = self.process(lazy_auth(view))
+        self.assertFalse(request.is_authenticated)
+        self.assertIsNone(request.user_id)
+
+    def test_lazy_view_verifies_write_methods_eagerly(self):
+        self.verify.side_effect = auth.ExpiredIdTokenError('expired', None)
+        request = self.factory.post('/api/complaints/staff/', HTTP_AUTHORIZATION='Bearer token')
+        response = self.middleware.process_view(request, lazy_auth(view), (), {})
+        self.assertEqual(response.status_code, 401)
+
+    def test_bad_token_cannot_delete_staff(self):
+        staff = Staff.objects.create(name='asha', email='asha@rail.in', phone='1', role='Agent', department='Ops')
+        self.verify.side_effect = auth.InvalidIdTokenError('bad token')
+        response = self.client.delete(
+            f'/api/complaints/staff/{staff.pk}/', HTTP_AUTHORIZATION='Bearer token', secure=True
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(Staff.objects.filter(pk=staff.pk).exists())
+
+    def test_exempt_view_is_left_alone(self):
+        request, _ = self.process(auth_exempt(view))
+        self.verify.assert_not_called()
+        self.assertFalse(hasattr(request, 'firebase_uid'))
+
+    def test_public_endpoint_pays_nothing_for_auth(self):
+        response = self.client.get(
+            '/api/complaints/staff/', HTTP_AUTHORIZATION='Bearer token', secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.verify.assert_not_called()
@@ -0,0 +1,62 @@
+"""
+Tests for the Firebase ID token cache.
+"""
+
+from django.test import SimpleTestCase
+from unittest.mock import patch
+import time
+
+from accounts.key_store import key_store
+from accounts.token_cache import TokenCache, token_cache, verify_id_token
+
+
+class TokenCacheTest(SimpleTestCase):
+    """Test caching, expiry and eviction of decoded tokens."""
+
+    def claims(self, ttl=3600, uid='uid'):
+        return {'uid': uid, 'email': f'{uid}@example.com', 'exp': int(time.time()) + ttl}
+
+    def test_hit_and_miss_counters(self):
+        cache = TokenCache(max_entries=4)
+        self.assertIsNone(cache.get('token'))
+        cache.set('token', self.claims())
+        self.assertEqual(cache.get('token')['uid'], 'uid')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_entry_expires_with_token(self):
+        cache = TokenCache()
+        cache.set('token', self.claims(ttl=-1))
+        self.assertIsNone(cache.get('token'))
+
+        cache.set('other', self.claims(ttl=60))
+        with patch('accounts.token_cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(cache.get('other'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_entries=2, policy='lru')
+        cache.set('a', self.claims(uid='a'))
+        cache.set('b', self.claims(uid='b'))
+        cache.get('a')
+        cache.set('c', self.claims(uid='c'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_fifo_eviction(self):
+        cache = TokenCache(max_entries=2, policy='fifo')
+        cache.set('a', self.claims(uid='a'))
+        cache.set('b', self.claims(uid='b'))
+        cache.get('a')
+        cache.set('c', self.claims(uid='c'))
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+
+    def test_verify_id_token_skips_repeat_verification(self):
+        token_cache.clear()
+        with patch.object(key_store, 'verify_id_token', return_value=self.claims()) as verify:
+            verify_id_token('bearer-token')
+            verify_id_token('bearer-token')
+        verify.assert_called_once_with('bearer-token')
+        token_cache.clear()
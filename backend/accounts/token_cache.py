@@ -0,0 +1,134 @@
+from asgiref.sync import sync_to_async
+from collections import OrderedDict
+from django.conf import settings
+from .key_store import key_store
+import hashlib
+import threading
+import time
+import logging
+
+logger = logging.getLogger('accounts')
+
+
+class TokenCache:
+    """
+    Bounded, thread-safe cache of decoded Firebase ID tokens.
+
+    Entries are keyed by the SHA-256 digest of the raw token (the token itself
+    is never stored) and expire at the token's own ``exp`` claim, so a cached
+    token is never accepted for longer than Firebase would accept it.
+    When the cache is full the eviction policy decides which entry goes:
+    ``'lru'`` drops the least recently used token, ``'fifo'`` the oldest one.
+    """
+
+    POLICIES = ('lru', 'fifo')
+
+    def __init__(self, max_entries=1024, policy='lru'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.policy = policy
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token):
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        return hashlib.sha256(token).hexdigest()
+
+    def get(self, token):
+        """Return the cached claims for ``token`` or None on a miss."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if self.policy == 'lru':
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def set(self, token, claims):
+        """Cache decoded ``claims`` until the token's ``exp`` claim."""
+        expires_at = claims.get('exp')
+        if not expires_at or expires_at <= time.time() or self.max_entries <= 0:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'policy': self.policy,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+token_cache = TokenCache(
+    max_entries=getattr(settings, 'FIREBASE_TOKEN_CACHE_SIZE', 1024),
+    policy=getattr(settings, 'FIREBASE_TOKEN_CACHE_POLICY', 'lru'),
+)
+
+
+def verify_id_token(token):
+    """
+    Verify a Firebase ID token, skipping verification for tokens seen before.
+
+    Misses are verified against the local signing-key store. Raises the same
+    firebase_admin exceptions as ``auth.verify_id_token``.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = _verify_and_cache(token)
+    return claims
+
+
+async def averify_id_token(token):
+    """
+    Async ``verify_id_token``. Verification against a loaded key store is pure
+    CPU work and runs inline; only the network-bound fallback used before the
+    store is loaded is pushed to a worker thread.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        if key_store.is_ready:
+            claims = _verify_and_cache(token)
+        else:
+            claims = await sync_to_async(_verify_and_cache, thread_sensitive=False)(token)
+    return claims
+
+
+def _verify_and_cache(token):
+    claims = key_store.verify_id_token(token)
+    token_cache.set(token, claims)
+    return claims
@@ -1,6 +1,13 @@
 from django.urls import path
 from . import views
-from .views import verify_admin, get_admin_profile
+from django.conf import settings
+from . import async_views
+from .views import verify_admin, get_admin_profile, create_staff
+
+# Under ASGI (ASYNC_API_VIEWS) the endpoints that block on Firebase run as native async views
+if settings.ASYNC_API_VIEWS:
+    verify_admin = async_views.verify_admin
+    create_staff = async_views.create_staff
 
 urlpatterns = [
     path('profile/', views.user_profile, name='user_profile'),
@@ -8,7 +15,7 @@ urlpatterns = [
     path('profile/update/', views.update_profile, name='update_profile'),
     path('profile/delete/', views.delete_user_account, name='delete_user_account'),
     path('register/', views.register_user, name='register_user'),
-    path('staff/create/', views.create_staff, name='create_staff'),
+    path('staff/create/', create_staff, name='create_staff'),
     path('users/', views.list_users, name='list_users'),
     path('admin/verify/', verify_admin, name='verify-admin'),
     path('admin/profile/', get_admin_profile, name='admin-profile'),
@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from django.http import JsonResponse
 from django.contrib.auth import get_user_model
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
 import firebase_admin
 from firebase_admin import auth
 import uuid
@@ -63,41 +64,45 @@ def get_or_create_user(request):
         logger.error(f"Unexpected error in get_or_create_user: {str(e)}")
         return None, False
 
-# Decorator to require admin access
-def admin_required(view_func):
+def _guard_view(view_func, check):
+    """Wrap a sync or async view so ``check(request)`` can reject it with a response."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped_view(request, *args, **kwargs):
+            return check(request) or await view_func(request, *args, **kwargs)
+        return _async_wrapped_view
+
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
+        return check(request) or view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+# Decorator to require admin access
+def admin_required(view_func):
+    def check(request):
         if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         if not request.is_admin:
             return JsonResponse({'error': 'Admin access required'}, status=403)
-            
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+    return _guard_view(view_func, check)
 
 # Decorator to require staff or admin access
 def staff_required(view_func):
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
+    def check(request):
         if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
         if not (request.is_staff or request.is_admin):
             return JsonResponse({'error': 'Staff access required'}, status=403)
-            
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+    return _guard_view(view_func, check)
 
 # Decorator to require authentication
 def login_required(view_func):
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
+    def check(request):
         if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
             return JsonResponse({'error': 'Authentication required'}, status=401)
-        
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+    return _guard_view(view_func, check)
 
 @api_view(['GET'])
 @login_required
@@ -326,11 +331,14 @@ from django.shortcuts import get_object_or_404
 from rest_framework import status
 import firebase_admin
 from firebase_admin import auth as firebase_auth
+from .token_cache import verify_id_token
+from .middleware import lazy_auth, auth_exempt
 import logging
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+@lazy_auth
 @api_view(['POST'])
 def verify_admin(request):
     """
@@ -350,7 +358,7 @@ def verify_admin(request):
         
         try:
             # Verify the ID token
-            decoded_token = firebase_auth.verify_id_token(token)
+            decoded_token = verify_id_token(token)
             uid = decoded_token['uid']
             email = decoded_token.get('email', '')
             
@@ -452,6 +460,7 @@ def get_admin_profile(request):
         'address': getattr(user, 'address', '')
     })
 
+@auth_exempt
 @api_view(['POST'])
 def register_user(request):
     """Register a new user with user type selection"""
@@ -0,0 +1,67 @@
+"""
+Faster JSON rendering for the DRF API views.
+
+ORJSONRenderer produces the same bytes as DRF's JSONRenderer but encodes with
+orjson when it is installed. Select the renderer with the API_JSON_RENDERER
+setting; without orjson it simply behaves as JSONRenderer.
+"""
+
+import math
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _has_non_finite_float(data):
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson.
+
+    Dates, times, decimals, lazy strings and the other types orjson does not
+    handle the way DRF does are passed to DRF's encoder, and the same
+    \\u2028/\\u2029 escaping is applied, so the output matches JSONRenderer's.
+    Indented, ASCII-only or non-strict output, and data orjson cannot encode
+    (such as integers wider than 64 bits), is left to JSONRenderer. So is
+    data holding NaN or an infinity, which orjson writes as null: JSONRenderer
+    rejects it with a ValueError. Floats otherwise differ only in exponent
+    notation (``1e16`` rather than ``1e+16``).
+    """
+
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Only look for the floats orjson turned into null when there is a null at all
+        if b'null' in ret and _has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -41,7 +41,13 @@ AUTH_USER_MODEL = 'accounts.FirebaseUser'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
-    ]
+    ],
+    # API_JSON_RENDERER=rest_framework.renderers.JSONRenderer switches back to stdlib json;
+    # the orjson renderer falls back to it by itself when orjson is not installed
+    'DEFAULT_RENDERER_CLASSES': [
+        os.getenv('API_JSON_RENDERER', 'backend.renderers.ORJSONRenderer'),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # Middleware Configuration
@@ -49,6 +55,7 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add this line
     'django.middleware.security.SecurityMiddleware',
+    'backend.middleware.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -108,6 +115,23 @@ else:
         }
     }
 
+# Cache Configuration
+# Set REDIS_URL so every worker shares cached responses and the complaints
+# version key; without it each process keeps its own in-memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password Validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -177,6 +201,9 @@ CORS_ALLOW_HEADERS = [
     'x-admin-access',
 ]
 
+# Paginated complaint lists return their cursors in the Link header
+CORS_EXPOSE_HEADERS = ['Link']
+
 CORS_ALLOW_CREDENTIALS = True
 
 CSRF_TRUSTED_ORIGINS = [
@@ -201,6 +228,83 @@ if not firebase_admin._apps:
     except Exception as e:
         print(f"Firebase initialization error: {str(e)}")
 
+# Decoded ID tokens are cached per process until their own expiry
+FIREBASE_TOKEN_CACHE_SIZE = int(os.getenv('FIREBASE_TOKEN_CACHE_SIZE', '1024'))
+FIREBASE_TOKEN_CACHE_POLICY = os.getenv('FIREBASE_TOKEN_CACHE_POLICY', 'lru')  # 'lru' or 'fifo'
+
+# Google's token signing certificates are loaded at worker start and refreshed in the
+# background; point FIREBASE_PUBLIC_KEYS_FILE at a {"kid": "PEM"} file to load them offline
+FIREBASE_PUBLIC_KEYS_FILE = os.getenv('FIREBASE_PUBLIC_KEYS_FILE') or None
+FIREBASE_KEY_REFRESH_MARGIN = int(os.getenv('FIREBASE_KEY_REFRESH_MARGIN', '300'))
+
+# firebase_uid -> identity cache; signals invalidate it in-process, the TTL bounds staleness across workers
+FIREBASE_IDENTITY_CACHE_SIZE = int(os.getenv('FIREBASE_IDENTITY_CACHE_SIZE', '4096'))
+FIREBASE_IDENTITY_CACHE_TTL = int(os.getenv('FIREBASE_IDENTITY_CACHE_TTL', '300'))
+
+# How FirebaseAuthMiddleware treats views without @lazy_auth/@auth_exempt: 'eager' or 'lazy'
+FIREBASE_AUTH_DEFAULT_MODE = os.getenv('FIREBASE_AUTH_DEFAULT_MODE', 'eager')
+
+# Admin analytics responses are cached per complaints version; the timeout bounds
+# how stale time-based figures ("today", escalations) can get between writes
+COMPLAINTS_RESPONSE_CACHE_TIMEOUT = int(os.getenv('COMPLAINTS_RESPONSE_CACHE_TIMEOUT', '300'))
+# While one request recomputes a payload, others get the previous one for up to this long
+COMPLAINTS_RESPONSE_STALE_TIMEOUT = int(os.getenv('COMPLAINTS_RESPONSE_STALE_TIMEOUT', '3600'))
+# Longest a request waits on another worker's computation before running it itself
+COMPLAINTS_RESPONSE_LOCK_TIMEOUT = int(os.getenv('COMPLAINTS_RESPONSE_LOCK_TIMEOUT', '30'))
+
+# Lifetime of the staff directory version behind the staff ETags; bounds how long a
+# worker that missed a bump can answer 304 when REDIS_URL is not set
+STAFF_VERSION_TIMEOUT = int(os.getenv('STAFF_VERSION_TIMEOUT', '300'))
+
+# Complaint lists are returned whole unless the client asks for pages with ?page_size= (up to
+# the maximum) or ?cursor=; a cursor without page_size gets COMPLAINTS_PAGE_SIZE rows
+COMPLAINTS_PAGE_SIZE = int(os.getenv('COMPLAINTS_PAGE_SIZE', '100'))
+COMPLAINTS_MAX_PAGE_SIZE = int(os.getenv('COMPLAINTS_MAX_PAGE_SIZE', '500'))
+
+# Rows fetched per query by the streaming complaint export
+COMPLAINTS_EXPORT_CHUNK_SIZE = int(os.getenv('COMPLAINTS_EXPORT_CHUNK_SIZE', '2000'))
+
+# Delta sync (complaints/changes/): tokens trail the clock by this many seconds so rows
+# committed late are not skipped, and tokens older than the tombstone retention expire
+COMPLAINTS_CHANGES_LAG = int(os.getenv('COMPLAINTS_CHANGES_LAG', '5'))
+COMPLAINTS_TOMBSTONE_RETENTION_DAYS = int(os.getenv('COMPLAINTS_TOMBSTONE_RETENTION_DAYS', '30'))
+
+# Complaint full-text search: 'auto' uses MySQL FULLTEXT or SQLite FTS5 when available and
+# ranks in Python otherwise; 'mysql', 'sqlite' or 'python' forces one (see complaints.search)
+COMPLAINTS_SEARCH_BACKEND = os.getenv('COMPLAINTS_SEARCH_BACKEND', 'auto')
+
+# Typeahead (complaints/suggest/): suggestions kept per trie node, which also caps ?limit=,
+# and how often a worker checks whether another worker's writes call for a rebuild
+COMPLAINTS_SUGGEST_LIMIT = int(os.getenv('COMPLAINTS_SUGGEST_LIMIT', '10'))
+COMPLAINTS_SUGGEST_CHECK_INTERVAL = int(os.getenv('COMPLAINTS_SUGGEST_CHECK_INTERVAL', '30'))
+
+# Complaint category classifier (complaints.classifier): artifacts written by
+# train_complaint_classifier, how often workers look for a newer one, and the confidence
+# below which a prediction is sent for review
+COMPLAINTS_CLASSIFIER_DIR = os.getenv('COMPLAINTS_CLASSIFIER_DIR', os.path.join(BASE_DIR, 'classifier'))
+COMPLAINTS_CLASSIFIER_CHECK_INTERVAL = int(os.getenv('COMPLAINTS_CLASSIFIER_CHECK_INTERVAL', '60'))
+COMPLAINTS_CLASSIFIER_REVIEW_THRESHOLD = float(os.getenv('COMPLAINTS_CLASSIFIER_REVIEW_THRESHOLD', '0.85'))
+
+# Complaint event streams (complaints/events/). A stream sends a keepalive comment when idle,
+# closes after MAX_AGE seconds (clients reconnect after RETRY_MS), and asks its client to
+# resync once QUEUE_SIZE events are waiting. Streams are only served from backend.asgi;
+# under WSGI the endpoint answers 501 and clients poll complaints/changes/.
+COMPLAINTS_EVENTS_KEEPALIVE = int(os.getenv('COMPLAINTS_EVENTS_KEEPALIVE', '15'))
+COMPLAINTS_EVENTS_MAX_AGE = int(os.getenv('COMPLAINTS_EVENTS_MAX_AGE', '300'))
+COMPLAINTS_EVENTS_RETRY_MS = int(os.getenv('COMPLAINTS_EVENTS_RETRY_MS', '3000'))
+COMPLAINTS_EVENTS_QUEUE_SIZE = int(os.getenv('COMPLAINTS_EVENTS_QUEUE_SIZE', '100'))
+# Relay events between workers through the shared cache; only useful with REDIS_URL
+COMPLAINTS_EVENTS_FANOUT = os.getenv('COMPLAINTS_EVENTS_FANOUT', str(bool(os.getenv('REDIS_URL')))) == 'True'
+COMPLAINTS_EVENTS_FANOUT_INTERVAL = float(os.getenv('COMPLAINTS_EVENTS_FANOUT_INTERVAL', '0.5'))
+COMPLAINTS_EVENTS_FANOUT_TTL = int(os.getenv('COMPLAINTS_EVENTS_FANOUT_TTL', '60'))
+
+# Serve create_staff, verify_admin and file_complaint with native async views.
+# Enable when running backend.asgi under uvicorn; under WSGI the sync views are cheaper.
+ASYNC_API_VIEWS = os.getenv('DJANGO_ASYNC_VIEWS', 'False') == 'True'
+
+# Responses smaller than this many bytes are sent uncompressed even when the client accepts gzip
+API_GZIP_MIN_LENGTH = int(os.getenv('API_GZIP_MIN_LENGTH', '1024'))
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Load Firebase signing keys before the first request reaches this worker
+from accounts.key_store import start_key_store  # noqa: E402
+
+start_key_store()
@@ -1,9 +1,12 @@
 from django.contrib import admin
-from .models import Complaint, Feedback, Staff
+from .models import Complaint, ComplaintDailyStats, Feedback, Staff
 
 class ComplaintAdmin(admin.ModelAdmin):
-    list_display = ('id', 'type', 'status', 'severity', 'date_of_incident')
+    list_display = ('id', 'type', 'status', 'severity', 'assigned_staff', 'date_of_incident')
     list_filter = ('status', 'severity', 'type')
+    raw_id_fields = ('assigned_staff',)
+    # The display name follows assigned_staff (Complaint.save())
+    readonly_fields = ('staff',)
     search_fields = ('description', 'train_number', 'pnr_number')
 
 class FeedbackAdmin(admin.ModelAdmin):
@@ -16,6 +19,12 @@ class StaffAdmin(admin.ModelAdmin):
     list_filter = ('department', 'role', 'status')
     search_fields = ('name', 'email', 'phone')
 
+class ComplaintDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('day', 'type', 'status', 'created', 'resolved')
+    list_filter = ('status', 'type')
+    date_hierarchy = 'day'
+
 admin.site.register(Complaint, ComplaintAdmin)
 admin.site.register(Feedback, FeedbackAdmin)
 admin.site.register(Staff, StaffAdmin)
+admin.site.register(ComplaintDailyStats, ComplaintDailyStatsAdmin)
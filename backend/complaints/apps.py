@@ -1,6 +1,44 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_save, post_save, post_delete
 
 
 class ComplaintsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'complaints'
+
+    def ready(self):
+        # Keep the daily stats rollup in step with complaint writes
+        from .signals import (
+            remember_rollup_state, update_daily_stats, remove_from_daily_stats, bump_complaints_version,
+            bump_staff_directory_version, record_tombstone, update_search_document, rename_assigned_complaints,
+            remember_suggest_state, update_suggestions, remove_from_suggestions, drop_stale_prediction,
+        )
+
+        Complaint = self.get_model('Complaint')
+        pre_save.connect(remember_rollup_state, sender=Complaint)
+        post_save.connect(update_daily_stats, sender=Complaint)
+        post_delete.connect(remove_from_daily_stats, sender=Complaint)
+        # Deletions are kept as tombstones for the delta-sync endpoint
+        post_delete.connect(record_tombstone, sender=Complaint)
+        # The search document follows the complaint (and is deleted with it by cascade)
+        post_save.connect(update_search_document, sender=Complaint)
+        # A stored classifier prediction is for the description it was made from
+        post_save.connect(drop_stale_prediction, sender=Complaint)
+
+        # Cached analytics responses are invalidated by bumping the complaints version
+        for model in (Complaint, self.get_model('Staff')):
+            post_save.connect(bump_complaints_version, sender=model)
+            post_delete.connect(bump_complaints_version, sender=model)
+
+        # Complaints show their assignee's current name
+        post_save.connect(rename_assigned_complaints, sender=self.get_model('Staff'))
+
+        # Conditional GETs on the staff directory compare against the staff version
+        post_save.connect(bump_staff_directory_version, sender=self.get_model('Staff'))
+        post_delete.connect(bump_staff_directory_version, sender=self.get_model('Staff'))
+
+        # The typeahead tries count complaint types, trains and locations and staff locations
+        for model in (Complaint, self.get_model('Staff')):
+            pre_save.connect(remember_suggest_state, sender=model)
+            post_save.connect(update_suggestions, sender=model)
+            post_delete.connect(remove_from_suggestions, sender=model)
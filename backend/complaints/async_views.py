@@ -0,0 +1,89 @@
+"""
+Native async complaint endpoints: versions of complaints.views used when
+ASYNC_API_VIEWS is on, and the event stream, which is only served under ASGI.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from accounts.async_views import request_data
+from accounts.middleware import lazy_auth, aresolve_identity
+from . import events
+from .views import _save_complaint_photo, _complaint_user_id, _create_complaint
+
+
+# Eager auth, as in complaints.views.file_complaint
+@csrf_exempt
+@require_POST
+async def file_complaint(request):
+    try:
+        photo = request.FILES.get('photos')
+        data = request_data(request).copy()
+
+        # Handle photo upload
+        if photo:
+            data['photos'] = await sync_to_async(_save_complaint_photo)(photo)
+
+        # Set default priority if not provided
+        if 'priority' not in data or not data['priority']:
+            data['priority'] = 'Medium'
+
+        def save():
+            # Set user_id in data if available
+            user_id = _complaint_user_id(request)
+            if user_id:
+                data['user'] = user_id
+            return _create_complaint(data)
+
+        # One thread hop for the user lookup and the insert together
+        return await sync_to_async(save)()
+
+    except Exception as e:
+        return JsonResponse({
+            "error": f"Server error: {str(e)}"
+        }, status=500)
+
+
+def _events_user_id(request):
+    """Whose complaints an event stream carries: None (all of them) for admin/staff."""
+    if request.is_admin or request.is_staff:
+        return None
+    return _complaint_user_id(request)
+
+
+def event_stream_response(body):
+    response = StreamingHttpResponse(body, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@lazy_auth
+@require_GET
+async def complaint_events(request):
+    """
+    Server-Sent Events stream of complaint changes: every complaint for
+    admin/staff, a passenger's own otherwise. See complaints.events.
+
+    Under WSGI an open stream would hold a worker thread for up to
+    COMPLAINTS_EVENTS_MAX_AGE seconds, so there it answers 501 and clients
+    poll complaints/changes/ instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Event streams are only served under ASGI; poll /api/complaints/changes/ instead'}, status=501
+        )
+
+    await aresolve_identity(request)
+    if not getattr(request, 'is_authenticated', False):
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    user_id = await sync_to_async(_events_user_id)(request)
+    if user_id is None and not (request.is_admin or request.is_staff):
+        return JsonResponse({'error': 'User ID not found'}, status=400)
+
+    return event_stream_response(events.astream(user_id))
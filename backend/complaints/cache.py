@@ -0,0 +1,214 @@
+"""
+Versioned response cache for the admin analytics endpoints.
+
+Cached payloads are keyed by a global complaints version, the view name and
+the query string. Complaint and Staff writes bump the version (see
+complaints.signals), which orphans every cached payload at once instead of
+deleting entries one by one; orphans simply age out of the cache.
+
+Misses are single-flight: concurrent requests for the same key share one
+computation, coordinated by an in-process event between threads and a cache
+lock (``cache.add``) between workers. While a recomputation is in flight the
+other callers are served the last payload computed for that view and query
+(stale-while-revalidate) when there is one, and wait for the fresh one
+otherwise.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+VERSION_KEY = 'complaints:version'
+
+# Bumped on Staff writes; the staff directory ETags are derived from it
+STAFF_VERSION_KEY = 'complaints:staff-version'
+
+# How often a worker waiting on another worker's computation checks the cache
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _initial_version():
+    # Seeded from the clock so a version key lost to eviction never comes
+    # back with a value whose payloads are still cached
+    return time.time_ns() // 1000
+
+
+def current_version(key=VERSION_KEY, timeout=None):
+    """The version under ``key``; by default the one cached payloads are stored under."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=timeout)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key=VERSION_KEY, timeout=None):
+    """Move the version under ``key`` on; by default this invalidates every cached analytics payload."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=timeout)
+        return cache.incr(key)
+
+
+def staff_version():
+    """
+    The staff directory version. It expires STAFF_VERSION_TIMEOUT after it
+    was seeded (bumps keep the expiry), which bounds how long a worker whose
+    cache missed a bump can keep answering 304 when caches are not shared.
+    """
+    return current_version(STAFF_VERSION_KEY, settings.STAFF_VERSION_TIMEOUT)
+
+
+def bump_staff_version():
+    return bump_version(STAFF_VERSION_KEY, settings.STAFF_VERSION_TIMEOUT)
+
+
+def _query_digest(request):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    return hashlib.md5(query.encode()).hexdigest()
+
+
+def response_key(name, request, version=None):
+    return f'complaints:response:{version or current_version()}:{name}:{_query_digest(request)}'
+
+
+def stale_key(name, request):
+    """Unversioned key holding the last payload computed for a view and query."""
+    return f'complaints:response:stale:{name}:{_query_digest(request)}'
+
+
+class _Flight:
+    """One in-process computation that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout):
+        if not self.done.wait(timeout):
+            return None
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _wait_for_other_worker(key, lock_key, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if cache.get(lock_key) is None:
+            break
+    return None
+
+
+def _compute_once_across_workers(key, compute, stale, lock_timeout):
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, lock_timeout):
+        # Another worker is computing this key
+        if stale is not None:
+            return stale
+        value = _wait_for_other_worker(key, lock_key, lock_timeout)
+        if value is not None:
+            return value
+        # It gave up or died holding the lock; compute it here instead
+    try:
+        value = cache.get(key)
+        if value is not None:
+            return value
+        return compute()
+    finally:
+        cache.delete(lock_key)
+
+
+def single_flight(key, compute, stale=None, lock_timeout=None):
+    """
+    Return ``compute()`` for ``key``, running it at most once at a time per key
+    across threads and workers. ``compute`` is expected to store its result
+    under ``key``; callers that lose the race get that stored value, or
+    ``stale`` straight away when one is given.
+    """
+    lock_timeout = lock_timeout or settings.COMPLAINTS_RESPONSE_LOCK_TIMEOUT
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if stale is not None:
+            return stale
+        value = flight.wait(lock_timeout)
+        if value is not None:
+            return value
+        return compute()
+
+    try:
+        flight.result = _compute_once_across_workers(key, compute, stale, lock_timeout)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def _is_admin_request(request):
+    return (
+        getattr(request, 'is_authenticated', False)
+        and (getattr(request, 'is_admin', False) or getattr(request, 'is_staff', False))
+    )
+
+
+def cached_response(view_func):
+    """
+    Serve an admin-only GET view from the cache until complaints data changes.
+
+    Apply it beneath ``@api_view``. Requests the view would reject are passed
+    straight through so it still produces its own 401/403, and only 200
+    responses are stored. Concurrent misses are coalesced by ``single_flight``.
+    """
+    @functools.wraps(view_func)
+    def wrapped(request, *args, **kwargs):
+        if not _is_admin_request(request):
+            return view_func(request, *args, **kwargs)
+
+        # Read the version before computing so a write that lands meanwhile
+        # leaves this payload under the old, already-orphaned version
+        name = view_func.__name__
+        key = response_key(name, request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        def compute():
+            response = view_func(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response.data, response.status_code
+            cache.set(key, response.data, settings.COMPLAINTS_RESPONSE_CACHE_TIMEOUT)
+            cache.set(stale_key(name, request), response.data, settings.COMPLAINTS_RESPONSE_STALE_TIMEOUT)
+            return response.data
+
+        result = single_flight(key, compute, stale=cache.get(stale_key(name, request)))
+        if isinstance(result, tuple):
+            # An error response from the computation this request ran or joined
+            return Response(result[0], status=result[1])
+        return Response(result)
+
+    return wrapped
@@ -0,0 +1,346 @@
+"""
+Complaint category classifier.
+
+A multinomial logistic regression over hashed word unigrams and bigrams of
+the complaint description, trained from the stored Complaint.type labels by
+``manage.py train_complaint_classifier``. Complaints whose category was set
+by hand (ClassificationCorrection) are confirmed labels and count
+CORRECTION_WEIGHT times.
+
+Each training run writes a new artifact,
+``complaint-classifier-<version>.json.gz`` in COMPLAINTS_CLASSIFIER_DIR,
+holding the weights, the labels, the feature settings and the accuracy on
+held-out complaints. ``current_model()`` serves the newest artifact and looks
+for a newer one at most every COMPLAINTS_CLASSIFIER_CHECK_INTERVAL seconds,
+so workers pick up a retrained model without a restart.
+
+Batch inference uses numpy when it is installed and plain Python otherwise;
+both give the same predictions.
+
+Predictions are stored per complaint (ComplaintPrediction) for the
+classification stats: training refreshes all of them, and complaints filed
+or re-described since are predicted when the stats next need them.
+"""
+
+import gzip
+import json
+import logging
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import ClassificationCorrection, Complaint, ComplaintPrediction
+from .search import tokenize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+ARTIFACT_NAME = re.compile(r'complaint-classifier-(\d{8}T\d{12}Z)\.json\.gz')
+
+N_FEATURES = 2 ** 18
+CORRECTION_WEIGHT = 3.0
+# Every HOLDOUT_EVERY-th example is held out to measure accuracy
+HOLDOUT_EVERY = 5
+BATCH_SIZE = 1000
+
+
+def features(text, n_features=N_FEATURES):
+    """Hashed unigram and bigram features of ``text`` as ``{index: value}``, L2-normalized."""
+    words = tokenize(text)
+    grams = words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+    # crc32 rather than hash(), which differs between processes
+    counts = Counter(zlib.crc32(gram.encode()) % n_features for gram in grams)
+    values = {index: 1 + math.log(count) for index, count in counts.items()}
+    norm = math.sqrt(sum(value * value for value in values.values()))
+    return {index: value / norm for index, value in values.items()} if norm else {}
+
+
+def _scores(weights, bias, vector):
+    scores = list(bias)
+    for index, value in vector.items():
+        row = weights.get(index)
+        if row is not None:
+            for label, weight in enumerate(row):
+                scores[label] += weight * value
+    return scores
+
+
+def _softmax(scores):
+    top = max(scores)
+    exps = [math.exp(score - top) for score in scores]
+    total = sum(exps)
+    return [value / total for value in exps]
+
+
+class Model:
+    """Trained weights: ``weights`` maps a feature index to one weight per label."""
+
+    def __init__(self, labels, weights, bias, n_features=N_FEATURES, metadata=None):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+        self.n_features = n_features
+        self.metadata = metadata or {}
+        if np is not None:
+            # The weight rows as one matrix, and each feature's row in it
+            self._rows = {index: row for row, index in enumerate(weights)}
+            self._matrix = np.array(list(weights.values()), dtype=float).reshape(len(weights), len(labels))
+
+    @property
+    def version(self):
+        return self.metadata.get('version')
+
+    def _numpy_probabilities(self, vectors):
+        examples, rows, values = [], [], []
+        for example, vector in enumerate(vectors):
+            for index, value in vector.items():
+                row = self._rows.get(index)
+                if row is not None:
+                    examples.append(example)
+                    rows.append(row)
+                    values.append(value)
+        scores = np.tile(np.array(self.bias, dtype=float), (len(vectors), 1))
+        if rows:
+            np.add.at(scores, np.array(examples), np.array(values)[:, None] * self._matrix[rows])
+        scores -= scores.max(axis=1, keepdims=True)
+        exps = np.exp(scores)
+        return (exps / exps.sum(axis=1, keepdims=True)).tolist()
+
+    def probabilities(self, texts):
+        """For each of ``texts``, the probability of each label, in ``labels`` order."""
+        vectors = [features(text, self.n_features) for text in texts]
+        if not vectors:
+            return []
+        if np is not None:
+            return self._numpy_probabilities(vectors)
+        return [_softmax(_scores(self.weights, self.bias, vector)) for vector in vectors]
+
+    def predict(self, texts):
+        """The most likely label of each of ``texts`` and its probability, as pairs."""
+        predictions = []
+        for probabilities in self.probabilities(texts):
+            best = max(range(len(probabilities)), key=probabilities.__getitem__)
+            predictions.append((self.labels[best], probabilities[best]))
+        return predictions
+
+
+def fit(examples, labels, epochs=5, learning_rate=0.5, n_features=N_FEATURES, seed=0):
+    """
+    Train a Model on ``examples``, (text, label, weight) triples, by
+    stochastic gradient descent on the weighted cross-entropy.
+    """
+    positions = {label: position for position, label in enumerate(labels)}
+    data = [(features(text, n_features), positions[label], weight) for text, label, weight in examples]
+    weights = {}
+    bias = [0.0] * len(labels)
+    order = list(range(len(data)))
+    shuffle = random.Random(seed).shuffle
+    for epoch in range(epochs):
+        rate = learning_rate / (1 + epoch)
+        shuffle(order)
+        for example in order:
+            vector, target, weight = data[example]
+            gradient = _softmax(_scores(weights, bias, vector))
+            gradient[target] -= 1
+            step = [rate * weight * value for value in gradient]
+            for label, delta in enumerate(step):
+                bias[label] -= delta
+            for index, value in vector.items():
+                row = weights.get(index)
+                if row is None:
+                    row = weights[index] = [0.0] * len(labels)
+                for label, delta in enumerate(step):
+                    row[label] -= delta * value
+    return Model(labels, weights, bias, n_features)
+
+
+def training_examples():
+    """(description, type, weight) for every labelled complaint, in id order."""
+    corrected = ClassificationCorrection.objects.filter(complaint=OuterRef('pk'))
+    complaints = Complaint.objects.annotate(corrected=Exists(corrected))
+    last_pk = 0
+    while True:
+        batch = list(
+            complaints.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', 'description', 'type', 'corrected')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last_pk = batch[-1][0]
+        for _, description, type, corrected in batch:
+            if type and type.strip() and tokenize(description):
+                yield description, type.strip(), CORRECTION_WEIGHT if corrected else 1.0
+
+
+def train(epochs=5, min_examples=2, seed=0):
+    """
+    Train on the stored complaints. Categories with fewer than
+    ``min_examples`` complaints are left out. The returned Model's metadata
+    records its version, training set and held-out accuracy.
+    """
+    examples = list(training_examples())
+    counts = Counter(label for _, label, _ in examples)
+    labels = sorted(label for label, count in counts.items() if count >= min_examples)
+    if len(labels) < 2:
+        raise ValueError(f'Need at least two categories with {min_examples} or more complaints to train')
+    examples = [example for example in examples if counts[example[1]] >= min_examples]
+
+    # Measure accuracy on complaints a trial model has not seen, then train on all of them
+    held_out = examples[::HOLDOUT_EVERY]
+    trial = fit([e for n, e in enumerate(examples) if n % HOLDOUT_EVERY], labels, epochs, seed=seed)
+    predicted = trial.predict([text for text, _, _ in held_out])
+    accuracy = sum(label == expected for (label, _), (_, expected, _) in zip(predicted, held_out)) / len(held_out)
+
+    model = fit(examples, labels, epochs, seed=seed)
+    model.metadata = {
+        'version': timezone.now().strftime('%Y%m%dT%H%M%S%fZ'),
+        'examples': len(examples),
+        'corrections': sum(1 for _, _, weight in examples if weight != 1.0),
+        'accuracy': accuracy,
+        'epochs': epochs,
+    }
+    return model
+
+
+def artifacts(directory=None):
+    """Paths of the model artifacts in ``directory``, oldest first."""
+    directory = directory or settings.COMPLAINTS_CLASSIFIER_DIR
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in sorted(names) if ARTIFACT_NAME.fullmatch(name)]
+
+
+def save(model, directory=None, keep=3):
+    """Write ``model`` as a new artifact, keeping the ``keep`` newest; returns its path."""
+    directory = directory or settings.COMPLAINTS_CLASSIFIER_DIR
+    os.makedirs(directory, exist_ok=True)
+    payload = {
+        'format': FORMAT_VERSION,
+        'labels': model.labels,
+        'n_features': model.n_features,
+        'bias': model.bias,
+        'weights': {str(index): row for index, row in model.weights.items()},
+        'metadata': model.metadata,
+    }
+    path = os.path.join(directory, f'complaint-classifier-{model.version}.json.gz')
+    # Written aside and renamed, so workers never load half a file
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as file:
+            file.write(json.dumps(payload, separators=(',', ':')).encode())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    for old in artifacts(directory)[:-keep]:
+        os.unlink(old)
+    return path
+
+
+def load(path):
+    with gzip.open(path, 'rb') as file:
+        payload = json.loads(file.read())
+    if payload.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported classifier format {payload.get('format')}")
+    weights = {int(index): row for index, row in payload['weights'].items()}
+    return Model(payload['labels'], weights, payload['bias'], payload['n_features'], payload['metadata'])
+
+
+class ModelStore:
+    """The newest artifact, loaded once per worker and replaced when a newer one appears."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._model = None
+            self._path = None
+            self._checked_at = None
+
+    def current(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= settings.COMPLAINTS_CLASSIFIER_CHECK_INTERVAL:
+                self._checked_at = now
+                paths = artifacts()
+                if paths and paths[-1] != self._path:
+                    try:
+                        self._model, self._path = load(paths[-1]), paths[-1]
+                    except (OSError, ValueError):
+                        # Keep serving the model already loaded
+                        logger.exception('Could not load complaint classifier %s', paths[-1])
+            return self._model
+
+
+store = ModelStore()
+
+
+def current_model():
+    """The newest trained Model, or None before the first training run."""
+    return store.current()
+
+
+def needs_review(label, confidence, filed_type):
+    """Whether a prediction calls for a human: it is unsure or disagrees with the filed type."""
+    return confidence < settings.COMPLAINTS_CLASSIFIER_REVIEW_THRESHOLD or label != (filed_type or '').strip()
+
+
+def _predict_batch(model, batch):
+    for row, (label, confidence) in zip(batch, model.predict([row[-1] for row in batch])):
+        yield row, label, confidence
+
+
+def predict_rows(model, rows):
+    """
+    Yield ``(row, label, confidence)`` for ``rows``, tuples whose last item
+    is the complaint description, predicting BATCH_SIZE rows at a time.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield from _predict_batch(model, batch)
+            batch = []
+    yield from _predict_batch(model, batch)
+
+
+def store_predictions(model, complaints):
+    """Predict ``complaints`` and store the results as their ComplaintPrediction, BATCH_SIZE at a time."""
+    rows = complaints.order_by().values_list('pk', 'description').iterator(chunk_size=BATCH_SIZE)
+    batch = []
+    for (pk, _), label, confidence in predict_rows(model, rows):
+        batch.append(ComplaintPrediction(complaint_id=pk, type=label, confidence=confidence, model_version=model.version))
+        if len(batch) == BATCH_SIZE:
+            _save_predictions(batch)
+            batch = []
+    _save_predictions(batch)
+
+
+def _save_predictions(predictions):
+    ComplaintPrediction.objects.bulk_create(
+        predictions, update_conflicts=True, unique_fields=['complaint'],
+        update_fields=['type', 'confidence', 'model_version'],
+    )
+
+
+def predict_missing(model, complaints):
+    """Store predictions for those of ``complaints`` that have none (new or re-described)."""
+    store_predictions(model, complaints.filter(prediction__isnull=True))
@@ -0,0 +1,73 @@
+"""
+Conditional GET support (ETag / Last-Modified) for complaint and staff reads.
+
+A view decorated with ``conditional`` first computes cheap validators for the
+request: the complaint's updated_at for a single complaint, one aggregate
+(count plus max updated_at) for a complaint list, or the staff directory
+version for staff reads. When the client's If-None-Match / If-Modified-Since
+still match, it answers 304 without running the view, so unchanged polls
+never fetch or serialize the rows.
+"""
+
+import functools
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import _query_digest
+
+
+def make_etag(request, *parts):
+    """An ETag over ``parts`` and the request's query string."""
+    raw = ':'.join(str(part) for part in parts) + ':' + _query_digest(request)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def list_validators(request, queryset, *parts):
+    """``(etag, last_modified)`` for a complaint list, from a single aggregate query."""
+    summary = queryset.order_by().aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    last_modified = summary['last_modified']
+    etag = make_etag(request, *parts, summary['count'], last_modified.isoformat() if last_modified else '')
+    return etag, last_modified
+
+
+def conditional(validators):
+    """
+    Answer GET and HEAD with 304 Not Modified while the client's copy is current.
+
+    ``validators(request, *args, **kwargs)`` returns ``(etag, last_modified)``,
+    either of which may be None, or None to leave the request to the view
+    (unauthenticated or unknown objects, which the view rejects itself).
+    Apply it above ``@api_view``. The validators are sent with 200 and 304
+    responses, marked private and to be revalidated on every use.
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            result = validators(request, *args, **kwargs)
+            if result is None:
+                return view_func(request, *args, **kwargs)
+
+            etag, last_modified = result
+            etag = quote_etag(etag) if etag else None
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            if etag:
+                response.headers['ETag'] = etag
+            if timestamp:
+                response.headers['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+            return response
+
+        return wrapped
+
+    return decorator
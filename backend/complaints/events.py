@@ -0,0 +1,226 @@
+"""
+Server-Sent Events for complaint changes.
+
+Views publish a complaint after changing it (``publish_complaint``). Once
+the transaction commits, the event goes to the in-process ``broker``, which
+hands it to every open ``complaints/events/`` stream allowed to see it:
+admins and staff see all complaints, passengers only their own.
+
+With COMPLAINTS_EVENTS_FANOUT on (the default when REDIS_URL is set), events
+are also appended to a short log in the shared cache. A poller thread in
+each worker relays other workers' events to its local subscribers, so a
+stream gets every change whichever worker made it.
+
+Streams carry no replay: a client that reconnects catches up through
+``complaints/changes/``. A stream closes after COMPLAINTS_EVENTS_MAX_AGE
+seconds, or after sending a ``resync`` event when it falls too far behind;
+clients reconnect in both cases.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .serializers import ComplaintSerializer
+
+EVENT_FIELDS = ['id', 'type', 'status', 'priority', 'severity', 'staff', 'resolved_at', 'updated_at']
+
+# Sentinel a subscription receives when its queue overflowed
+RESYNC = object()
+
+
+class AsyncSubscription:
+    """
+    The events one stream will send, filtered to ``user_id`` unless it is
+    None. Read from an event loop; events may be delivered from any thread.
+    """
+
+    def __init__(self, user_id=None):
+        self.user_id = user_id
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=settings.COMPLAINTS_EVENTS_QUEUE_SIZE)
+
+    def wants(self, event):
+        return self.user_id is None or event['user_id'] == self.user_id
+
+    def deliver(self, event):
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Replace the backlog with a request to resync
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+
+    async def get(self, timeout):
+        """The next event, RESYNC, or None when ``timeout`` passes first."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Fans events out to the subscriptions of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.add(subscription)
+        if settings.COMPLAINTS_EVENTS_FANOUT:
+            fanout.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.wants(event):
+                subscription.deliver(event)
+
+
+broker = Broker()
+
+
+class CacheFanout:
+    """
+    Relays events between workers through a numbered log in the shared cache.
+    Each entry lives COMPLAINTS_EVENTS_FANOUT_TTL seconds, long enough for
+    every worker's poller to pick it up.
+    """
+
+    SEQUENCE_KEY = 'complaints:events:seq'
+    MAX_BATCH = 1000
+    # Seconds a numbered entry may be missing (its writer took the number but has not
+    # stored the entry yet) before the relay gives up on it
+    MISSING_GRACE = 5.0
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._thread = None
+        self._lock = threading.Lock()
+        # Sequence numbers the relay found without an entry, and when it first did
+        self._missing = {}
+
+    def _entry_key(self, seq):
+        return f'complaints:events:{seq}'
+
+    def _sequence(self):
+        return cache.get(self.SEQUENCE_KEY) or 0
+
+    def append(self, event):
+        cache.add(self.SEQUENCE_KEY, 0, timeout=None)
+        seq = cache.incr(self.SEQUENCE_KEY)
+        cache.set(self._entry_key(seq), (self.origin, event), settings.COMPLAINTS_EVENTS_FANOUT_TTL)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='complaint-events-fanout', daemon=True)
+                self._thread.start()
+
+    def relay(self, last_seq):
+        """
+        Publish other workers' events after ``last_seq``, in order; returns
+        the new position. An entry not written yet holds the position back
+        for up to MISSING_GRACE seconds, so a later poll still relays it.
+        """
+        seq = self._sequence()
+        if seq < last_seq:
+            # The log was reset (cache flushed); start again from its head
+            self._missing.clear()
+            return seq
+        if seq == last_seq:
+            return seq
+        # Entries further back than this have expired in any realistic setup
+        first = max(last_seq + 1, seq - self.MAX_BATCH + 1)
+        numbers = range(first, seq + 1)
+        entries = cache.get_many([self._entry_key(n) for n in numbers])
+        now = time.monotonic()
+        position = first - 1
+        for n in numbers:
+            entry = entries.get(self._entry_key(n))
+            if entry is None:
+                if now - self._missing.setdefault(n, now) < self.MISSING_GRACE:
+                    break
+            else:
+                origin, event = entry
+                if origin != self.origin:
+                    broker.publish(event)
+            position = n
+        self._missing = {n: seen for n, seen in self._missing.items() if n > position}
+        return position
+
+    def _run(self):
+        last_seq = self._sequence()
+        while True:
+            time.sleep(settings.COMPLAINTS_EVENTS_FANOUT_INTERVAL)
+            try:
+                last_seq = self.relay(last_seq)
+            except Exception:
+                # A cache outage must not kill the relay; retry on the next tick
+                continue
+
+
+fanout = CacheFanout()
+
+
+def complaint_event(complaint):
+    return {
+        'user_id': complaint.user_id,
+        'complaint': dict(ComplaintSerializer(complaint, fields=EVENT_FIELDS).data),
+    }
+
+
+def _dispatch(event):
+    broker.publish(event)
+    if settings.COMPLAINTS_EVENTS_FANOUT:
+        fanout.append(event)
+
+
+def publish_complaint(complaint):
+    """Send the complaint's current state to its subscribers once the write commits."""
+    event = complaint_event(complaint)
+    transaction.on_commit(lambda: _dispatch(event))
+
+
+def format_event(event):
+    if event is RESYNC:
+        return 'event: resync\ndata: {}\n\n'
+    data = json.dumps(event['complaint'], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'event: complaint\ndata: {data}\n\n'
+
+
+async def astream(user_id):
+    """The SSE body of a stream for ``user_id`` (None for every complaint)."""
+    yield f'retry: {settings.COMPLAINTS_EVENTS_RETRY_MS}\n\n'
+    subscription = broker.subscribe(AsyncSubscription(user_id))
+    try:
+        deadline = time.monotonic() + settings.COMPLAINTS_EVENTS_MAX_AGE
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = await subscription.get(min(settings.COMPLAINTS_EVENTS_KEEPALIVE, remaining))
+            if event is None:
+                # Keeps proxies from timing the connection out and detects closed clients
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+            if event is RESYNC:
+                return
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,65 @@
+"""
+Streaming complaint export in NDJSON or CSV.
+
+Rows are read in primary key order, one keyset batch at a time
+(``id > last_id LIMIT chunk_size``), and encoded as they are produced, so an
+export holds at most one batch in memory however many rows it covers.
+Batching by key rather than relying on ``QuerySet.iterator()`` alone keeps
+that true on MySQL, whose client buffers the whole result of a query.
+"""
+
+import csv
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import LOOKUP_COLUMNS, Complaint
+
+EXPORT_FIELDS = [
+    field.attname for field in Complaint._meta.concrete_fields if field.attname not in LOOKUP_COLUMNS
+]
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_rows(queryset, chunk_size=None):
+    """Yield ``queryset`` rows as dicts of EXPORT_FIELDS, in id order."""
+    chunk_size = chunk_size or settings.COMPLAINTS_EXPORT_CHUNK_SIZE
+    rows = queryset.order_by('id').values(*EXPORT_FIELDS)
+    last_id = 0
+    while True:
+        batch = 0
+        for row in rows.filter(id__gt=last_id)[:chunk_size].iterator(chunk_size=chunk_size):
+            batch += 1
+            last_id = row['id']
+            yield row
+        if batch < chunk_size:
+            return
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    """File-like object whose write() hands back the line csv.writer produced."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def stream(queryset, format):
+    rows = iter_rows(queryset)
+    return csv_lines(rows) if format == 'csv' else ndjson_lines(rows)
@@ -0,0 +1,96 @@
+"""
+Indexed PNR and train-number lookups.
+
+Complaint.save() keeps digits-only copies of pnr_number and train_number,
+forward and reversed (models.IDENTIFIER_LOOKUP_COLUMNS), each with its own
+B-tree index. A query that is a number, allowing spaces, dashes and slashes,
+is planned as a series of stages, tried in order:
+
+- ``exact``: the whole identifier.
+- ``prefix``: identifiers starting with the number, as an index range.
+- ``suffix``: identifiers ending with it, as a range on the reversed copy.
+- ``substring``: identifiers containing it anywhere. No index helps here, so
+  it only runs when none of the indexed stages matched anything.
+
+Ranges are used rather than LIKE because LIKE does not reach the index on
+SQLite (case-insensitive, with an ESCAPE clause). Both range bounds are digit
+strings, so they compare the same way under every collation; punctuation,
+which collations order differently, never appears in them.
+"""
+
+import re
+from django.db.models import Q
+
+from .models import IDENTIFIER_LOOKUP_COLUMNS, digits_only
+
+IDENTIFIER_QUERY = re.compile(r'[\d\s/-]+')
+
+_ORDER = ('-created_at', '-id')
+
+
+def _any_column(lookup, value):
+    condition = Q()
+    for digits, _ in IDENTIFIER_LOOKUP_COLUMNS.values():
+        condition |= Q(**{f'{digits}__{lookup}': value})
+    return condition
+
+
+def upper_bound(digits):
+    """
+    The smallest digit string above every digit string starting with
+    ``digits`` ('123' -> '124', '129' -> '13'), or None when there is none
+    because ``digits`` is all nines.
+    """
+    stripped = digits.rstrip('9')
+    if not stripped:
+        return None
+    return stripped[:-1] + str(int(stripped[-1]) + 1)
+
+
+def _range(value, reversed_copy=False):
+    upper = upper_bound(value)
+    condition = Q()
+    for digits, reversed_digits in IDENTIFIER_LOOKUP_COLUMNS.values():
+        column = reversed_digits if reversed_copy else digits
+        bounds = {f'{column}__gte': value}
+        if upper is not None:
+            bounds[f'{column}__lt'] = upper
+        condition |= Q(**bounds)
+    return condition
+
+
+def plan(query):
+    """
+    The stages for ``query`` as (name, condition) pairs, or an empty list
+    when it is not an identifier. The last stage is the unindexed fallback.
+    """
+    query = query.strip()
+    if not IDENTIFIER_QUERY.fullmatch(query):
+        return []
+    digits = digits_only(query)
+    if not digits:
+        return []
+    return [
+        ('exact', _any_column('exact', digits)),
+        ('prefix', _range(digits)),
+        ('suffix', _range(digits[::-1], reversed_copy=True)),
+        ('substring', _any_column('contains', digits)),
+    ]
+
+
+def identifier_ids(queryset, query, limit):
+    """
+    Ids of the complaints in ``queryset`` whose PNR or train number matches
+    ``query``: exact matches first, then prefix, then suffix matches, newest
+    first within each, at most ``limit`` of them.
+    """
+    stages = plan(query)
+    ids = []
+    for name, condition in stages:
+        if name == 'substring' and ids:
+            break
+        found = queryset.filter(condition).exclude(id__in=ids).order_by(*_ORDER)
+        ids.extend(found.values_list('id', flat=True)[:limit - len(ids)])
+        if len(ids) >= limit:
+            break
+    return ids
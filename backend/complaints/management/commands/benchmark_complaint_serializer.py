@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from complaints.models import Complaint
+from complaints.serializers import ComplaintSerializer, complaint_rows
+
+class Command(BaseCommand):
+    help = 'Compare per-row cost of ComplaintSerializer and the values()-based list serializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Complaints to serialize')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per serializer (best is reported)')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+
+        # Work on throwaway rows that are rolled back afterwards
+        with transaction.atomic():
+            now = timezone.now()
+            Complaint.objects.bulk_create([
+                Complaint(
+                    type='Coach - Cleanliness', description=f'Benchmark complaint {i}',
+                    train_number='12345', pnr_number='1234567890', location='Delhi',
+                    date_of_incident=now.date(), created_at=now, resolved_at=now,
+                )
+                for i in range(rows)
+            ])
+            queryset = Complaint.objects.order_by('-id')[:rows]
+
+            timings = {
+                'ComplaintSerializer': lambda: ComplaintSerializer(queryset.all(), many=True).data,
+                'complaint_rows': lambda: complaint_rows.serialize(queryset.all()),
+            }
+            for name, run in timings.items():
+                best = min(self._time(run) for _ in range(repeat))
+                self.stdout.write(f'{name:<20} {best * 1e6 / rows:8.1f} us/row  ({best * 1000:.1f} ms total)')
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
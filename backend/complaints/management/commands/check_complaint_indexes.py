@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+from complaints import lookup
+from complaints.models import Complaint, ComplaintDailyStats
+from complaints.stats import OPEN_STATUSES
+
+
+def hot_queries():
+    """The complaint queries the API runs most, as (name, queryset) pairs."""
+    now = timezone.now()
+    today = timezone.localdate()
+    # Keyset pages as built by complaints.pagination.paginate
+    newest = ('-created_at', '-id')
+    after = Q(created_at__lt=now) | Q(created_at=now, id__lt=1000)
+    return [
+        ('user_complaints', Complaint.objects.filter(user=1).order_by(*newest)[:101]),
+        ('user_complaints?cursor', Complaint.objects.filter(user=1).filter(after).order_by(*newest)[:101]),
+        # The matching itself runs on the full-text index (complaints.search)
+        ('search_user_complaints', Complaint.objects.filter(user=1, id__in=[1, 2, 3])),
+        # PNR and train-number stages as planned by complaints.lookup
+        *((f'search_user_complaints?{name}', Complaint.objects.filter(condition).order_by(*newest)[:50])
+          for name, condition in lookup.plan('2345678901') if name != 'substring'),
+        ('admin_get_all_complaints', Complaint.objects.order_by(*newest)[:101]),
+        ('admin_get_all_complaints?cursor', Complaint.objects.filter(after).order_by(*newest)[:101]),
+        ('admin_get_all_complaints?status', Complaint.objects.filter(status='Open').order_by(*newest)[:101]),
+        ('admin_get_all_complaints?type', Complaint.objects.filter(type='Security').order_by(*newest)[:101]),
+        ('admin_get_all_complaints?staff', Complaint.objects.filter(assigned_staff=1).order_by(*newest)[:101]),
+        ('complaint_changes', Complaint.objects.filter(
+            Q(updated_at__gt=now) | Q(updated_at=now, id__gt=1000)
+        ).order_by('updated_at', 'id')[:101]),
+        ('pending_escalations', Complaint.objects.filter(
+            status__in=OPEN_STATUSES, created_at__lt=now - timedelta(hours=48)
+        )),
+        ('recent_resolved', Complaint.objects.filter(
+            status='Closed', resolved_at__gte=now - timedelta(hours=24)
+        ).order_by('-resolved_at')[:10]),
+        ('daily_trends', ComplaintDailyStats.objects.filter(
+            day__gte=today - timedelta(days=29), day__lte=today
+        ).values('day')),
+    ]
+
+
+def full_scans(queryset):
+    """Lines of the query plan that read a whole table without an index."""
+    sql, params = queryset.query.sql_with_params()
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            steps = [row[-1] for row in cursor.fetchall()]
+            return [step for step in steps if step.startswith(f'SCAN {table}') and 'INDEX' not in step]
+        if connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [f"{row['table']}: type=ALL" for row in rows if row['table'] == table and row['type'] == 'ALL']
+    raise CommandError(f'EXPLAIN checks are not implemented for {connection.vendor}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN on the hot complaint queries and fail if any of them falls back to a full '
+        'table scan. On MySQL run it against production-sized data: the optimizer prefers a scan '
+        'for tiny tables.'
+    )
+
+    def handle(self, *args, **options):
+        failures = []
+        for name, queryset in hot_queries():
+            scans = full_scans(queryset)
+            if scans:
+                failures.append(f"{name}: {'; '.join(scans)}")
+                self.stdout.write(self.style.ERROR(f'{name}: full scan'))
+            else:
+                self.stdout.write(f'{name}: ok')
+
+        if failures:
+            raise CommandError('Queries without a usable index:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All hot complaint queries use an index'))
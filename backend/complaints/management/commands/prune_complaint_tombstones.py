@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from complaints.models import ComplaintTombstone
+
+class Command(BaseCommand):
+    help = (
+        'Delete complaint tombstones older than COMPLAINTS_TOMBSTONE_RETENTION_DAYS. '
+        'Sync tokens that old are already rejected, so nothing reads them.'
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.COMPLAINTS_TOMBSTONE_RETENTION_DAYS)
+        deleted, _ = ComplaintTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} complaint tombstones'))
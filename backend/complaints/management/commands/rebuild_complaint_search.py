@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from complaints.search import get_backend, rebuild
+
+class Command(BaseCommand):
+    help = 'Rebuild the complaint full-text search documents and index'
+
+    def handle(self, *args, **options):
+        documents = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt complaint search ({documents} documents, {get_backend()} backend)'
+        ))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from complaints.rollup import rebuild
+
+class Command(BaseCommand):
+    help = 'Rebuild the ComplaintDailyStats rollup from the complaints table'
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt complaint daily stats ({rows} rows)'))
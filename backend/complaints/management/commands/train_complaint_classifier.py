@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from complaints import classifier
+from complaints.models import Complaint
+from complaints.cache import bump_version
+
+class Command(BaseCommand):
+    help = (
+        'Train the complaint category classifier on the stored complaint types and manual '
+        'corrections, and write it to COMPLAINTS_CLASSIFIER_DIR as a new versioned artifact. '
+        'Running workers switch to it within COMPLAINTS_CLASSIFIER_CHECK_INTERVAL seconds. '
+        'Every complaint\'s stored prediction is refreshed with it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--epochs', type=int, default=5)
+        parser.add_argument(
+            '--min-examples', type=int, default=2,
+            help='Leave out categories with fewer complaints than this',
+        )
+        parser.add_argument('--keep', type=int, default=3, help='Number of artifacts to keep')
+
+    def handle(self, *args, **options):
+        if options['keep'] < 1:
+            raise CommandError('--keep must be at least 1')
+        try:
+            model = classifier.train(epochs=options['epochs'], min_examples=options['min_examples'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        path = classifier.save(model, keep=options['keep'])
+        # The classification stats aggregate stored predictions
+        classifier.store_predictions(model, Complaint.objects.all())
+        # Cached classification stats were computed with the previous model
+        bump_version()
+        metadata = model.metadata
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained classifier {model.version} on {metadata['examples']} complaints "
+            f"({metadata['corrections']} corrected, {len(model.labels)} categories, "
+            f"held-out accuracy {metadata['accuracy']:.1%}): {path}"
+        ))
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:29
+
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintDailyStats = apps.get_model('complaints', 'ComplaintDailyStats')
+    rows = defaultdict(lambda: [0, 0, 0.0])
+
+    created = (
+        Complaint.objects.annotate(day=TruncDate('created_at'))
+        .values('day', 'type', 'status')
+        .annotate(n=Count('id'))
+    )
+    for row in created:
+        rows[(row['day'], row['type'], row['status'])][0] += row['n']
+
+    resolved = (
+        Complaint.objects.filter(resolved_at__isnull=False)
+        .annotate(day=TruncDate('resolved_at'))
+        .values('day', 'type', 'status')
+        .annotate(n=Count('id'), duration=Sum(F('resolved_at') - F('created_at')))
+    )
+    for row in resolved:
+        entry = rows[(row['day'], row['type'], row['status'])]
+        entry[1] += row['n']
+        entry[2] += row['duration'].total_seconds() if row['duration'] else 0.0
+
+    ComplaintDailyStats.objects.bulk_create([
+        ComplaintDailyStats(
+            day=day, type=type, status=status,
+            created=created, resolved=resolved, resolution_seconds=seconds,
+        )
+        for (day, type, status), (created, resolved, seconds) in rows.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0017_quicksolution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('type', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('created', models.IntegerField(default=0)),
+                ('resolved', models.IntegerField(default=0)),
+                ('resolution_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Complaint daily stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'type', 'status'), name='unique_complaint_daily_stats')],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
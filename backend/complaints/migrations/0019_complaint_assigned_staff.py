@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0018_complaintdailystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='assigned_staff',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assigned_complaints', to='complaints.staff'),
+        ),
+    ]
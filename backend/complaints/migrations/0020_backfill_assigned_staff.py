@@ -0,0 +1,54 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:33
+
+from collections import defaultdict
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_assigned_staff(apps, schema_editor):
+    """
+    Point assigned_staff at the Staff row whose name matches Complaint.staff,
+    walking the complaints in primary key order BATCH_SIZE rows at a time.
+    Where several staff share a name the oldest row wins.
+    """
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Staff = apps.get_model('complaints', 'Staff')
+
+    staff_ids = {}
+    for staff_id, name in Staff.objects.order_by('-id').values_list('id', 'name'):
+        staff_ids[name] = staff_id
+    if not staff_ids:
+        return
+
+    pending = (
+        Complaint.objects.filter(assigned_staff__isnull=True, staff__isnull=False)
+        .exclude(staff='')
+        .order_by('pk')
+    )
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk).values_list('pk', 'staff')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        by_staff = defaultdict(list)
+        for pk, name in batch:
+            if name in staff_ids:
+                by_staff[staff_ids[name]].append(pk)
+        for staff_id, pks in by_staff.items():
+            Complaint.objects.filter(pk__in=pks).update(assigned_staff_id=staff_id)
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own so large tables are not locked in one transaction
+    atomic = False
+
+    dependencies = [
+        ('complaints', '0019_complaint_assigned_staff'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_assigned_staff, migrations.RunPython.noop),
+    ]
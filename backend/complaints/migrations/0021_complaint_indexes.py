@@ -0,0 +1,53 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class AddIndexOnline(migrations.AddIndex):
+    """
+    AddIndex that asks MySQL to build the index in place without locking the
+    table, so complaints stay writable while it runs. Other backends get the
+    plain CREATE INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'mysql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            sql = str(self.index.create_sql(model, schema_editor))
+            schema_editor.execute(f'{sql} ALGORITHM=INPLACE LOCK=NONE')
+
+
+class Migration(migrations.Migration):
+    # Each index is built in its own statement rather than one long transaction
+    atomic = False
+
+    dependencies = [
+        ('complaints', '0020_backfill_assigned_staff'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['user', '-created_at'], name='complaint_user_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['status', '-created_at'], name='complaint_status_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['type', '-created_at'], name='complaint_type_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'resolved_at'], name='complaint_status_resolved_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['-created_at'], name='complaint_created_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from importlib import import_module
+
+# Build the index without locking complaints on MySQL, as in 0021
+AddIndexOnline = import_module('complaints.migrations.0021_complaint_indexes').AddIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0021_complaint_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['updated_at'], name='complaint_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='complainttombstone',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:49
+
+import re
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+BATCH_SIZE = 1000
+SEARCH_FIELDS = ('type', 'description', 'train_number', 'pnr_number', 'location')
+
+DOCUMENT_TABLE = 'complaints_complaintsearchdocument'
+FTS_TABLE = 'complaints_search_fts'
+
+SQLITE_FTS = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"document, content='{DOCUMENT_TABLE}', content_rowid='complaint_id')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.complaint_id, new.document); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.complaint_id, old.document); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.complaint_id, old.document); "
+    f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.complaint_id, new.document); END",
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE {DOCUMENT_TABLE} ADD FULLTEXT INDEX complaint_search_document_ft (document)'
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_FTS[0])
+        except OperationalError:
+            # SQLite built without FTS5: complaints.search falls back to Python ranking
+            return
+        for sql in SQLITE_FTS[1:]:
+            schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE {DOCUMENT_TABLE} DROP INDEX complaint_search_document_ft')
+    elif vendor == 'sqlite':
+        for suffix in ('_ai', '_ad', '_au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def populate_search_documents(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintSearchDocument = apps.get_model('complaints', 'ComplaintSearchDocument')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Complaint.objects.filter(pk__gt=last_pk).order_by('pk').values('pk', *SEARCH_FIELDS)[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1]['pk']
+        ComplaintSearchDocument.objects.bulk_create([
+            ComplaintSearchDocument(
+                complaint_id=row['pk'],
+                document=' '.join(re.findall(r'\w+', ' '.join(row[field] or '' for field in SEARCH_FIELDS).lower())),
+            )
+            for row in batch
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0022_complainttombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintSearchDocument',
+            fields=[
+                ('complaint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='complaints.complaint')),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.1.5 on 2026-10-18 04:52
+
+import unicodedata
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+from importlib import import_module
+
+# Build the indexes without locking complaints on MySQL, as in 0021
+AddIndexOnline = import_module('complaints.migrations.0021_complaint_indexes').AddIndexOnline
+
+BATCH_SIZE = 1000
+LOOKUP_COLUMNS = {
+    'pnr_number': ('pnr_digits', 'pnr_digits_reversed'),
+    'train_number': ('train_digits', 'train_digits_reversed'),
+}
+
+
+def digits_only(value):
+    return ''.join(str(unicodedata.decimal(char)) for char in value or '' if char.isdecimal())
+
+
+def populate_lookup_columns(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    columns = [column for pair in LOOKUP_COLUMNS.values() for column in pair]
+    with_identifier = Q(pnr_number__isnull=False) | Q(train_number__isnull=False)
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Complaint.objects.filter(with_identifier, pk__gt=last_pk).order_by('pk')
+            .only('pk', *LOOKUP_COLUMNS)[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for complaint in batch:
+            for source, (digits, reversed_digits) in LOOKUP_COLUMNS.items():
+                value = digits_only(getattr(complaint, source))
+                setattr(complaint, digits, value)
+                setattr(complaint, reversed_digits, value[::-1])
+        Complaint.objects.bulk_update(batch, columns)
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch and each index is built in its own statement
+    atomic = False
+
+    dependencies = [
+        ('complaints', '0023_complaint_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='pnr_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='pnr_digits_reversed',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='train_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='train_digits_reversed',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        # Filled before indexing so the backfill does not maintain the indexes row by row
+        migrations.RunPython(populate_lookup_columns, migrations.RunPython.noop),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['pnr_digits'], name='complaint_pnr_digits_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['pnr_digits_reversed'], name='complaint_pnr_reversed_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['train_digits'], name='complaint_train_digits_idx'),
+        ),
+        AddIndexOnline(
+            model_name='complaint',
+            index=models.Index(fields=['train_digits_reversed'], name='complaint_train_reversed_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 05:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0025_classificationcorrection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=100)),
+                ('confidence', models.FloatField()),
+                ('model_version', models.CharField(max_length=32)),
+                ('complaint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prediction', to='complaints.complaint')),
+            ],
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 import os
+import unicodedata
 
 def staff_avatar_path(instance, filename):
     # Generate a unique filename
@@ -9,6 +10,38 @@ def staff_avatar_path(instance, filename):
     new_filename = f"staff_{instance.id}_{timezone.now().strftime('%Y%m%d%H%M%S')}.{ext}"
     return os.path.join('staff_avatars', new_filename)
 
+# The complaint categories offered by the filing form (FileComplaint.tsx)
+COMPLAINT_CATEGORIES = [
+    'Coach - Maintenance/Facilities',
+    'Electrical Equipment',
+    'Medical Assistance',
+    'Catering / Vending Services',
+    'Passengers Behaviour',
+    'Water Availability',
+    'Punctuality',
+    'Security',
+    'Unreserved / Reserved Ticketing',
+    'Coach - Cleanliness',
+    'Staff Behaviour',
+    'Refund of Tickets',
+    'Passenger Amenities',
+    'Bed Roll',
+    'Corruption / Bribery',
+    'Miscellaneous',
+]
+
+def digits_only(value):
+    """The decimal digits of ``value`` as ASCII, e.g. 'PNR 421-00९' -> '421009'."""
+    return ''.join(str(unicodedata.decimal(char)) for char in value or '' if char.isdecimal())
+
+# Digits-only copies of the passenger-facing identifiers, forward and reversed, that
+# Complaint.save() keeps for indexed exact, prefix and suffix lookups (complaints.lookup)
+IDENTIFIER_LOOKUP_COLUMNS = {
+    'pnr_number': ('pnr_digits', 'pnr_digits_reversed'),
+    'train_number': ('train_digits', 'train_digits_reversed'),
+}
+LOOKUP_COLUMNS = tuple(column for columns in IDENTIFIER_LOOKUP_COLUMNS.values() for column in columns)
+
 class Complaint(models.Model):
     STATUS_CHOICES = [
         ('Open', 'Open'),
@@ -34,11 +67,19 @@ class Complaint(models.Model):
     location = models.CharField(max_length=255, blank=True, null=True)
     train_number = models.CharField(max_length=20, blank=True, null=True)
     pnr_number = models.CharField(max_length=20, blank=True, null=True)
+    pnr_digits = models.CharField(max_length=20, blank=True, default='', editable=False)
+    pnr_digits_reversed = models.CharField(max_length=20, blank=True, default='', editable=False)
+    train_digits = models.CharField(max_length=20, blank=True, default='', editable=False)
+    train_digits_reversed = models.CharField(max_length=20, blank=True, default='', editable=False)
     severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default='Medium')
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='Medium')
     date_of_incident = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Open')
-    staff = models.CharField(max_length=255, blank=True, null=True)
+    staff = models.CharField(max_length=255, blank=True, null=True)  # Display name of the assignee
+    assigned_staff = models.ForeignKey(
+        'Staff', on_delete=models.SET_NULL, null=True, blank=True, db_index=True,
+        related_name='assigned_complaints'
+    )
     photos = models.CharField(max_length=255, blank=True, null=True)  # Increased max_length
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
@@ -49,20 +90,125 @@ class Complaint(models.Model):
     resolved_by = models.CharField(max_length=255, blank=True, null=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
  
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded state so save() can find changes without a query
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._remember_state(fields)
+
+    def _remember_state(self, fields=None):
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred:
+                continue
+            if fields is None or field.name in fields or field.attname in fields:
+                loaded[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded
+
+    def get_dirty_fields(self):
+        """
+        Attribute names whose value differs from the loaded state, mapped to
+        the loaded value. Every field counts as dirty on an unsaved instance.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        deferred = self.get_deferred_fields()
+        dirty = {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname in deferred:
+                continue
+            if loaded is None or field.attname not in loaded:
+                dirty[field.attname] = None
+            elif getattr(self, field.attname) != loaded[field.attname]:
+                dirty[field.attname] = loaded[field.attname]
+        return dirty
+
+    def _normalize_identifiers(self, update_fields):
+        """Refresh the lookup columns; returns update_fields with any that must be written."""
+        deferred = self.get_deferred_fields()
+        for source, (digits, reversed_digits) in IDENTIFIER_LOOKUP_COLUMNS.items():
+            if source in deferred:
+                continue
+            value = digits_only(getattr(self, source))
+            setattr(self, digits, value)
+            setattr(self, reversed_digits, value[::-1])
+            if update_fields is not None and source in update_fields:
+                update_fields = set(update_fields) | {digits, reversed_digits}
+        return update_fields
+
+    def _sync_staff_name(self, update_fields):
+        """
+        Set the staff display name from assigned_staff when either changed;
+        returns update_fields with staff if it must be written. A name given
+        without a matching Staff row is kept.
+        """
+        if {'staff', 'assigned_staff_id'} & self.get_deferred_fields():
+            return update_fields
+        if update_fields is not None and not {'staff', 'assigned_staff', 'assigned_staff_id'} & set(update_fields):
+            return update_fields
+        dirty = self.get_dirty_fields()
+        if self.assigned_staff_id is not None and ('assigned_staff_id' in dirty or 'staff' in dirty):
+            self.staff = self.assigned_staff.name
+        elif self.assigned_staff_id is None and 'assigned_staff_id' in dirty and 'staff' not in dirty:
+            self.staff = None
+        else:
+            return update_fields
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'staff'}
+        return update_fields
+
     def save(self, *args, **kwargs):
-        # If status is changing to closed, record resolution time
-        if self.pk:
-            old_instance = Complaint.objects.get(pk=self.pk)
-            if old_instance.status != 'closed' and self.status == 'closed':
-                from django.utils import timezone
-                self.resolved_at = timezone.now()
-        
+        loaded = getattr(self, '_loaded_values', None)
+        update_fields = self._normalize_identifiers(kwargs.get('update_fields'))
+        update_fields = self._sync_staff_name(update_fields)
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+
+        # Record resolution time on the transition to Closed, unless this
+        # change sets resolved_at itself
+        was_closed = loaded is not None and str(loaded.get('status', '')).lower() == 'closed'
+        resolved_at_unchanged = self.resolved_at is None or (
+            loaded is not None and self.resolved_at == loaded.get('resolved_at')
+        )
+        if str(self.status).lower() == 'closed' and not was_closed and resolved_at_unchanged:
+            self.resolved_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = set(update_fields) | {'resolved_at'}
+
+        # Write only the changed columns of a row loaded from the database. updated_at is
+        # always written, so save() on an unchanged row still touches it for delta sync
+        if (loaded is not None and self.pk is not None and update_fields is None
+                and not args and not kwargs.get('force_insert')):
+            update_fields = set(self.get_dirty_fields()) | {'updated_at'}
+            kwargs['update_fields'] = update_fields
+
         # Don't modify the photos path as it's now handled in the view
         super().save(*args, **kwargs)
+        self._remember_state(update_fields)
  
     def __str__(self):
         return f"{self.type} - {self.status}"
 
+    class Meta:
+        # Matched to the hot queries checked by `manage.py check_complaint_indexes`
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='complaint_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='complaint_status_created_idx'),
+            models.Index(fields=['type', '-created_at'], name='complaint_type_created_idx'),
+            models.Index(fields=['status', 'resolved_at'], name='complaint_status_resolved_idx'),
+            models.Index(fields=['-created_at'], name='complaint_created_idx'),
+            models.Index(fields=['updated_at'], name='complaint_updated_idx'),
+            models.Index(fields=['pnr_digits'], name='complaint_pnr_digits_idx'),
+            models.Index(fields=['pnr_digits_reversed'], name='complaint_pnr_reversed_idx'),
+            models.Index(fields=['train_digits'], name='complaint_train_digits_idx'),
+            models.Index(fields=['train_digits_reversed'], name='complaint_train_reversed_idx'),
+        ]
+
 class Feedback(models.Model):
     complaint_id = models.CharField(max_length=100)
     category = models.CharField(max_length=100)
@@ -118,4 +264,96 @@ class QuickSolution(models.Model):
         return f"{self.problem} - {self.category}"
 
     class Meta:
-        verbose_name_plural = "Quick Solutions"
\ No newline at end of file
+        verbose_name_plural = "Quick Solutions"
+class ComplaintDailyStats(models.Model):
+    """
+    Per-day rollup of complaint activity, kept current by complaints.signals
+    and rebuilt from scratch by ``manage.py rebuild_complaint_stats``.
+
+    ``created`` counts complaints created on ``day`` that currently have
+    ``type``/``status``; ``resolved`` and ``resolution_seconds`` cover the
+    ones whose resolved_at falls on ``day``.
+    """
+    day = models.DateField()
+    type = models.CharField(max_length=100)
+    status = models.CharField(max_length=20)
+    created = models.IntegerField(default=0)
+    resolved = models.IntegerField(default=0)
+    resolution_seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.type} - {self.status}"
+
+    class Meta:
+        verbose_name_plural = "Complaint daily stats"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'type', 'status'], name='unique_complaint_daily_stats'),
+        ]
+
+class ComplaintTombstone(models.Model):
+    """
+    Record of a deleted complaint, written by complaints.signals so that
+    ``changes/`` can tell syncing clients which ids to drop. Rows older than
+    COMPLAINTS_TOMBSTONE_RETENTION_DAYS are removed by
+    ``manage.py prune_complaint_tombstones``.
+    """
+    complaint_id = models.BigIntegerField()
+    # Owner of the deleted complaint; no constraint, the user may be gone too
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, null=True, blank=True,
+        db_constraint=False, related_name='+'
+    )
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Complaint {self.complaint_id} deleted {self.deleted_at}"
+
+class ComplaintSearchDocument(models.Model):
+    """
+    Normalized search text of a complaint, kept current by complaints.signals
+    and rebuilt by ``manage.py rebuild_complaint_search``. The full-text index
+    over it (MySQL FULLTEXT or an SQLite FTS5 table) is created by migration
+    0023; see complaints.search.
+    """
+    complaint = models.OneToOneField(
+        Complaint, on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+    document = models.TextField()
+
+    def __str__(self):
+        return f"Search document for complaint {self.complaint_id}"
+
+class ClassificationCorrection(models.Model):
+    """
+    A complaint category set by hand through ``update_classification``.
+    Corrected complaints count as confirmed labels when
+    ``manage.py train_complaint_classifier`` trains the category classifier
+    (complaints.classifier), and no longer need review.
+    """
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='classification_corrections')
+    previous_type = models.CharField(max_length=100)
+    type = models.CharField(max_length=100)
+    corrected_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Complaint {self.complaint_id}: {self.previous_type} -> {self.type}"
+
+
+class ComplaintPrediction(models.Model):
+    """
+    The classifier's category and confidence for a complaint's description,
+    stored so the classification stats aggregate rather than predict.
+    ``manage.py train_complaint_classifier`` refreshes every complaint's;
+    an edit to the description drops it until the next one is made
+    (complaints.classifier.predict_missing).
+    """
+    complaint = models.OneToOneField(Complaint, on_delete=models.CASCADE, related_name='prediction')
+    type = models.CharField(max_length=100)
+    confidence = models.FloatField()
+    model_version = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"Complaint {self.complaint_id}: {self.type} ({self.confidence:.0%})"
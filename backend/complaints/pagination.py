@@ -0,0 +1,131 @@
+"""
+Keyset (cursor) pagination over (created_at, id) for the complaint lists.
+
+Pages are newest first and each one is fetched with a range condition on the
+last row seen rather than an OFFSET, so deep pages cost the same as the first
+and rows inserted meanwhile (which sort before page one) never shift later
+pages. Cursors are opaque base64 tokens. Responses keep their JSON array body
+and advertise neighbouring pages in a ``Link`` header:
+
+    Link: <https://.../api/complaints/user/?cursor=...>; rel="next"
+
+Paging is opt-in: a request with neither ``cursor`` nor ``page_size`` gets the
+whole list, as clients that do not read ``Link`` expect.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Q
+
+
+# Columns every paginated row must carry
+KEY_COLUMNS = ('created_at', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk, direction):
+    raw = json.dumps([created_at.isoformat(), pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, pk, direction)``; raises InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, pk, direction = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if direction not in ('next', 'prev'):
+        raise InvalidCursor('Invalid cursor')
+    return created_at, pk, direction
+
+
+def get_page_size(request):
+    try:
+        size = int(request.GET.get('page_size', settings.COMPLAINTS_PAGE_SIZE))
+    except ValueError:
+        raise InvalidCursor('page_size must be a number')
+    return max(1, min(size, settings.COMPLAINTS_MAX_PAGE_SIZE))
+
+
+def _row_key(row):
+    if isinstance(row, dict):
+        return row['created_at'], row['id']
+    return row.created_at, row.pk
+
+
+class Page:
+    def __init__(self, rows, next_cursor=None, previous_cursor=None):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def link_header(self, request):
+        links = []
+        for rel, cursor in (('next', self.next_cursor), ('prev', self.previous_cursor)):
+            if cursor:
+                params = request.GET.copy()
+                params['cursor'] = cursor
+                links.append(f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="{rel}"')
+        return ', '.join(links)
+
+    def add_headers(self, response, request):
+        link = self.link_header(request)
+        if link:
+            response['Link'] = link
+        return response
+
+
+def paginate(request, queryset):
+    """
+    Return the Page of ``queryset`` selected by the request's ``cursor`` and
+    ``page_size`` parameters, or all of it when the request has neither. Any
+    ordering on the queryset is replaced by newest first. Raises
+    InvalidCursor for malformed parameters.
+    """
+    cursor = request.GET.get('cursor')
+    if not cursor and 'page_size' not in request.GET:
+        return Page(list(queryset.order_by('-created_at', '-id')))
+    size = get_page_size(request)
+
+    if not cursor:
+        rows = list(queryset.order_by('-created_at', '-id')[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        next_cursor = encode_cursor(*_row_key(rows[-1]), 'next') if has_more else None
+        return Page(rows, next_cursor)
+
+    created_at, pk, direction = decode_cursor(cursor)
+    if direction == 'next':
+        after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        rows = list(queryset.filter(after).order_by('-created_at', '-id')[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+    else:
+        before = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        rows = list(queryset.filter(before).order_by('created_at', 'id')[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size][::-1]
+
+    if not rows:
+        return Page(rows)
+    first, last = _row_key(rows[0]), _row_key(rows[-1])
+    if direction == 'next':
+        return Page(
+            rows,
+            next_cursor=encode_cursor(*last, 'next') if has_more else None,
+            previous_cursor=encode_cursor(*first, 'prev'),
+        )
+    return Page(
+        rows,
+        next_cursor=encode_cursor(*last, 'next'),
+        previous_cursor=encode_cursor(*first, 'prev') if has_more else None,
+    )
@@ -0,0 +1,105 @@
+"""
+Maintenance of the ComplaintDailyStats rollup.
+
+Every complaint contributes one ``created`` count to the row for the day it
+was created and, once it has a resolved_at, one ``resolved`` count plus its
+resolution time to the row for the day it was resolved. Saves and deletes
+apply the difference between a complaint's old and new contributions.
+Writes that bypass model signals (``QuerySet.update``, raw SQL) are repaired
+by ``rebuild()``.
+"""
+
+from collections import defaultdict
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Complaint, ComplaintDailyStats
+
+ROLLUP_FIELDS = ('created_at', 'type', 'status', 'resolved_at')
+
+
+def contributions(created_at, type, status, resolved_at):
+    """``{(day, type, status): [created, resolved, resolution_seconds]}`` for one complaint."""
+    rows = defaultdict(lambda: [0, 0, 0.0])
+    if created_at is None:
+        return rows
+    rows[(timezone.localdate(created_at), type, status)][0] += 1
+    if resolved_at is not None:
+        row = rows[(timezone.localdate(resolved_at), type, status)]
+        row[1] += 1
+        row[2] += (resolved_at - created_at).total_seconds()
+    return rows
+
+
+def apply_change(old, new):
+    """
+    Move a complaint's contribution from ``old`` to ``new`` field values.
+    Either side may be None (insert / delete).
+    """
+    delta = defaultdict(lambda: [0, 0, 0.0])
+    for values, sign in ((old, -1), (new, 1)):
+        if values is None:
+            continue
+        for key, amounts in contributions(*(values[f] for f in ROLLUP_FIELDS)).items():
+            for i, amount in enumerate(amounts):
+                delta[key][i] += sign * amount
+
+    for (day, type, status), (created, resolved, seconds) in delta.items():
+        if created or resolved or seconds:
+            _bump(day, type, status, created, resolved, seconds)
+
+
+def _bump(day, type, status, created, resolved, seconds):
+    key = {'day': day, 'type': type, 'status': status}
+    changes = {
+        'created': F('created') + created,
+        'resolved': F('resolved') + resolved,
+        'resolution_seconds': F('resolution_seconds') + seconds,
+    }
+    if ComplaintDailyStats.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            ComplaintDailyStats.objects.create(
+                created=created, resolved=resolved, resolution_seconds=seconds, **key
+            )
+    except IntegrityError:
+        # Another writer created the row first
+        ComplaintDailyStats.objects.filter(**key).update(**changes)
+
+
+def rebuild():
+    """Recompute the whole rollup from the complaints table; returns the row count."""
+    rows = defaultdict(lambda: [0, 0, 0.0])
+
+    created = (
+        Complaint.objects.annotate(day=TruncDate('created_at'))
+        .values('day', 'type', 'status')
+        .annotate(n=Count('id'))
+    )
+    for row in created:
+        rows[(row['day'], row['type'], row['status'])][0] += row['n']
+
+    resolved = (
+        Complaint.objects.filter(resolved_at__isnull=False)
+        .annotate(day=TruncDate('resolved_at'))
+        .values('day', 'type', 'status')
+        .annotate(n=Count('id'), duration=Sum(F('resolved_at') - F('created_at')))
+    )
+    for row in resolved:
+        entry = rows[(row['day'], row['type'], row['status'])]
+        entry[1] += row['n']
+        entry[2] += row['duration'].total_seconds() if row['duration'] else 0.0
+
+    with transaction.atomic():
+        ComplaintDailyStats.objects.all().delete()
+        ComplaintDailyStats.objects.bulk_create([
+            ComplaintDailyStats(
+                day=day, type=type, status=status,
+                created=created, resolved=resolved, resolution_seconds=seconds,
+            )
+            for (day, type, status), (created, resolved, seconds) in rows.items()
+        ], batch_size=1000)
+    return len(rows)
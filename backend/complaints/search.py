@@ -0,0 +1,186 @@
+"""
+Full-text complaint search with relevance ranking.
+
+Each complaint has a ComplaintSearchDocument holding the lower-cased words
+of its SEARCH_FIELDS. complaints.signals keeps it in step with saves, and
+``manage.py rebuild_complaint_search`` recreates the documents after bulk
+changes that bypass signals.
+
+Three backends rank the documents; COMPLAINTS_SEARCH_BACKEND picks one, or
+``auto`` picks by database:
+
+- ``mysql``: a FULLTEXT index, queried in boolean mode.
+- ``sqlite``: an FTS5 table kept in sync by triggers, ranked with bm25.
+- ``python``: scores the candidate documents in Python with BM25. Used
+  where neither index exists; it reads every candidate document.
+
+Every query word must match, as a prefix of a word in the document.
+"""
+
+import math
+import re
+from collections import Counter
+from django.conf import settings
+from django.db import connections
+
+from .models import Complaint, ComplaintSearchDocument
+
+SEARCH_FIELDS = ('type', 'description', 'train_number', 'pnr_number', 'location')
+
+FTS_TABLE = 'complaints_search_fts'
+
+# Words beyond this many in a query are ignored
+MAX_TERMS = 8
+
+# BM25 parameters of the Python backend
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def document_for(values):
+    """The search document of a complaint, given its SEARCH_FIELDS values."""
+    return ' '.join(tokenize(' '.join(values.get(field) or '' for field in SEARCH_FIELDS)))
+
+
+def index_complaint(complaint):
+    values = {field: getattr(complaint, field) for field in SEARCH_FIELDS}
+    ComplaintSearchDocument.objects.update_or_create(
+        complaint_id=complaint.pk, defaults={'document': document_for(values)}
+    )
+
+
+def rebuild(batch_size=1000):
+    """Recreate every search document; returns how many were written."""
+    ComplaintSearchDocument.objects.all().delete()
+    written = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Complaint.objects.filter(pk__gt=last_pk).order_by('pk').values('pk', *SEARCH_FIELDS)[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1]['pk']
+        ComplaintSearchDocument.objects.bulk_create([
+            ComplaintSearchDocument(complaint_id=row['pk'], document=document_for(row)) for row in batch
+        ])
+        written += len(batch)
+    if get_backend() == 'sqlite':
+        with connections[ComplaintSearchDocument.objects.db].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return written
+
+
+_fts_tables = {}
+
+
+def _has_fts_table(connection):
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in _fts_tables:
+        _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def get_backend(using=None):
+    backend = settings.COMPLAINTS_SEARCH_BACKEND
+    if backend != 'auto':
+        return backend
+    connection = connections[using or ComplaintSearchDocument.objects.db]
+    if connection.vendor == 'mysql':
+        return 'mysql'
+    if connection.vendor == 'sqlite' and _has_fts_table(connection):
+        return 'sqlite'
+    return 'python'
+
+
+def _scope(queryset):
+    """SQL and params restricting matches to ``queryset``, or None when it is unfiltered."""
+    if not queryset.query.where:
+        return None
+    return queryset.order_by().values('id').query.sql_with_params()
+
+
+def _fetch_ids(queryset, sql, params, id_column, order, order_params, limit):
+    scope = _scope(queryset)
+    if scope is not None:
+        sql += f' AND {id_column} IN ({scope[0]})'
+        params = [*params, *scope[1]]
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'{sql} ORDER BY {order} LIMIT %s', [*params, *order_params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _mysql_search(queryset, terms, limit):
+    table = ComplaintSearchDocument._meta.db_table
+    query = ' '.join(f'+{term}*' for term in terms)
+    match = 'MATCH(document) AGAINST (%s IN BOOLEAN MODE)'
+    return _fetch_ids(
+        queryset, f'SELECT complaint_id FROM {table} WHERE {match}', [query],
+        'complaint_id', f'{match} DESC, complaint_id DESC', [query], limit,
+    )
+
+
+def _sqlite_search(queryset, terms, limit):
+    # Quoted so FTS5 reads each word literally; the * makes it a prefix
+    query = ' '.join(f'"{term}"*' for term in terms)
+    return _fetch_ids(
+        queryset, f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query],
+        'rowid', 'rank, rowid DESC', [], limit,
+    )
+
+
+def _python_search(queryset, terms, limit):
+    documents = ComplaintSearchDocument.objects.all()
+    if queryset.query.where:
+        documents = documents.filter(complaint__in=queryset.order_by().values('id'))
+
+    total = 0
+    total_length = 0
+    matches = []
+    document_frequency = Counter()
+    for complaint_id, document in documents.values_list('complaint_id', 'document').iterator():
+        words = document.split()
+        total += 1
+        total_length += len(words)
+        frequencies = [sum(1 for word in words if word.startswith(term)) for term in terms]
+        document_frequency.update(i for i, tf in enumerate(frequencies) if tf)
+        if all(frequencies):
+            matches.append((complaint_id, len(words), frequencies))
+    if not matches:
+        return []
+
+    average_length = total_length / total
+    idf = [
+        math.log(1 + (total - document_frequency[i] + 0.5) / (document_frequency[i] + 0.5))
+        for i in range(len(terms))
+    ]
+
+    def score(match):
+        _, length, frequencies = match
+        norm = K1 * (1 - B + B * length / average_length)
+        return sum(idf[i] * tf * (K1 + 1) / (tf + norm) for i, tf in enumerate(frequencies))
+
+    matches.sort(key=lambda match: (-score(match), -match[0]))
+    return [match[0] for match in matches[:limit]]
+
+
+BACKENDS = {
+    'mysql': _mysql_search,
+    'sqlite': _sqlite_search,
+    'python': _python_search,
+}
+
+
+def search_ids(queryset, query, limit):
+    """
+    Ids of the complaints in ``queryset`` that match ``query``, best match
+    first (newest first among equals), at most ``limit`` of them.
+    """
+    terms = tokenize(query)[:MAX_TERMS]
+    if not terms:
+        return []
+    return BACKENDS[get_backend(queryset.db)](queryset, terms, limit)
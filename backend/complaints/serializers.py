@@ -1,16 +1,75 @@
-from rest_framework import serializers
-from .models import Complaint, Feedback, Staff
+from datetime import date
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .models import LOOKUP_COLUMNS, Complaint, Feedback, Staff
 
-class ComplaintSerializer(serializers.ModelSerializer):
+
+def parse_fields(request, available):
+    """
+    Field names requested with ``?fields=a,b,c``, or None when the parameter
+    is absent. Raises ValueError naming any field not in ``available``.
+    """
+    raw = request.GET.get('fields')
+    if not raw:
+        return None
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin for sparse fieldsets: ``fields=[...]`` keeps only
+    those keys, and ``only_columns(fields)`` gives the model columns to pass
+    to ``QuerySet.only()``. ``Meta.field_sources`` maps computed fields to the
+    columns they read.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def field_names(cls):
+        return list(cls().fields)
+
+    @classmethod
+    def only_columns(cls, fields, extra=()):
+        model = cls.Meta.model
+        sources = getattr(cls.Meta, 'field_sources', {})
+        columns = [model._meta.pk.name, *extra]
+        for name in fields:
+            for column in sources.get(name, [name]):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+
+class ComplaintSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Complaint
-        fields = '__all__'
+        # The lookup columns are internal copies of pnr_number and train_number
+        exclude = LOOKUP_COLUMNS
  
     def validate_photos(self, value):
         # Allow both string (filepath) and None values
         if value and not isinstance(value, str):
             raise serializers.ValidationError("Photos must be a valid file path")
         return value
+
+    def validate(self, attrs):
+        # Link a staff name given on its own; Complaint.save() then sets the name from the link
+        if 'staff' in attrs and 'assigned_staff' not in attrs:
+            name = attrs['staff']
+            attrs['assigned_staff'] = (
+                Staff.objects.filter(name=name).order_by('id').first() if name else None
+            )
+        return attrs
  
     def create(self, validated_data):
         return Complaint.objects.create(**validated_data)
@@ -20,12 +79,13 @@ class FeedbackSerializer(serializers.ModelSerializer):
         model = Feedback
         fields = '__all__'
 
-class StaffSerializer(serializers.ModelSerializer):
+class StaffSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     avatar_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Staff
         fields = '__all__'
+        field_sources = {'avatar_url': ['avatar']}
     
     def get_avatar_url(self, obj):
         if obj.avatar:
@@ -39,5 +99,110 @@ class StaffSerializer(serializers.ModelSerializer):
         """Custom representation to include both avatar field and avatar_url"""
         data = super().to_representation(instance)
         # Replace avatar field with the full URL in the response
-        data['avatar'] = self.get_avatar_url(instance)
-        return data
\ No newline at end of file
+        if 'avatar' in self.fields:
+            data['avatar'] = self.get_avatar_url(instance)
+        return data
+
+class ValuesListSerializer:
+    """
+    Read-only fast path for list responses: renders ``QuerySet.values()`` rows
+    with the same keys, order and value formats as ``serializer_class``.
+
+    Each field's converter is compiled once from the serializer's own field
+    objects, so there is no per-row field graph; fields without a known fast
+    conversion fall back to that field's ``to_representation``. Only plain
+    model fields are supported.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._plan = None
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            self._plan = self._compile()
+        return self._plan
+
+    @property
+    def columns(self):
+        """The ``values()`` columns a queryset must select."""
+        return [column for _, column, _ in self.plan]
+
+    def columns_for(self, fields=None, extra=()):
+        """``values()`` columns for a sparse fieldset, plus any ``extra`` the caller needs."""
+        columns = [column for _, column, _ in self._select(fields)]
+        return columns + [column for column in extra if column not in columns]
+
+    def _select(self, fields):
+        if fields is None:
+            return self.plan
+        return [entry for entry in self.plan if entry[0] in fields]
+
+    def _compile(self):
+        model = self.serializer_class.Meta.model
+        plan = []
+        for name, field in self.serializer_class().fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                raise TypeError(f'{name}: method fields need an instance, not a values() row')
+            column = model._meta.get_field(field.source).attname
+            plan.append((name, column, self._converter(field)))
+        return plan
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.DateTimeField):
+            if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601:
+                return field.to_representation
+            return _ISO_DATETIME
+        if isinstance(field, serializers.DateField):
+            if getattr(field, 'format', api_settings.DATE_FORMAT) != ISO_8601:
+                return field.to_representation
+            return date.isoformat
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            return None
+        if isinstance(field, serializers.ChoiceField):
+            choices = field.choice_strings_to_values
+            return lambda value: choices.get(str(value), value) if value != '' else value
+        if isinstance(field, serializers.CharField):
+            return str
+        if isinstance(field, serializers.IntegerField):
+            return int
+        return field.to_representation
+
+    def render(self, rows, fields=None):
+        """Serialize an iterable of ``values()`` dicts, limited to ``fields`` when given."""
+        # Looking up the active time zone is slow, so do it once per call
+        iso_datetime = _iso_datetime_converter(timezone.get_current_timezone())
+        plan = [
+            (name, column, iso_datetime if convert is _ISO_DATETIME else convert)
+            for name, column, convert in self._select(fields)
+        ]
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in plan:
+                value = row[column]
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+    def serialize(self, queryset, fields=None):
+        return self.render(queryset.values(*self.columns_for(fields)), fields)
+
+
+# Placeholder in compiled plans for ISO 8601 datetimes, bound to a time zone at render time
+_ISO_DATETIME = object()
+
+
+def _iso_datetime_converter(tz):
+    # Mirrors DRF's DateTimeField: convert to the current time zone, "Z" for UTC
+    def convert(value):
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+complaint_rows = ValuesListSerializer(ComplaintSerializer)
@@ -0,0 +1,129 @@
+from django.db import transaction
+
+from . import events, suggest
+from .cache import bump_staff_version, bump_version
+from .models import Complaint, ComplaintPrediction, ComplaintTombstone
+from .rollup import ROLLUP_FIELDS, apply_change
+from .search import SEARCH_FIELDS, index_complaint
+
+# Complaints loaded at a time when a Staff rename is carried to them
+RENAME_BATCH_SIZE = 500
+
+
+def remember_rollup_state(sender, instance, raw=False, **kwargs):
+    """
+    Capture the stored values the daily rollup depends on before a Complaint
+    is saved, so post_save can move its contribution rather than re-count.
+    Instances loaded from the database already carry them (Complaint.from_db).
+    """
+    instance._rollup_old = None
+    if raw or instance.pk is None:
+        return
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if all(field in loaded for field in ROLLUP_FIELDS):
+        instance._rollup_old = {field: loaded[field] for field in ROLLUP_FIELDS}
+    else:
+        instance._rollup_old = (
+            sender.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+        )
+
+
+def update_daily_stats(sender, instance, raw=False, **kwargs):
+    """Apply a saved Complaint's change to ComplaintDailyStats."""
+    if raw:
+        return
+    new = {field: getattr(instance, field) for field in ROLLUP_FIELDS}
+    apply_change(getattr(instance, '_rollup_old', None), new)
+    instance._rollup_old = None
+
+
+def remove_from_daily_stats(sender, instance, **kwargs):
+    """Take a deleted Complaint out of ComplaintDailyStats."""
+    apply_change({field: getattr(instance, field) for field in ROLLUP_FIELDS}, None)
+
+
+def record_tombstone(sender, instance, **kwargs):
+    """Leave a ComplaintTombstone so delta-syncing clients learn of the deletion."""
+    ComplaintTombstone.objects.create(complaint_id=instance.pk, user_id=instance.user_id)
+
+
+def bump_complaints_version(sender, instance, raw=False, **kwargs):
+    """Drop cached analytics responses once a Complaint or Staff write commits."""
+    if raw:
+        return
+    transaction.on_commit(bump_version)
+
+
+def rename_assigned_complaints(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    """
+    Carry a Staff member's new name to the staff display name of their
+    complaints. Each complaint goes through save() and is published, so the
+    cache version, change feed, events and suggestions all see the rename.
+    """
+    if raw or created or (update_fields is not None and 'name' not in update_fields):
+        return
+    stale = Complaint.objects.filter(assigned_staff=instance).exclude(staff=instance.name).order_by('pk')
+    last_pk = 0
+    with transaction.atomic():
+        while True:
+            batch = list(stale.filter(pk__gt=last_pk)[:RENAME_BATCH_SIZE])
+            if not batch:
+                return
+            last_pk = batch[-1].pk
+            for complaint in batch:
+                complaint.assigned_staff, complaint.staff = instance, instance.name
+                complaint.save(update_fields=['staff', 'updated_at'])
+                events.publish_complaint(complaint)
+
+
+def bump_staff_directory_version(sender, instance, raw=False, **kwargs):
+    """Change the staff directory ETags once a Staff write commits."""
+    if raw:
+        return
+    transaction.on_commit(bump_staff_version)
+
+
+def update_search_document(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Re-index a saved Complaint when a searched field may have changed."""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    index_complaint(instance)
+
+
+def drop_stale_prediction(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    """Drop a complaint's stored prediction when its description may have changed."""
+    if raw or created:
+        return
+    if update_fields is not None and 'description' not in update_fields:
+        return
+    ComplaintPrediction.objects.filter(complaint=instance).delete()
+
+
+def remember_suggest_state(sender, instance, raw=False, **kwargs):
+    """Capture the stored values feeding the typeahead tries before a save."""
+    instance._suggest_old = None
+    if raw or instance.pk is None:
+        return
+    columns = list(suggest.SOURCES[sender].values())
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if all(column in loaded for column in columns):
+        instance._suggest_old = {column: loaded[column] for column in columns}
+    else:
+        instance._suggest_old = sender.objects.filter(pk=instance.pk).values(*columns).first()
+
+
+def update_suggestions(sender, instance, raw=False, **kwargs):
+    """Move a saved row's values in the typeahead tries once the write commits."""
+    if raw:
+        return
+    new = {column: getattr(instance, column) for column in suggest.SOURCES[sender].values()}
+    suggest.record_change(sender, instance.pk, getattr(instance, '_suggest_old', None), new)
+    instance._suggest_old = None
+
+
+def remove_from_suggestions(sender, instance, **kwargs):
+    """Take a deleted row's values out of the typeahead tries once the delete commits."""
+    old = {column: getattr(instance, column) for column in suggest.SOURCES[sender].values()}
+    suggest.record_change(sender, instance.pk, old, None)
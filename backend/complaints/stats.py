@@ -0,0 +1,134 @@
+"""
+Aggregate queries behind the admin dashboard endpoints.
+
+Each helper issues a fixed number of queries no matter how many complaints,
+staff or days are involved: counts use conditional aggregation
+(``Count(filter=Q(...))``), averages are computed by the database and
+per-day series are read from the ComplaintDailyStats rollup.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+
+from .models import Complaint, ComplaintDailyStats, Staff
+
+OPEN_STATUSES = ['Open', 'In Progress']
+
+RESOLUTION_TIME = ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField())
+
+
+def day_start(day):
+    """Aware datetime at the start of ``day`` in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def complaint_summary(now=None):
+    """Status counts, today's activity, escalations and resolution time in one query."""
+    now = now or timezone.now()
+    today_start = day_start(timezone.localdate(now))
+    tomorrow_start = today_start + timedelta(days=1)
+
+    summary = Complaint.objects.aggregate(
+        total=Count('id'),
+        open=Count('id', filter=Q(status='Open')),
+        in_progress=Count('id', filter=Q(status='In Progress')),
+        closed=Count('id', filter=Q(status='Closed')),
+        today=Count('id', filter=Q(created_at__gte=today_start, created_at__lt=tomorrow_start)),
+        today_resolved=Count('id', filter=Q(
+            status='Closed', resolved_at__gte=today_start, resolved_at__lt=tomorrow_start
+        )),
+        pending_escalations=Count('id', filter=Q(
+            status__in=OPEN_STATUSES, created_at__lt=now - timedelta(hours=48)
+        )),
+        average_resolution=Avg(RESOLUTION_TIME, filter=Q(
+            status='Closed', resolved_at__isnull=False, created_at__isnull=False
+        )),
+    )
+    return summary
+
+
+def staff_summary():
+    """Total and active staff from the Staff directory and from staff/admin user accounts."""
+    User = get_user_model()
+    from_staff = Staff.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='active')),
+    )
+    from_users = User.objects.filter(user_type__in=['admin', 'staff']).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+    )
+    return from_staff, from_users
+
+
+def complaints_by_staff():
+    """Assigned and Closed complaint counts keyed by assigned_staff id, in one grouped query."""
+    rows = (
+        Complaint.objects.filter(assigned_staff__isnull=False)
+        .values('assigned_staff')
+        .annotate(
+            assigned=Count('id'),
+            resolved=Count('id', filter=Q(status='Closed')),
+        )
+        .order_by()
+    )
+    return {row['assigned_staff']: row for row in rows}
+
+
+def department_summary():
+    """Total and active staff per department, in one grouped query."""
+    return list(
+        Staff.objects.values('department')
+        .annotate(
+            total_staff=Count('id'),
+            active_staff=Count('id', filter=Q(status='active')),
+        )
+        .order_by('department')
+    )
+
+
+def daily_trends(days, today=None):
+    """
+    Per-day counts for the last ``days`` days, oldest first, read in one query
+    from the ComplaintDailyStats rollup: complaints created that day (in total
+    and still Open / In Progress) and complaints resolved that day (in total
+    and currently Closed).
+    """
+    today = today or timezone.localdate()
+    first_day = today - timedelta(days=days - 1)
+
+    rows = (
+        ComplaintDailyStats.objects.filter(day__gte=first_day, day__lte=today)
+        .values('day')
+        .annotate(
+            total_created=Sum('created'),
+            open=Sum('created', filter=Q(status='Open')),
+            in_progress=Sum('created', filter=Q(status='In Progress')),
+            total_resolved=Sum('resolved'),
+            closed=Sum('resolved', filter=Q(status='Closed')),
+        )
+    )
+    by_day = {row['day']: row for row in rows}
+
+    trends = []
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        row = by_day.get(day, {})
+        trends.append({
+            'date': day,
+            'open': row.get('open') or 0,
+            'in_progress': row.get('in_progress') or 0,
+            'closed': row.get('closed') or 0,
+            'resolved': row.get('total_resolved') or 0,
+            'total_created': row.get('total_created') or 0,
+        })
+    return trends
+
+
+def format_hours(duration, precision=1):
+    """Render an average resolution timedelta the way the dashboards expect ("12.5h")."""
+    if duration is None:
+        return "0h"
+    return f"{duration.total_seconds() / 3600:.{precision}f}h"
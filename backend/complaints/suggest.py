@@ -0,0 +1,283 @@
+"""
+Typeahead suggestions for complaint types, train numbers and locations.
+
+Each worker keeps one prefix trie per field in memory, built from the
+database in the background after first use (only the categories are
+suggested until it is done): complaint types plus COMPLAINT_CATEGORIES, train
+numbers, and complaint and staff locations. Every node holds the
+COMPLAINTS_SUGGEST_LIMIT most frequent values below it, so a lookup is a
+walk down the prefix and never touches the database.
+
+Multi-word values are also reachable from each later word ("delhi" finds
+"New Delhi"). Matching ignores case and repeated spaces.
+
+Admin and staff users are answered from these shared tries. Passengers get
+tries built per request from their own complaints and the categories, since
+the shared ones count other users' free-text locations and trains.
+
+complaints.signals applies each committed Complaint and Staff write to the
+local tries and bumps a shared version. A worker that sees the version moved
+by another worker (checked at most every COMPLAINTS_SUGGEST_CHECK_INTERVAL
+seconds) rebuilds its tries in the background, serving the old ones until
+the new ones are ready. Writes that bypass signals are picked up by the
+next rebuild of each worker.
+"""
+
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_version, current_version
+from .models import COMPLAINT_CATEGORIES, Complaint, Staff
+
+VERSION_KEY = 'complaints:suggest-version'
+
+# Suggestion field -> the column feeding it, per model
+SOURCES = {
+    Complaint: {'type': 'type', 'train': 'train_number', 'location': 'location'},
+    Staff: {'location': 'location'},
+}
+FIELDS = ('type', 'train', 'location')
+
+
+def normalize(value):
+    return ' '.join(str(value or '').casefold().split())
+
+
+class _Node:
+    __slots__ = ('children', 'terms', 'top')
+
+    def __init__(self):
+        self.children = {}
+        # Normalized values reachable by ending the walk here
+        self.terms = set()
+        # The most frequent values in this subtree, best first
+        self.top = []
+
+
+class PrefixTrie:
+    """Values with counts, completed from any prefix of any of their words."""
+
+    def __init__(self, size):
+        self.size = size
+        self.counts = Counter()
+        self.display = {}
+        self.pinned = set()
+        self._root = _Node()
+
+    def add(self, value, delta=1, pin=False):
+        term = normalize(value)
+        if not term:
+            return
+        present = self.counts[term] > 0 or term in self.pinned
+        if pin:
+            self.pinned.add(term)
+        self.counts[term] += delta
+        if term not in self.display or pin:
+            self.display[term] = ' '.join(str(value).split())
+        keep = self.counts[term] > 0 or term in self.pinned
+        if keep or present:
+            for key in self._keys(term):
+                self._update(key, term, keep)
+        if not keep:
+            del self.counts[term]
+            self.display.pop(term, None)
+
+    def remove(self, value):
+        self.add(value, -1)
+
+    def complete(self, prefix, limit):
+        """Up to ``limit`` (value, count) pairs starting with ``prefix``, most frequent first."""
+        node = self._root
+        for char in normalize(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [(self.display[term], self.counts[term]) for term in node.top[:limit]]
+
+    @staticmethod
+    def _keys(term):
+        # The whole value and the rest of it from each later word
+        yield term
+        for index, char in enumerate(term):
+            if char == ' ':
+                yield term[index + 1:]
+
+    def _update(self, key, term, keep):
+        path = [self._root]
+        for char in key:
+            path.append(path[-1].children.setdefault(char, _Node()))
+        if keep:
+            path[-1].terms.add(term)
+        else:
+            path[-1].terms.discard(term)
+        # Only the nodes on this path can change their top values
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            if not node.terms and not node.children and depth:
+                del path[depth - 1].children[key[depth - 1]]
+                continue
+            node.top = self._rank(node)
+
+    def _rank(self, node):
+        candidates = set(node.terms)
+        for child in node.children.values():
+            candidates.update(child.top)
+        return sorted(candidates, key=lambda term: (-self.counts[term], self.display[term]))[:self.size]
+
+
+def snapshot():
+    """Every source row's suggestion columns, as ``{(model, pk): {column: value}}``."""
+    rows = {}
+    for model, columns in SOURCES.items():
+        names = list(columns.values())
+        for pk, *values in model.objects.values_list('pk', *names).iterator(chunk_size=2000):
+            rows[(model, pk)] = dict(zip(names, values))
+    return rows
+
+
+def build(rows):
+    """Fresh tries for FIELDS from ``rows``, as returned by snapshot(), plus the categories."""
+    tries = {field: PrefixTrie(settings.COMPLAINTS_SUGGEST_LIMIT) for field in FIELDS}
+    for category in COMPLAINT_CATEGORIES:
+        tries['type'].add(category, 0, pin=True)
+    counts = {field: Counter() for field in FIELDS}
+    for (model, _), values in rows.items():
+        for field, column in SOURCES[model].items():
+            if values[column] is not None:
+                counts[field][values[column]] += 1
+    for field, values in counts.items():
+        for value, count in values.items():
+            tries[field].add(value, count)
+    return tries
+
+
+def own_tries(user_id):
+    """
+    Tries for one passenger: COMPLAINT_CATEGORIES and the values of their own
+    complaints only, so no one is offered what other users have filed.
+    """
+    columns = list(SOURCES[Complaint].values())
+    complaints = Complaint.objects.filter(user_id=user_id) if user_id is not None else Complaint.objects.none()
+    rows = {(Complaint, pk): dict(zip(columns, values)) for pk, *values in complaints.values_list('pk', *columns)}
+    return build(rows)
+
+
+def _move_row(tries, rows, key, values):
+    # Set the row to ``values`` (None once deleted) in a snapshot and the tries built from it
+    model = key[0]
+    old = rows.pop(key, None)
+    if values is not None:
+        rows[key] = values
+    for field, column in SOURCES[model].items():
+        if old is not None and old[column] is not None:
+            tries[field].remove(old[column])
+        if values is not None and values[column] is not None:
+            tries[field].add(values[column])
+
+
+class Suggestions:
+    """The tries of this worker, kept in step with writes here and elsewhere."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._tries = None
+            self._version = None
+            self._checked_at = 0.0
+            # Rows written here while a rebuild runs, as ((model, pk), values)
+            self._pending = None
+
+    def complete(self, field, prefix, limit):
+        return self._current()[field].complete(prefix, limit)
+
+    def _current(self):
+        tries = self._tries
+        if tries is None:
+            self._first_build()
+            tries = self._tries
+            # Nothing but the categories is suggested until the first build is done
+            return tries if tries is not None else build({})
+        if time.monotonic() - self._checked_at >= settings.COMPLAINTS_SUGGEST_CHECK_INTERVAL:
+            self._check()
+        return tries
+
+    def _first_build(self):
+        with self._lock:
+            if self._tries is not None or self._pending is not None:
+                return
+            self._checked_at = time.monotonic()
+            self._pending = []
+        self._start()
+
+    def _check(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self._pending is not None or current_version(VERSION_KEY) == self._version:
+                return
+            self._pending = []
+        self._start()
+
+    def _start(self):
+        # Builds read the whole complaints table, so never in a request
+        threading.Thread(target=self._rebuild, name='complaint-suggest-rebuild', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            version = current_version(VERSION_KEY)
+            rows = snapshot()
+            tries = build(rows)
+        except Exception:
+            # Keep serving the old tries; the next check retries
+            with self._lock:
+                self._pending = None
+            return
+        with self._lock:
+            # A write may have committed before the snapshot read its row, or after. Replaying
+            # it as the row's new values rather than as a change counts it once either way.
+            for key, values in self._pending or ():
+                _move_row(tries, rows, key, values)
+            self._tries, self._version, self._pending = tries, version, None
+
+    def changed(self, key, values, changes):
+        """
+        Apply a committed write of the row ``key`` = (model, pk), now holding
+        ``values`` (None once deleted), whose suggestion fields changed as
+        (field, old value, new value) ``changes``; then tell other workers.
+        """
+        with self._lock:
+            if self._tries is not None:
+                for field, old, new in changes:
+                    if old is not None:
+                        self._tries[field].remove(old)
+                    if new is not None:
+                        self._tries[field].add(new)
+            if self._pending is not None:
+                self._pending.append((key, values))
+        version = bump_version(VERSION_KEY)
+        with self._lock:
+            # Skip a rebuild for our own bump, unless another worker's came in between
+            if self._version == version - 1:
+                self._version = version
+
+
+suggestions = Suggestions()
+
+
+def record_change(model, pk, old, new):
+    """
+    Queue the suggestion changes of the ``model`` row ``pk`` going from
+    ``old`` to ``new`` column values (None for a creation or deletion) for commit.
+    """
+    changes = [
+        (field, old and old.get(column), new and new.get(column))
+        for field, column in SOURCES[model].items()
+        if normalize(old and old.get(column)) != normalize(new and new.get(column))
+    ]
+    if changes:
+        transaction.on_commit(lambda: suggestions.changed((model, pk), new, changes))
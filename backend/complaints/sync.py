@@ -0,0 +1,93 @@
+"""
+Delta sync for polling clients: the complaints changed since a token.
+
+A token is an opaque position ``(updated_at, id)``. A sync returns the
+complaints past that position in (updated_at, id) order, at most one page of
+them, the ids of complaints deleted since its time (from ComplaintTombstone),
+and the token for the next call.
+
+Rows are stamped with updated_at before their transaction commits, so a row
+can become visible with a time just behind one already handed out. Once a
+sync is caught up, the next token therefore lags the current time by
+COMPLAINTS_CHANGES_LAG seconds; rows in that window are sent again on the
+next call, and clients apply changes and deletions idempotently by id.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class TokenExpired(Exception):
+    """The token predates the tombstones still kept; the client must resync in full."""
+
+
+def encode_token(updated_at, pk):
+    raw = json.dumps([updated_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Return ``(updated_at, pk)``; raises InvalidToken."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        updated_at, pk = json.loads(raw)
+        updated_at = datetime.fromisoformat(updated_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidToken('Invalid since token') from e
+    if timezone.is_naive(updated_at):
+        raise InvalidToken('Invalid since token')
+    return updated_at, pk
+
+
+class Changes:
+    def __init__(self, rows, deleted, token, has_more=False):
+        self.rows = rows
+        self.deleted = deleted
+        self.token = token
+        self.has_more = has_more
+
+
+def _caught_up_position(position):
+    # Move the token up to COMPLAINTS_CHANGES_LAG behind now, never back
+    lagged = (timezone.now() - timedelta(seconds=settings.COMPLAINTS_CHANGES_LAG), 0)
+    return max(position, lagged)
+
+
+def changes_since(token, complaints, tombstones, limit):
+    """
+    Return the Changes to ``complaints`` (a values() queryset carrying
+    ``updated_at`` and ``id``) and ``tombstones`` since ``token``. Without a
+    token nothing is returned but a token to start syncing from.
+    """
+    if not token:
+        lagged = timezone.now() - timedelta(seconds=settings.COMPLAINTS_CHANGES_LAG)
+        return Changes([], [], encode_token(lagged, 0))
+
+    updated_at, pk = decode_token(token)
+    retention = timedelta(days=settings.COMPLAINTS_TOMBSTONE_RETENTION_DAYS)
+    if updated_at < timezone.now() - retention:
+        raise TokenExpired('since token has expired, fetch the full list again')
+
+    after = Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+    rows = list(complaints.filter(after).order_by('updated_at', 'id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    deleted = list(
+        tombstones.filter(deleted_at__gte=updated_at).order_by('id').values_list('complaint_id', flat=True)
+    )
+
+    if has_more:
+        position = (rows[-1]['updated_at'], rows[-1]['id'])
+    else:
+        position = _caught_up_position((updated_at, pk))
+    return Changes(rows, deleted, encode_token(*position), has_more)
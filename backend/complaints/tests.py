@@ -1,3 +1,1345 @@
-from django.test import TestCase
+"""
+Tests for complaints views.
 
-# Create your tests here.
+The Firebase token check is patched out; requests authenticate as the user
+whose firebase_uid the test passes to ``login``.
+"""
+
+from asgiref.sync import async_to_sync
+from django.contrib.admin.sites import site as admin_site
+from django.core.cache import cache
+from django.apps import apps
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from datetime import timedelta
+from io import StringIO
+import asyncio
+import csv
+import gzip
+import importlib
+import json
+import re
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+from firebase_admin import auth
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.identity_cache import identity_cache
+from backend.renderers import ORJSONRenderer
+from .admin import ComplaintAdmin
+from .models import (
+    ClassificationCorrection, Complaint, ComplaintDailyStats, ComplaintPrediction, ComplaintTombstone, Staff,
+)
+from . import classifier, events, export, lookup, search, stats, suggest, sync, views
+from .cache import bump_version, single_flight
+from .serializers import ComplaintSerializer, complaint_rows
+
+User = get_user_model()
+
+
+class EventFeed:
+    """An events.AsyncSubscription read from synchronous test code through its own event loop."""
+
+    def __init__(self, user_id=None):
+        self.loop = asyncio.new_event_loop()
+        self.subscription = self.loop.run_until_complete(self._subscribe(user_id))
+
+    @staticmethod
+    async def _subscribe(user_id):
+        return events.broker.subscribe(events.AsyncSubscription(user_id))
+
+    def get(self):
+        """The next event, RESYNC, or None when none arrives within 10ms."""
+        return self.loop.run_until_complete(self.subscription.get(0.01))
+
+    def close(self):
+        events.broker.unsubscribe(self.subscription)
+        self.loop.close()
+
+
+class FirebaseAPITestCase(TestCase):
+    """Base class giving tests an admin user and an authenticated client."""
+
+    def setUp(self):
+        identity_cache.clear()
+        self.addCleanup(identity_cache.clear)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create_user(
+            email='admin@example.com',
+            firebase_uid='admin_uid',
+            user_type='admin',
+            is_admin=True,
+            is_staff=True
+        )
+        self.login('admin_uid', 'admin@example.com')
+
+    def login(self, firebase_uid, email):
+        patcher = patch(
+            'accounts.middleware.verify_id_token',
+            return_value={'uid': firebase_uid, 'email': email}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, path, **params):
+        return self.client.get(path, params, HTTP_AUTHORIZATION='Bearer token', secure=True)
+
+    def make_complaint(self, **fields):
+        data = {
+            'type': 'Coach - Cleanliness',
+            'description': 'Dirty coach',
+            'train_number': '12345',
+            'pnr_number': '1234567890',
+            'location': 'Delhi',
+            'date_of_incident': timezone.localdate(),
+        }
+        data.update(fields)
+        return Complaint.objects.create(**data)
+
+
+class AdminDashboardStatsTest(FirebaseAPITestCase):
+    """Test the admin dashboard statistics endpoint."""
+
+    url = '/api/complaints/admin/dashboard-stats/'
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        Staff.objects.create(name='A', email='a@rail.in', phone='1', role='Agent', department='Ops')
+        self.make_complaint(status='Open')
+        self.make_complaint(status='In Progress', created_at=now - timedelta(days=3))
+        self.make_complaint(
+            status='Closed', created_at=now - timedelta(hours=10), resolved_at=now - timedelta(hours=4)
+        )
+
+    def test_counts_and_resolution_time(self):
+        data = self.get(self.url).json()
+        self.assertEqual(data['totalComplaints'], 3)
+        self.assertEqual(data['openComplaints'], 1)
+        self.assertEqual(data['inProgressComplaints'], 1)
+        self.assertEqual(data['closedComplaints'], 1)
+        self.assertEqual(data['pendingEscalations'], 1)
+        self.assertEqual(data['resolutionRate'], 33.33)
+        self.assertEqual(data['averageResolutionTime'], '6.0h')
+        self.assertEqual(len(data['complaintTrends']), 30)
+        today = data['complaintTrends'][-1]
+        self.assertEqual(today['date'], timezone.localdate().strftime('%Y-%m-%d'))
+        self.assertEqual(today['open'], 1)
+
+    def test_query_count_does_not_grow_with_data(self):
+        self.get(self.url)
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.get(self.url)
+        for day in range(40):
+            self.make_complaint(created_at=timezone.now() - timedelta(days=day))
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.get(self.url)
+
+
+
+class AdminPerformanceMetricsTest(FirebaseAPITestCase):
+    """Test the per-staff and per-department performance tables."""
+
+    def add_staff(self, name, department, status='active'):
+        return Staff.objects.create(
+            name=name, email=f'{name}@rail.in', phone='1', role='Agent', department=department, status=status
+        )
+
+    def fetch(self):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.admin)
+        return views.admin_performance_metrics(request).data
+
+    def test_staff_and_department_counts(self):
+        asha = self.add_staff('asha', 'Ops')
+        ravi = self.add_staff('ravi', 'Ops', status='inactive')
+        self.add_staff('meena', 'Security')
+        self.make_complaint(assigned_staff=asha, status='Closed')
+        self.make_complaint(assigned_staff=asha)
+        self.make_complaint(assigned_staff=ravi, status='Closed')
+
+        data = self.fetch()
+        self.assertEqual([row['name'] for row in data['staff_performance']], ['asha', 'meena'])
+        asha = data['staff_performance'][0]
+        self.assertEqual((asha['assigned_complaints'], asha['resolved_complaints'], asha['resolution_rate']), (2, 1, 50.0))
+        ops, security = data['department_stats']
+        self.assertEqual((ops['total_staff'], ops['active_staff']), (2, 1))
+        self.assertEqual((ops['complaints_handled'], ops['complaints_resolved']), (3, 2))
+        self.assertEqual(security['complaints_handled'], 0)
+
+    def test_query_count_does_not_grow_with_staff(self):
+        with self.assertNumQueries(4):
+            self.fetch()
+        for i in range(20):
+            self.make_complaint(assigned_staff=self.add_staff(f'staff{i}', f'Dept{i % 4}'))
+        with self.assertNumQueries(4):
+            self.fetch()
+
+
+
+class AssignedStaffTest(FirebaseAPITestCase):
+    """Test the assigned_staff link between complaints and the staff directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.asha = Staff.objects.create(name='asha', email='asha@rail.in', phone='1', role='Agent', department='Ops')
+
+    def test_backfill_resolves_names_in_batches(self):
+        migration = importlib.import_module('complaints.migrations.0020_backfill_assigned_staff')
+        matched = [self.make_complaint(staff='asha') for _ in range(3)]
+        unknown = self.make_complaint(staff='nobody')
+        with patch.object(migration, 'BATCH_SIZE', 2):
+            migration.backfill_assigned_staff(apps, None)
+        self.assertEqual(Complaint.objects.filter(assigned_staff=self.asha).count(), len(matched))
+        unknown.refresh_from_db()
+        self.assertIsNone(unknown.assigned_staff)
+
+    def test_serializer_keeps_name_and_link_in_step(self):
+        complaint = self.make_complaint()
+        serializer = ComplaintSerializer(complaint, data={'staff': 'asha'}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.save().assigned_staff, self.asha)
+
+        serializer = ComplaintSerializer(complaint, data={'assigned_staff': None}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertIsNone(serializer.save().staff)
+
+    def test_save_derives_the_name_from_the_link(self):
+        complaint = self.make_complaint(assigned_staff=self.asha, staff='someone else')
+        self.assertEqual(complaint.staff, 'asha')
+
+        complaint = Complaint.objects.get(pk=complaint.pk)
+        complaint.assigned_staff = None
+        complaint.save()
+        self.assertIsNone(Complaint.objects.get(pk=complaint.pk).staff)
+
+        # A name with no Staff row is kept as given
+        self.assertEqual(self.make_complaint(staff='nobody').staff, 'nobody')
+
+    def test_rename_reaches_assigned_complaints(self):
+        complaint = self.make_complaint(assigned_staff=self.asha)
+        updated_at = complaint.updated_at
+        feed = EventFeed()
+        self.addCleanup(feed.close)
+        self.asha.name = 'Asha Rao'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.asha.save()
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.staff, 'Asha Rao')
+        self.assertGreater(complaint.updated_at, updated_at)
+        self.assertEqual(feed.get()['complaint']['staff'], 'Asha Rao')
+
+    def test_admin_form_keeps_name_and_link_in_step(self):
+        complaint = self.make_complaint()
+        model_admin = ComplaintAdmin(Complaint, admin_site)
+        self.assertIn('staff', model_admin.get_readonly_fields(None, complaint))
+        complaint.assigned_staff = self.asha
+        model_admin.save_model(None, complaint, None, change=True)
+        self.assertEqual(Complaint.objects.get(pk=complaint.pk).staff, 'asha')
+
+    def test_admin_complaints_filter_by_staff(self):
+        self.make_complaint(assigned_staff=self.asha)
+        self.make_complaint()
+        request = APIRequestFactory().get('/', {'staff': self.asha.id})
+        force_authenticate(request, user=self.admin)
+        self.assertEqual(len(views.admin_get_all_complaints(request).data), 1)
+
+    def test_admin_complaints_filter_by_staff_name(self):
+        self.make_complaint(assigned_staff=self.asha)
+        self.make_complaint(staff='nobody')
+        self.make_complaint()
+        for name, expected in (('asha', 1), ('nobody', 1), ('stranger', None)):
+            request = APIRequestFactory().get('/', {'staff': name})
+            force_authenticate(request, user=self.admin)
+            response = views.admin_get_all_complaints(request)
+            if expected is None:
+                self.assertEqual(response.status_code, 400)
+            else:
+                self.assertEqual(len(response.data), expected, name)
+
+
+class ComplaintIndexTest(TestCase):
+    """Test that the hot complaint queries are served by an index."""
+
+    def test_hot_queries_avoid_full_scans(self):
+        call_command('check_complaint_indexes', stdout=StringIO())
+
+
+class ComplaintSaveTest(FirebaseAPITestCase):
+    """Test change tracking in Complaint.save()."""
+
+    def complaint_queries(self, complaint):
+        with CaptureQueriesContext(connection) as context:
+            complaint.save()
+        return [q['sql'] for q in context.captured_queries if '"complaints_complaint"' in q['sql']]
+
+    def test_closing_writes_only_changed_columns_without_a_select(self):
+        complaint = Complaint.objects.get(pk=self.make_complaint().pk)
+        complaint.status = 'Closed'
+        queries = self.complaint_queries(complaint)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('UPDATE'))
+        self.assertNotIn('"description"', queries[0])
+        self.assertIsNotNone(complaint.resolved_at)
+        self.assertEqual(Complaint.objects.get(pk=complaint.pk).resolved_at, complaint.resolved_at)
+
+    def test_unchanged_instance_only_touches_updated_at(self):
+        complaint = Complaint.objects.get(pk=self.make_complaint().pk)
+        updated_at = complaint.updated_at
+        queries = self.complaint_queries(complaint)
+        self.assertEqual(len(queries), 1)
+        self.assertRegex(queries[0], r'^UPDATE "complaints_complaint" SET "updated_at" = [^,]+ WHERE')
+        self.assertGreater(Complaint.objects.get(pk=complaint.pk).updated_at, updated_at)
+
+    def test_explicit_resolved_at_is_kept(self):
+        resolved_at = timezone.now() - timedelta(hours=1)
+        complaint = self.make_complaint(status='Closed', resolved_at=resolved_at)
+        self.assertEqual(complaint.resolved_at, resolved_at)
+        self.assertIsNotNone(self.make_complaint(status='Closed').resolved_at)
+
+    def test_reclosing_stamps_a_new_resolution_time(self):
+        complaint = self.make_complaint(status='Closed', resolved_at=timezone.now() - timedelta(days=1))
+        complaint.status = 'Open'
+        complaint.save()
+        complaint.refresh_from_db()
+        complaint.status = 'Closed'
+        complaint.save()
+        self.assertGreater(complaint.resolved_at, timezone.now() - timedelta(minutes=1))
+
+
+class CursorPaginationTest(FirebaseAPITestCase):
+    """Test keyset pagination of the complaint lists."""
+
+    url = '/api/complaints/user/'
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        # Two complaints share each timestamp so the id tie-break matters
+        for i in range(7):
+            self.make_complaint(created_at=now - timedelta(minutes=i // 2))
+        self.newest_first = list(
+            Complaint.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def links(self, response):
+        return dict(
+            (rel, url.replace('https://testserver', ''))
+            for url, rel in re.findall(r'<([^>]+)>; rel="(\w+)"', response.get('Link', ''))
+        )
+
+    def follow(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION='Bearer token', secure=True)
+
+    def test_walks_forwards_and_back(self):
+        response = self.get(self.url, page_size=3)
+        pages = [[c['id'] for c in response.json()]]
+        while 'next' in self.links(response):
+            response = self.follow(self.links(response)['next'])
+            pages.append([c['id'] for c in response.json()])
+        self.assertEqual(sum(pages, []), self.newest_first)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+        response = self.follow(self.links(response)['prev'])
+        self.assertEqual([c['id'] for c in response.json()], pages[1])
+
+    def test_new_complaints_do_not_shift_later_pages(self):
+        first = self.get(self.url, page_size=3)
+        self.make_complaint()
+        second = self.follow(self.links(first)['next'])
+        self.assertEqual([c['id'] for c in second.json()], self.newest_first[3:6])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.get(self.url, cursor='not-a-cursor').status_code, 400)
+
+    @override_settings(COMPLAINTS_PAGE_SIZE=3)
+    def test_unpaged_requests_get_the_whole_list(self):
+        for url in (self.url, '/api/complaints/'):
+            response = self.get(url)
+            self.assertEqual([c['id'] for c in response.json()], self.newest_first, url)
+            self.assertFalse(response.has_header('Link'))
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.admin)
+        response = views.admin_get_all_complaints(request)
+        self.assertEqual([c['id'] for c in response.data], self.newest_first)
+        self.assertFalse(response.has_header('Link'))
+
+    def test_complaint_list_is_paginated(self):
+        response = self.get('/api/complaints/', page_size=2)
+        self.assertEqual([c['id'] for c in response.json()], self.newest_first[:2])
+        self.assertIn('next', self.links(response))
+
+
+class ComplaintExportTest(FirebaseAPITestCase):
+    """Test the streaming complaint export."""
+
+    url = '/api/complaints/admin/complaints/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.open = [self.make_complaint(status='Open') for _ in range(5)]
+        self.make_complaint(status='Closed')
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_with_filters(self):
+        response = self.get(self.url, status='Open')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [c.id for c in self.open])
+        self.assertIn('assigned_staff_id', rows[0])
+
+    def test_csv(self):
+        lines = list(csv.reader(self.content(self.get(self.url, format='csv')).splitlines()))
+        self.assertEqual(lines[0], export.EXPORT_FIELDS)
+        self.assertEqual(len(lines), 7)
+
+    def test_since_filters_on_updated_at(self):
+        Complaint.objects.filter(pk=self.open[0].pk).update(updated_at=timezone.now() - timedelta(days=3))
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(len(self.content(self.get(self.url, since=since)).splitlines()), 5)
+        self.assertEqual(self.get(self.url, since='yesterday').status_code, 400)
+
+    def test_reads_in_keyset_batches(self):
+        with self.settings(COMPLAINTS_EXPORT_CHUNK_SIZE=2), self.assertNumQueries(4):
+            rows = list(export.iter_rows(Complaint.objects.all()))
+        self.assertEqual(len(rows), 6)
+
+    def test_requires_admin(self):
+        User.objects.create_user(email='user@example.com', firebase_uid='user_uid')
+        self.login('user_uid', 'user@example.com')
+        self.assertEqual(self.get(self.url).status_code, 403)
+
+
+class ValuesListSerializerTest(FirebaseAPITestCase):
+    """Test that the values() list serializer matches ComplaintSerializer exactly."""
+
+    def test_matches_complaint_serializer(self):
+        staff = Staff.objects.create(name='asha', email='asha@rail.in', phone='1', role='Agent', department='Ops')
+        self.make_complaint(user=self.admin, assigned_staff=staff, staff='asha', status='Closed')
+        self.make_complaint(train_number=None, pnr_number=None, location=None)
+        queryset = Complaint.objects.order_by('id')
+
+        for zone in ('UTC', 'Asia/Kolkata'):
+            with timezone.override(zone):
+                expected = ComplaintSerializer(queryset, many=True).data
+                actual = complaint_rows.serialize(queryset)
+                self.assertEqual([list(row.items()) for row in actual], [list(row.items()) for row in expected])
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command('benchmark_complaint_serializer', rows=20, repeat=1, stdout=out)
+        self.assertIn('us/row', out.getvalue())
+        self.assertFalse(Complaint.objects.exists())
+
+
+class SparseFieldsTest(FirebaseAPITestCase):
+    """Test that ?fields= limits both the columns selected and the keys returned."""
+
+    def test_complaint_list_fields(self):
+        self.make_complaint(user=self.admin)
+        response = self.get('/api/complaints/user/', fields='id,type,status')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()[0]), ['id', 'type', 'status'])
+
+        response = self.get('/api/complaints/user/', fields='id,bogus')
+        self.assertEqual(response.status_code, 400)
+
+    def test_complaint_detail_fields(self):
+        complaint = self.make_complaint(user=self.admin)
+        response = self.get(f'/api/complaints/{complaint.id}/', fields='description')
+        self.assertEqual(response.json(), {'description': 'Dirty coach'})
+
+        response = self.get('/api/complaints/', fields='id,pnr_number')
+        self.assertEqual(response.json(), [{'id': complaint.id, 'pnr_number': '1234567890'}])
+
+    def test_staff_fields_select_only_those_columns(self):
+        staff = Staff.objects.create(name='asha', email='asha@rail.in', phone='1', role='Agent', department='Ops')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('/api/complaints/staff/', fields='id,name')
+        self.assertEqual(response.json(), [{'id': staff.id, 'name': 'asha'}])
+        sql = [query['sql'] for query in queries if 'complaints_staff' in query['sql']][-1]
+        self.assertNotIn('email', sql)
+
+        response = self.get(f'/api/complaints/admin/staff/{staff.id}/', fields='email')
+        self.assertEqual(response.json(), {'email': 'asha@rail.in'})
+        self.assertEqual(self.get('/api/complaints/staff/', fields='salary').status_code, 400)
+
+
+
+class RenderingTest(FirebaseAPITestCase):
+    """Test that the orjson renderer matches JSONRenderer and that large responses are gzipped."""
+
+    def assertRendersIdentically(self, data, accepted_media_type=None):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(ORJSONRenderer().render(data, accepted_media_type), expected)
+
+    def test_matches_json_renderer(self):
+        now = timezone.now()
+        self.assertRendersIdentically({
+            'created_at': now,
+            'naive': now.replace(tzinfo=None, microsecond=123456),
+            'date': now.date(),
+            'time': now.time(),
+            'amount': Decimal('12.50'),
+            'id': uuid.UUID(int=1),
+            'text': 'कोच गंदा है \u2028 "quoted" \n',
+            'label': gettext_lazy('Open'),
+            'by_staff': {1: 2, 3: 4.5},
+            'nested': [(1, 2), None, True, False, 0.1, -7],
+        })
+        # Beyond orjson's range: handed to JSONRenderer
+        self.assertRendersIdentically({'big': 2 ** 70})
+        self.assertRendersIdentically({'indented': [1, 2]}, 'application/json; indent=4')
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_non_finite_floats_are_rejected(self):
+        for data in ({'ratio': float('nan')}, {'rows': [{'average': None}, {'average': float('inf')}]}):
+            for renderer in (JSONRenderer(), ORJSONRenderer()):
+                with self.assertRaises(ValueError):
+                    renderer.render(data, 'application/json')
+        self.assertRendersIdentically({'average': None, 'ratio': 1.5})
+
+    def test_api_responses_match(self):
+        for index in range(20):
+            self.make_complaint(user=self.admin, description=f'Complaint {index} – ☕')
+        for url in ('/api/complaints/user/', '/api/complaints/admin/dashboard-stats/'):
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_gzip_negotiated_above_threshold(self):
+        for index in range(20):
+            self.make_complaint(user=self.admin)
+        headers = {'HTTP_AUTHORIZATION': 'Bearer token', 'secure': True}
+        plain = self.client.get('/api/complaints/user/', **headers)
+        compressed = self.client.get('/api/complaints/user/', HTTP_ACCEPT_ENCODING='gzip, br', **headers)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+        with self.settings(API_GZIP_MIN_LENGTH=len(plain.content) + 1):
+            response = self.client.get('/api/complaints/user/', HTTP_ACCEPT_ENCODING='gzip', **headers)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, plain.content)
+
+
+class ConditionalGetTest(FirebaseAPITestCase):
+    """Test ETag / Last-Modified handling on the complaint and staff reads."""
+
+    def get(self, path, **headers):
+        return self.client.get(path, HTTP_AUTHORIZATION='Bearer token', secure=True, **headers)
+
+    def assertRevalidates(self, path):
+        response = self.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        not_modified = self.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        return response['ETag']
+
+    def test_complaint_list_unchanged_poll_skips_serialization(self):
+        complaint = self.make_complaint(user=self.admin)
+        etag = self.assertRevalidates('/api/complaints/user/')
+
+        with patch.object(complaint_rows, 'render') as render, CaptureQueriesContext(connection) as queries:
+            response = self.get('/api/complaints/user/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+        complaint_queries = [query['sql'] for query in queries if 'complaints_complaint' in query['sql']]
+        self.assertEqual(len(complaint_queries), 1)
+        self.assertIn('COUNT', complaint_queries[0])
+
+        # Paging parameters and writes both change the validator
+        self.assertEqual(self.get('/api/complaints/user/?page_size=5', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        complaint.status = 'Closed'
+        complaint.save()
+        self.assertEqual(self.get('/api/complaints/user/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        complaint.delete()
+        self.assertEqual(self.get('/api/complaints/user/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_complaint_detail(self):
+        complaint = self.make_complaint(user=self.admin)
+        path = f'/api/complaints/{complaint.id}/'
+        response = self.get(path)
+        self.assertEqual(
+            self.get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+        etag = self.assertRevalidates(path)
+        Complaint.objects.filter(id=complaint.id).update(updated_at=timezone.now() + timedelta(seconds=5))
+        self.assertEqual(self.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_complaint_detail_of_another_user_is_not_validated(self):
+        User.objects.create_user(email='other@example.com', firebase_uid='other_uid')
+        complaint = self.make_complaint(user=self.admin)
+        self.login('other_uid', 'other@example.com')
+        response = self.get(f'/api/complaints/{complaint.id}/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_staff_directory(self):
+        staff = Staff.objects.create(name='asha', email='asha@rail.in', phone='1', role='Agent', department='Ops')
+        list_etag = self.assertRevalidates('/api/complaints/staff/')
+        detail_etag = self.assertRevalidates(f'/api/complaints/staff/{staff.id}/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            staff.rating = 4.5
+            staff.save()
+        self.assertEqual(self.get('/api/complaints/staff/', HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+        self.assertEqual(
+            self.get(f'/api/complaints/staff/{staff.id}/', HTTP_IF_NONE_MATCH=detail_etag).status_code, 200
+        )
+
+
+@override_settings(COMPLAINTS_CHANGES_LAG=0)
+class ComplaintChangesTest(FirebaseAPITestCase):
+    """Test the delta-sync endpoint and its tombstones."""
+
+    url = '/api/complaints/changes/'
+
+    def sync(self, since, **params):
+        response = self.get(self.url, since=since, **params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changes_and_deletions_since_token(self):
+        start = self.sync('')
+        self.assertEqual((start['changes'], start['deleted']), ([], []))
+
+        complaint = self.make_complaint(user=self.admin)
+        first = self.sync(start['since'], fields='id,status')
+        self.assertEqual(first['changes'], [{'id': complaint.id, 'status': 'Open'}])
+        self.assertEqual(self.sync(first['since'])['changes'], [])
+
+        complaint.status = 'Closed'
+        complaint.save()
+        second = self.sync(first['since'])
+        self.assertEqual([row['status'] for row in second['changes']], ['Closed'])
+
+        complaint_id = complaint.id
+        complaint.delete()
+        third = self.sync(second['since'])
+        self.assertEqual((third['changes'], third['deleted']), ([], [complaint_id]))
+
+    def test_scoped_to_the_users_own_complaints(self):
+        other = User.objects.create_user(email='other@example.com', firebase_uid='other_uid')
+        start = self.sync('')
+        mine = self.make_complaint(user=other)
+        self.make_complaint(user=self.admin).delete()
+        gone = self.make_complaint(user=other)
+        gone_id = gone.id
+        gone.delete()
+
+        self.login('other_uid', 'other@example.com')
+        changes = self.sync(start['since'])
+        self.assertEqual([row['id'] for row in changes['changes']], [mine.id])
+        self.assertEqual(changes['deleted'], [gone_id])
+
+    def test_pages_through_a_backlog(self):
+        start = self.sync('')
+        created = [self.make_complaint(user=self.admin).id for _ in range(3)]
+        seen, since = [], start['since']
+        while True:
+            page = self.sync(since, page_size=2)
+            seen += [row['id'] for row in page['changes']]
+            since = page['since']
+            if not page['has_more']:
+                break
+        self.assertEqual(seen, created)
+
+    def test_rejects_bad_and_expired_tokens(self):
+        self.assertEqual(self.get(self.url, since='garbage').status_code, 400)
+        expired = sync.encode_token(timezone.now() - timedelta(days=31), 0)
+        self.assertEqual(self.get(self.url, since=expired).status_code, 410)
+
+    def test_prune_tombstones(self):
+        self.make_complaint(user=self.admin).delete()
+        ComplaintTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        self.make_complaint(user=self.admin).delete()
+        call_command('prune_complaint_tombstones', stdout=StringIO())
+        self.assertEqual(ComplaintTombstone.objects.count(), 1)
+
+
+@override_settings(COMPLAINTS_EVENTS_FANOUT=False, COMPLAINTS_EVENTS_KEEPALIVE=0.01, COMPLAINTS_EVENTS_MAX_AGE=5)
+class ComplaintEventsTest(FirebaseAPITestCase):
+    """Test complaint change events: publishing, filtering, streaming and fan-out."""
+
+    def subscribe(self, user_id=None):
+        feed = EventFeed(user_id)
+        self.addCleanup(feed.close)
+        return feed
+
+    def test_status_update_reaches_admin_and_owner_only(self):
+        other = User.objects.create_user(email='other@example.com', firebase_uid='other_uid')
+        complaint = self.make_complaint(user=other)
+        admin_feed, owner_feed, stranger_feed = self.subscribe(), self.subscribe(other.id), self.subscribe(self.admin.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f'/api/complaints/{complaint.id}/', {'status': 'In Progress'}, content_type='application/json',
+                HTTP_AUTHORIZATION='Bearer token', secure=True
+            )
+        self.assertEqual(response.status_code, 200)
+
+        event = admin_feed.get()
+        self.assertEqual(event['complaint']['id'], complaint.id)
+        self.assertEqual(event['complaint']['status'], 'In Progress')
+        self.assertEqual(owner_feed.get(), event)
+        self.assertIsNone(stranger_feed.get())
+
+    def test_classification_update_publishes(self):
+        complaint = self.make_complaint(user=self.admin)
+        feed = self.subscribe()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                f'/api/complaints/admin/smart-classification/{complaint.id}/update/', {'category': 'Security'},
+                content_type='application/json', HTTP_AUTHORIZATION='Bearer token', secure=True
+            )
+        self.assertEqual(feed.get()['complaint']['type'], 'Security')
+
+    def test_stream_sends_events_and_keepalives(self):
+        complaint = self.make_complaint(user=self.admin, status='Closed')
+        event = events.complaint_event(complaint)
+
+        async def read():
+            response = await self.async_client.get(
+                '/api/complaints/events/', headers={'Authorization': 'Bearer token', 'Accept-Encoding': 'gzip'},
+                secure=True
+            )
+            chunks = aiter(response.streaming_content)
+            read = [await anext(chunks), await anext(chunks)]
+            events.broker.publish(event)
+            read.append(await anext(chunks))
+            await chunks.aclose()
+            return response, read
+
+        claims = {'uid': 'admin_uid', 'email': 'admin@example.com'}
+        with patch('accounts.middleware.averify_id_token', AsyncMock(return_value=claims)):
+            response, (retry, keepalive, sent) = async_to_sync(read)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(retry.startswith(b'retry:'))
+        self.assertEqual(keepalive, b': keepalive\n\n')
+        self.assertTrue(sent.startswith(b'event: complaint\ndata: {"id":%d,' % complaint.id))
+
+    def test_stream_is_not_served_under_wsgi(self):
+        response = self.get('/api/complaints/events/')
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+
+    def test_overflow_asks_for_resync(self):
+        event = events.complaint_event(self.make_complaint(user=self.admin))
+        with self.settings(COMPLAINTS_EVENTS_QUEUE_SIZE=2):
+            feed = self.subscribe()
+            for _ in range(3):
+                events.broker.publish(event)
+        self.assertIs(feed.get(), events.RESYNC)
+        self.assertIsNone(feed.get())
+
+    def test_cache_fanout_relays_other_workers_events(self):
+        feed = self.subscribe()
+        this_worker, other_worker = events.CacheFanout(), events.CacheFanout()
+        event = events.complaint_event(self.make_complaint(user=self.admin))
+        start = this_worker.relay(0)
+
+        this_worker.append(event)
+        self.assertEqual(this_worker.relay(start), start + 1)
+        self.assertIsNone(feed.get())
+
+        other_worker.append(event)
+        this_worker.relay(start + 1)
+        self.assertEqual(feed.get(), event)
+
+    def test_cache_fanout_waits_for_entries_being_written(self):
+        feed = self.subscribe()
+        this_worker, other_worker = events.CacheFanout(), events.CacheFanout()
+        event = events.complaint_event(self.make_complaint(user=self.admin))
+        start = this_worker.relay(0)
+
+        # The other worker has taken the next number but not stored its entry yet
+        cache.add(events.CacheFanout.SEQUENCE_KEY, 0, timeout=None)
+        seq = cache.incr(events.CacheFanout.SEQUENCE_KEY)
+        self.assertEqual(this_worker.relay(start), start)
+        cache.set(this_worker._entry_key(seq), (other_worker.origin, event))
+        self.assertEqual(this_worker.relay(start), seq)
+        self.assertEqual(feed.get(), event)
+
+        # One that never arrives is skipped once the grace period is over
+        cache.incr(events.CacheFanout.SEQUENCE_KEY)
+        other_worker.append(event)
+        self.assertEqual(this_worker.relay(seq), seq)
+        with patch.object(events.CacheFanout, 'MISSING_GRACE', 0):
+            self.assertEqual(this_worker.relay(seq), seq + 2)
+        self.assertEqual(feed.get(), event)
+        self.assertIsNone(feed.get())
+
+    def test_async_stream(self):
+        complaint = self.make_complaint(user=self.admin)
+        event = events.complaint_event(complaint)
+
+        async def read():
+            body = events.astream(None)
+            chunks = [await anext(body), await anext(body)]
+            events.broker.publish(event)
+            chunks.append(await anext(body))
+            await body.aclose()
+            return chunks
+
+        retry, keepalive, sent = async_to_sync(read)()
+        self.assertTrue(retry.startswith('retry:'))
+        self.assertEqual(keepalive, ': keepalive\n\n')
+        self.assertEqual(sent, events.format_event(event))
+
+
+class ComplaintSearchTest(FirebaseAPITestCase):
+    """Test full-text search on every backend available here."""
+
+    backends = ('sqlite', 'python')
+
+    def search(self, query, queryset=None, limit=10):
+        return search.search_ids(queryset or Complaint.objects.all(), query, limit)
+
+    def test_uses_fts5_when_available(self):
+        self.assertEqual(search.get_backend(), 'sqlite')
+
+    def test_ranking_and_prefix_matching(self):
+        passing = self.make_complaint(description='Fan not working in coach')
+        strong = self.make_complaint(description='Dirty toilet, toilet not cleaned, toilet smells')
+        weak = self.make_complaint(description='Toilet door broken and the whole coach is noisy at night')
+        for backend in self.backends:
+            with self.subTest(backend=backend), self.settings(COMPLAINTS_SEARCH_BACKEND=backend):
+                self.assertEqual(self.search('toilet'), [strong.id, weak.id])
+                self.assertEqual(self.search('TOIL'), [strong.id, weak.id])
+                self.assertEqual(self.search('toilet night'), [weak.id])
+                # Train number and location are indexed too
+                self.assertCountEqual(self.search('12345 delhi'), [passing.id, strong.id, weak.id])
+                self.assertEqual(self.search('toilet', queryset=Complaint.objects.exclude(id=strong.id)), [weak.id])
+                self.assertEqual(self.search('"), *'), [])
+                self.assertNotIn(passing.id, self.search('toilet'))
+
+    def test_index_follows_writes(self):
+        complaint = self.make_complaint(description='Water leaking')
+        complaint.description = 'AC not cooling'
+        complaint.save()
+        self.assertEqual(self.search('cooling'), [complaint.id])
+        self.assertEqual(self.search('leaking'), [])
+        complaint.delete()
+        self.assertEqual(self.search('cooling'), [])
+
+    def test_rebuild_after_bulk_update(self):
+        complaint = self.make_complaint(description='Water leaking')
+        Complaint.objects.update(description='Seat broken')
+        self.assertEqual(self.search('seat'), [])
+        call_command('rebuild_complaint_search', stdout=StringIO())
+        self.assertEqual(self.search('seat'), [complaint.id])
+        self.assertEqual(self.search('leaking'), [])
+
+    def test_search_endpoint_is_scoped_and_ranked(self):
+        other = User.objects.create_user(email='other@example.com', firebase_uid='other_uid')
+        self.make_complaint(user=other, description='Toilet dirty')
+        weak = self.make_complaint(user=self.admin, description='Toilet dirty near the pantry')
+        strong = self.make_complaint(user=self.admin, description='Toilet toilet toilet')
+        response = self.get('/api/complaints/search/', q='toilet')
+        self.assertEqual([row['complaint_id'] for row in response.json()['complaints']], [strong.id, weak.id])
+
+        response = self.get('/api/complaints/search/', q=str(weak.id))
+        self.assertEqual(response.json()['complaints'][0]['complaint_id'], weak.id)
+
+
+class IdentifierLookupTest(FirebaseAPITestCase):
+    """Test the indexed PNR and train-number lookups planned by complaints.lookup."""
+
+    def lookup(self, query, limit=10):
+        return lookup.identifier_ids(Complaint.objects.all(), query, limit)
+
+    def test_save_normalizes_identifiers(self):
+        complaint = self.make_complaint(pnr_number='PNR 421-00\u096f', train_number=None)
+        self.assertEqual((complaint.pnr_digits, complaint.pnr_digits_reversed), ('421009', '900124'))
+        self.assertEqual((complaint.train_digits, complaint.train_digits_reversed), ('', ''))
+
+        complaint.train_number = '12 951'
+        complaint.save(update_fields=['train_number'])
+        complaint.refresh_from_db()
+        self.assertEqual((complaint.train_digits, complaint.train_digits_reversed), ('12951', '15921'))
+        self.assertNotIn('pnr_digits', ComplaintSerializer(complaint).data)
+
+    def test_upper_bound(self):
+        self.assertEqual(lookup.upper_bound('123'), '124')
+        self.assertEqual(lookup.upper_bound('129'), '13')
+        self.assertEqual(lookup.upper_bound('1999'), '2')
+        self.assertEqual(lookup.upper_bound('0'), '1')
+        self.assertIsNone(lookup.upper_bound('999'))
+
+    def test_prefix_stage_with_nines(self):
+        match = self.make_complaint(pnr_number='99812', train_number='')
+        self.make_complaint(pnr_number='98', train_number='')
+        self.assertEqual(self.lookup('998'), [match.id])
+        self.assertEqual(self.lookup('99'), [match.id])
+
+    def test_stages_run_in_order(self):
+        exact = self.make_complaint(pnr_number='4521', train_number='')
+        prefix = self.make_complaint(pnr_number='4521-887', train_number='')
+        suffix = self.make_complaint(pnr_number='', train_number='994521')
+        inside = self.make_complaint(pnr_number='0045219', train_number='')
+        self.assertEqual(self.lookup('4521'), [exact.id, prefix.id, suffix.id])
+        self.assertEqual(self.lookup('45 21', limit=2), [exact.id, prefix.id])
+        # Substring matches only when no indexed stage found anything
+        self.assertEqual(self.lookup('452'), [prefix.id, exact.id])
+        self.assertEqual(self.lookup('5219'), [inside.id])
+        self.assertEqual(self.lookup('toilet 4521'), [])
+
+    def test_backfill(self):
+        migration = importlib.import_module('complaints.migrations.0024_complaint_identifier_lookup')
+        complaints = [self.make_complaint(pnr_number=f'98-{n}') for n in range(3)]
+        Complaint.objects.update(pnr_digits='', pnr_digits_reversed='', train_digits='')
+        with patch.object(migration, 'BATCH_SIZE', 2):
+            migration.populate_lookup_columns(apps, None)
+        for n, complaint in enumerate(complaints):
+            complaint.refresh_from_db()
+            self.assertEqual((complaint.pnr_digits, complaint.train_digits), (f'98{n}', '12345'))
+
+    def test_search_endpoint_puts_identifier_matches_first(self):
+        described = self.make_complaint(user=self.admin, pnr_number='', description='Refund for PNR 8765')
+        matched = self.make_complaint(user=self.admin, pnr_number='8765-43')
+        response = self.get('/api/complaints/search/', q='8765')
+        self.assertEqual([row['complaint_id'] for row in response.json()['complaints']], [matched.id, described.id])
+
+
+
+class SuggestionsTest(FirebaseAPITestCase):
+    """Test the typeahead tries and the complaints/suggest/ endpoint."""
+
+    url = '/api/complaints/suggest/'
+
+    def setUp(self):
+        super().setUp()
+        suggest.suggestions.reset()
+        self.addCleanup(suggest.suggestions.reset)
+        # Build in the test's thread, which sees its uncommitted rows
+        patcher = patch.object(suggest.suggestions, '_start', suggest.suggestions._rebuild)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggested(self, field, q, **params):
+        response = self.get(self.url, field=field, q=q, **params)
+        return [(row['value'], row['count']) for row in response.json()['suggestions']]
+
+    def test_trie_ranks_by_frequency(self):
+        trie = suggest.PrefixTrie(size=2)
+        for value, count in [('New Delhi', 3), ('Nagpur', 2), ('Nasik', 1), ('delhi cantt', 2)]:
+            trie.add(value, count)
+        self.assertEqual(trie.complete('n', 5), [('New Delhi', 3), ('Nagpur', 2)])
+        self.assertEqual(trie.complete('  DEL', 5), [('New Delhi', 3), ('delhi cantt', 2)])
+        self.assertEqual(trie.complete('x', 5), [])
+
+        trie.remove('new delhi')
+        trie.remove('new delhi')
+        # Ties go alphabetically
+        self.assertEqual(trie.complete('n', 5), [('Nagpur', 2), ('Nasik', 1)])
+        self.assertEqual(trie.complete('ne', 5), [('New Delhi', 1)])
+        trie.remove('New Delhi')
+        self.assertEqual(trie.complete('n', 5), [('Nagpur', 2), ('Nasik', 1)])
+        self.assertEqual(trie.complete('de', 5), [('delhi cantt', 2)])
+        self.assertEqual(trie.complete('new', 5), [])
+
+    def test_endpoint_serves_from_memory(self):
+        for _ in range(2):
+            self.make_complaint(type='Security', location='Nagpur Junction')
+        self.make_complaint(type='Staff Behaviour', train_number='12951')
+        Staff.objects.create(name='asha', email='asha@rail.in', phone='1', role='Agent',
+                             department='Ops', location='Nashik Road')
+
+        self.assertEqual(self.suggested('type', 's')[:2], [('Security', 2), ('Staff Behaviour', 1)])
+        # Known categories are offered before anyone files under them
+        self.assertIn(('Bed Roll', 0), self.suggested('type', 'bed'))
+        self.assertEqual(self.suggested('train', '129'), [('12951', 1)])
+        self.assertEqual(self.suggested('location', 'na'), [('Nagpur Junction', 2), ('Nashik Road', 1)])
+        self.assertEqual(self.suggested('location', 'junc'), [('Nagpur Junction', 2)])
+        self.assertEqual(len(self.suggested('type', '', limit=3)), 3)
+        self.assertEqual(self.get(self.url, field='pnr').status_code, 400)
+
+        with self.assertNumQueries(0):
+            suggest.suggestions.complete('location', 'nag', 5)
+
+    def test_first_build_runs_in_the_background(self):
+        self.make_complaint(location='Nagpur')
+        with patch.object(suggest.suggestions, '_start') as start, self.assertNumQueries(0):
+            self.assertEqual(suggest.suggestions.complete('location', 'nag', 5), [])
+            self.assertIn(('Bed Roll', 0), suggest.suggestions.complete('type', 'bed', 5))
+        start.assert_called_once()
+        suggest.suggestions._rebuild()
+        self.assertEqual(suggest.suggestions.complete('location', 'nag', 5), [('Nagpur', 1)])
+
+    def test_passengers_only_see_their_own_values(self):
+        passenger = User.objects.create_user(email='p@example.com', firebase_uid='p_uid')
+        self.make_complaint(type='Security', location='Nagpur', train_number='12951')
+        self.make_complaint(user=passenger, type='Security', location='Nashik Road', train_number='12952')
+        self.login('p_uid', 'p@example.com')
+
+        self.assertEqual(self.suggested('location', 'na'), [('Nashik Road', 1)])
+        self.assertEqual(self.suggested('train', '129'), [('12952', 1)])
+        self.assertEqual(self.suggested('type', 'sec'), [('Security', 1)])
+        self.assertIn(('Bed Roll', 0), self.suggested('type', 'bed'))
+
+    def test_writes_update_the_tries(self):
+        complaint = self.make_complaint(type='Security', location='Nagpur')
+        self.assertEqual(suggest.suggestions.complete('type', 'sec', 5), [('Security', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.type = 'Water Availability'
+            complaint.save()
+            self.make_complaint(type='Water Availability', location='Nagpur')
+        self.assertEqual(suggest.suggestions.complete('type', 'sec', 5), [('Security', 0)])
+        self.assertEqual(suggest.suggestions.complete('type', 'wat', 5), [('Water Availability', 2)])
+        self.assertEqual(suggest.suggestions.complete('location', 'nag', 5), [('Nagpur', 2)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.delete()
+        self.assertEqual(suggest.suggestions.complete('location', 'nag', 5), [('Nagpur', 1)])
+        self.assertEqual(suggest.suggestions.complete('type', 'wat', 5), [('Water Availability', 1)])
+
+    def test_rebuild_counts_writes_during_it_once(self):
+        complaint = self.make_complaint(location='Nagpur')
+        suggest.suggestions.complete('location', 'nag', 5)
+        # A rebuild has started (as _check does) but not yet read the database
+        suggest.suggestions._pending = []
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_complaint(location='Nagpur')
+            complaint.location = 'Nashik'
+            complaint.save()
+        suggest.suggestions._rebuild()
+        self.assertEqual(suggest.suggestions.complete('location', 'na', 5), [('Nagpur', 1), ('Nashik', 1)])
+
+    @override_settings(COMPLAINTS_SUGGEST_CHECK_INTERVAL=0)
+    def test_rebuilds_after_another_workers_write(self):
+        self.make_complaint(location='Nagpur')
+        suggest.suggestions.complete('location', 'nag', 5)
+
+        # Our own writes do not call for a rebuild
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_complaint(location='Nagpur')
+        with patch.object(suggest.suggestions, '_start') as start:
+            suggest.suggestions.complete('location', 'nag', 5)
+        start.assert_not_called()
+
+        Complaint.objects.update(location='Nashik')
+        bump_version(suggest.VERSION_KEY)
+        with patch.object(suggest.suggestions, '_start') as start:
+            self.assertEqual(suggest.suggestions.complete('location', 'nag', 5), [('Nagpur', 2)])
+        start.assert_called_once()
+        suggest.suggestions._rebuild()
+        self.assertEqual(suggest.suggestions.complete('location', 'na', 5), [('Nashik', 2)])
+
+
+
+class ComplaintClassifierTest(FirebaseAPITestCase):
+    """Test training, artifacts and the smart classification endpoints."""
+
+    examples = {
+        'Coach - Cleanliness': ['Toilet is dirty and smells', 'Dirty floor and garbage in the coach',
+                                'Washbasin dirty, toilet not cleaned', 'Garbage near the seats, coach dirty'],
+        'Water Availability': ['No water in the toilet tap', 'Water tank empty, no water to drink',
+                               'No water in washbasin since morning', 'Drinking water not available'],
+        'Security': ['Unknown person stole my bag', 'Theft of mobile phone at night',
+                     'Suspicious person harassing passengers', 'My luggage was stolen from the berth'],
+    }
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(COMPLAINTS_CLASSIFIER_DIR=directory.name))
+        self.directory = directory.name
+        classifier.store.reset()
+        self.addCleanup(classifier.store.reset)
+
+    def make_examples(self, **fields):
+        for type, descriptions in self.examples.items():
+            for description in descriptions:
+                self.make_complaint(type=type, description=description, **fields)
+
+    def train(self, **options):
+        call_command('train_complaint_classifier', stdout=StringIO(), epochs=20, **options)
+
+    def test_training_writes_versioned_artifacts(self):
+        self.make_examples()
+        with self.assertRaises(CommandError):
+            self.train(min_examples=5)
+
+        self.train()
+        first = classifier.current_model()
+        self.assertEqual(first.labels, sorted(self.examples))
+        self.assertEqual(first.metadata['examples'], 12)
+        predictions = first.predict(['bag stolen at night', 'toilet dirty', 'no water in tap'])
+        self.assertEqual([label for label, _ in predictions], ['Security', 'Coach - Cleanliness', 'Water Availability'])
+        self.assertTrue(all(0 < confidence <= 1 for _, confidence in predictions))
+
+        for _ in range(2):
+            self.train(keep=2)
+        artifacts = classifier.artifacts()
+        self.assertEqual(len(artifacts), 2)
+        with self.settings(COMPLAINTS_CLASSIFIER_CHECK_INTERVAL=0):
+            self.assertEqual(classifier.current_model().version, classifier.load(artifacts[-1]).version)
+
+    @unittest.skipIf(classifier.np is None, 'numpy is not installed')
+    def test_numpy_and_python_inference_agree(self):
+        self.make_examples()
+        self.train()
+        texts = ['bag stolen', 'dirty toilet, no water', '', 'unrelated words']
+        vectorized = classifier.load(classifier.artifacts()[-1]).probabilities(texts)
+        with patch.object(classifier, 'np', None):
+            plain = classifier.load(classifier.artifacts()[-1]).probabilities(texts)
+        for row, expected in zip(vectorized, plain):
+            self.assertEqual([round(p, 9) for p in row], [round(p, 9) for p in expected])
+
+    def test_corrections_are_recorded_and_weighted(self):
+        complaint = self.make_complaint(type='Security', description='Water leaking from the roof')
+        response = self.client.post(
+            f'/api/complaints/admin/smart-classification/{complaint.id}/update/', {'category': 'Water Availability'},
+            content_type='application/json', HTTP_AUTHORIZATION='Bearer token', secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        correction = ClassificationCorrection.objects.get(complaint=complaint)
+        self.assertEqual((correction.previous_type, correction.type), ('Security', 'Water Availability'))
+        self.assertEqual(correction.corrected_by, self.admin)
+        self.assertEqual(
+            list(classifier.training_examples()),
+            [('Water leaking from the roof', 'Water Availability', classifier.CORRECTION_WEIGHT)]
+        )
+
+    @override_settings(COMPLAINTS_CLASSIFIER_CHECK_INTERVAL=0)
+    def test_endpoints_without_a_model(self):
+        complaint = self.make_complaint()
+        data = self.get('/api/complaints/admin/smart-classification/stats/').json()
+        self.assertEqual(
+            (data['accuracy'], data['model_available'], data['model_version'], data['pending_review']), (0.0, False, None, 1)
+        )
+        data = self.get('/api/complaints/admin/smart-classification/complaints/').json()
+        self.assertFalse(data['model_available'])
+        self.assertEqual(
+            data['complaints'],
+            [{
+                'id': str(complaint.id), 'text': 'Dirty coach', 'category': 'Coach - Cleanliness',
+                'filed_category': 'Coach - Cleanliness', 'confidence': 0.0, 'timestamp': complaint.created_at.isoformat(),
+                'status': 'Pending Review', 'severity': complaint.priority, 'actual_status': complaint.status
+            }]
+        )
+
+    @override_settings(COMPLAINTS_CLASSIFIER_CHECK_INTERVAL=0)
+    def test_stats_predict_only_new_and_edited_complaints(self):
+        stats_url = '/api/complaints/admin/smart-classification/stats/'
+        self.make_examples()
+        self.train()
+        self.assertEqual(ComplaintPrediction.objects.count(), Complaint.objects.count())
+
+        edited = Complaint.objects.get(description='No water in the toilet tap')
+        edited.description = 'No water in the toilet tap, tank empty'
+        edited.save()
+        self.make_complaint(description='Garbage under the seats')
+        self.assertEqual(ComplaintPrediction.objects.count(), Complaint.objects.count() - 2)
+
+        predict = classifier.Model.predict
+        with patch.object(classifier.Model, 'predict', autospec=True, side_effect=predict) as spy:
+            self.assertEqual(self.get(stats_url).status_code, 200)
+        self.assertEqual(
+            sorted(text for call in spy.call_args_list for text in call.args[1]),
+            ['Garbage under the seats', 'No water in the toilet tap, tank empty']
+        )
+        self.assertEqual(ComplaintPrediction.objects.count(), Complaint.objects.count())
+
+    @override_settings(COMPLAINTS_CLASSIFIER_CHECK_INTERVAL=0)
+    def test_endpoints_report_predictions(self):
+        stats_url = '/api/complaints/admin/smart-classification/stats/'
+        complaints_url = '/api/complaints/admin/smart-classification/complaints/'
+        self.make_examples(status='Closed')
+        # Misfiled, under a category too rare to train on: the model disagrees, so it needs review
+        misfiled = self.make_complaint(type='Bed Roll', description='Toilet dirty, garbage everywhere')
+
+        # No model yet: every unreviewed open complaint waits for review
+        data = self.get(stats_url).json()
+        self.assertEqual((data['accuracy'], data['pending_review'], data['confidence_trends']), (0.0, 1, []))
+        self.assertEqual(self.get(complaints_url).json()['complaints'][0]['confidence'], 0.0)
+
+        self.train()
+        cache.clear()
+        data = self.get(stats_url).json()
+        self.assertEqual(data['pending_review'], 1)
+        self.assertTrue(data['model_available'])
+        self.assertEqual(data['model_version'], classifier.current_model().version)
+        self.assertEqual(len(data['confidence_trends']), 1)
+        self.assertTrue(0 < data['confidence_trends'][0]['confidence'] <= 100)
+
+        rows = {row['id']: row for row in self.get(complaints_url).json()['complaints']}
+        self.assertEqual(rows[str(misfiled.id)]['category'], 'Coach - Cleanliness')
+        self.assertEqual(rows[str(misfiled.id)]['status'], 'Pending Review')
+        self.assertTrue(0 < rows[str(misfiled.id)]['confidence'] <= 1)
+
+        # Once someone sets the category it is reviewed
+        self.client.post(
+            f'/api/complaints/admin/smart-classification/{misfiled.id}/update/', {'category': 'Coach - Cleanliness'},
+            content_type='application/json', HTTP_AUTHORIZATION='Bearer token', secure=True
+        )
+        cache.clear()
+        self.assertEqual(self.get(stats_url).json()['pending_review'], 0)
+        rows = {row['id']: row for row in self.get(complaints_url).json()['complaints']}
+        self.assertEqual(rows[str(misfiled.id)]['status'], 'Classified')
+
+
+
+class FileComplaintAuthTest(FirebaseAPITestCase):
+    """Test that filing a complaint rejects bad tokens instead of filing anonymously."""
+
+    def test_expired_token_is_rejected(self):
+        data = {
+            'type': 'Security', 'description': 'Bag stolen', 'train_number': '12345',
+            'pnr_number': '1234567890', 'location': 'Delhi', 'date_of_incident': str(timezone.localdate()),
+        }
+        with patch('accounts.middleware.verify_id_token', side_effect=auth.ExpiredIdTokenError('expired', None)):
+            response = self.client.post(
+                '/api/complaints/file/', data, content_type='application/json',
+                HTTP_AUTHORIZATION='Bearer token', secure=True
+            )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'TOKEN_EXPIRED')
+        self.assertFalse(Complaint.objects.exists())
+
+
+
+class ComplaintDailyStatsTest(FirebaseAPITestCase):
+    """Test that the daily rollup follows complaint writes and matches a rebuild."""
+
+    def snapshot(self):
+        return sorted(
+            (row.day, row.type, row.status, row.created, row.resolved, round(row.resolution_seconds))
+            for row in ComplaintDailyStats.objects.exclude(created=0, resolved=0)
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        call_command('rebuild_complaint_stats', stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_create_update_and_delete(self):
+        now = timezone.now()
+        today = timezone.localdate()
+        complaint = self.make_complaint(created_at=now - timedelta(days=2))
+        other = self.make_complaint(type='Security')
+        self.assertMatchesRebuild()
+
+        complaint.status = 'Closed'
+        complaint.resolved_at = now
+        complaint.save()
+        row = ComplaintDailyStats.objects.get(day=today, type=complaint.type, status='Closed')
+        self.assertEqual(row.resolved, 1)
+        self.assertEqual(row.resolution_seconds, timedelta(days=2).total_seconds())
+        self.assertMatchesRebuild()
+
+        other.type = 'Coach - Cleanliness'
+        other.save()
+        other.delete()
+        complaint.delete()
+        self.assertEqual(self.snapshot(), [])
+
+    def test_trends_read_the_rollup(self):
+        self.make_complaint(status='In Progress')
+        ComplaintDailyStats.objects.all().delete()
+        self.assertEqual(stats.daily_trends(1)[0]['in_progress'], 0)
+        call_command('rebuild_complaint_stats', stdout=StringIO())
+        self.assertEqual(stats.daily_trends(1)[0]['in_progress'], 1)
+
+
+class ResponseCacheTest(FirebaseAPITestCase):
+    """Test that admin analytics responses are cached until complaints data changes."""
+
+    url = '/api/complaints/admin/dashboard-stats/'
+
+    def test_served_from_cache_until_a_write(self):
+        self.make_complaint()
+        self.assertEqual(self.get(self.url).json()['totalComplaints'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.url).json()['totalComplaints'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_complaint()
+        self.assertEqual(self.get(self.url).json()['totalComplaints'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Staff.objects.create(name='A', email='a@rail.in', phone='1', role='Agent', department='Ops')
+        with self.assertNumQueries(4):
+            self.get(self.url)
+
+    def test_query_params_are_part_of_the_key(self):
+        url = '/api/complaints/admin/complaint-trends/'
+        self.assertEqual(len(self.get(url, days=7).json()['trends']), 7)
+        self.assertEqual(len(self.get(url, days=3).json()['trends']), 3)
+
+    def test_rejected_requests_are_not_served_from_cache(self):
+        self.get(self.url)
+        User.objects.create_user(email='user@example.com', firebase_uid='user_uid')
+        self.login('user_uid', 'user@example.com')
+        self.assertEqual(self.get(self.url).status_code, 403)
+
+
+class SingleFlightTest(TestCase):
+    """Test that concurrent misses share one computation."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.calls = 0
+
+    def compute(self, value='fresh', delay=0.2):
+        def run():
+            self.calls += 1
+            time.sleep(delay)
+            cache.set('key', value)
+            return value
+        return run
+
+    def run_concurrently(self, count, **kwargs):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight('key', self.compute(), **kwargs)))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_threads_share_one_computation(self):
+        self.assertEqual(self.run_concurrently(5), ['fresh'] * 5)
+        self.assertEqual(self.calls, 1)
+
+    def test_waiters_get_stale_value_while_recomputing(self):
+        results = self.run_concurrently(3, stale='stale')
+        self.assertEqual(sorted(results), ['fresh', 'stale', 'stale'])
+        self.assertEqual(self.calls, 1)
+
+    def test_waits_for_computation_in_another_worker(self):
+        cache.add('key:lock', 1)
+        threading.Timer(0.1, lambda: cache.set('key', 'from other worker')).start()
+        self.assertEqual(single_flight('key', self.compute()), 'from other worker')
+        self.assertEqual(self.calls, 0)
+
+        cache.add('other:lock', 1)
+        self.assertEqual(single_flight('other', self.compute(), stale='stale'), 'stale')
+        self.assertEqual(self.calls, 0)
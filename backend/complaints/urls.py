@@ -8,11 +8,18 @@ from .views import (
     submit_feedback,  
     feedback_view     
 )
-from . import views
+from django.conf import settings
+from . import views, async_views
+
+# Under ASGI (ASYNC_API_VIEWS) the I/O-bound endpoints are served by native async views
+if settings.ASYNC_API_VIEWS:
+    file_complaint = async_views.file_complaint
 
 urlpatterns = [
     path('file/', file_complaint, name='file_complaint'),
     path('user/', user_complaints, name='user_complaints'),
+    path('changes/', views.complaint_changes, name='complaint_changes'),
+    path('events/', async_views.complaint_events, name='complaint_events'),
     path('<int:complaint_id>/', complaint_detail, name='complaint_detail'),
     path('', complaint_list, name='complaint_list'),
     path('admin/profile/', admin_profile, name='admin_profile'),
@@ -21,6 +28,7 @@ urlpatterns = [
 
     # Admin API endpoints
     path('admin/complaints/', views.admin_get_all_complaints, name='admin-complaints'),
+    path('admin/complaints/export/', views.admin_export_complaints, name='admin-export-complaints'),
     path('admin/complaints/<int:complaint_id>/status/', views.admin_update_complaint_status, name='admin-update-complaint-status'),
     path('admin/staff/', views.admin_staff_list, name='admin-staff-list'),
     path('admin/staff/<int:pk>/', views.admin_staff_detail, name='admin-staff-detail'),
@@ -38,6 +46,7 @@ urlpatterns = [
 
     # Search endpoint
     path('search/', views.search_user_complaints, name='search_user_complaints'),
+    path('suggest/', views.complaint_suggestions, name='complaint_suggestions'),
     
     # Public staff endpoints (for passengers to view staff)
     path('staff/', views.staff_list, name='staff-list'),
@@ -4,25 +4,91 @@ from rest_framework.authentication import TokenAuthentication, SessionAuthentica
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.utils.dateparse import parse_date, parse_datetime
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
-from .models import Complaint, Staff, QuickSolution
-from .serializers import ComplaintSerializer, StaffSerializer
+from .models import (
+    COMPLAINT_CATEGORIES, ClassificationCorrection, Complaint, ComplaintPrediction, ComplaintTombstone, Staff,
+    QuickSolution,
+)
+from .serializers import ComplaintSerializer, StaffSerializer, complaint_rows, parse_fields
 import os
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .models import Feedback
 from .serializers import FeedbackSerializer
-from django.db.models import Count, Q, Avg
+from . import classifier, events, export, lookup, search, stats, suggest, sync
+from .cache import cached_response, staff_version
+from .conditional import conditional, list_validators, make_etag
+from .pagination import KEY_COLUMNS, get_page_size, paginate
+from accounts.middleware import lazy_auth
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Avg, Value
+from django.db.models.functions import Coalesce, TruncDate, Trim
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
  
+def _save_complaint_photo(photo):
+    """Store an uploaded complaint photo and return the path recorded on the complaint."""
+    filename = os.path.basename(photo.name)
+    save_path = os.path.join('backend', 'media', 'complaints', filename)
+    full_path = os.path.join(settings.BASE_DIR, 'media', 'complaints', filename)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'wb+') as destination:
+        for chunk in photo.chunks():
+            destination.write(chunk)
+    return save_path.replace('\\', '/')
+
+
+def _complaint_user_id(request):
+    """The id of the authenticated user filing a complaint, if any."""
+    user_id = None
+    if hasattr(request, 'is_authenticated') and request.is_authenticated:
+        if hasattr(request, 'user_id') and request.user_id is not None:
+            user_id = request.user_id
+        elif hasattr(request, 'user') and request.user and hasattr(request.user, 'id'):
+            user_id = request.user.id
+        elif hasattr(request, 'firebase_uid') and request.firebase_uid:
+            from accounts.views import get_or_create_user
+            user, created = get_or_create_user(request)
+            if user:
+                user_id = user.id
+    return user_id
+
+
+def _create_complaint(data):
+    """Validate and save a new complaint, returning the JsonResponse for the caller."""
+    # Validate required fields
+    required_fields = ['type', 'description', 'train_number', 'pnr_number', 'location', 'date_of_incident']
+    missing_fields = [field for field in required_fields if not data.get(field)]
+
+    if missing_fields:
+        return JsonResponse({
+            "error": f"Missing required fields: {', '.join(missing_fields)}"
+        }, status=400)
+
+    serializer = ComplaintSerializer(data=data)
+    if serializer.is_valid():
+        complaint = serializer.save()
+        return JsonResponse({
+            "message": "Complaint filed successfully", 
+            "complaint_id": complaint.id
+        }, status=201)
+
+    return JsonResponse({
+        "error": "Validation failed",
+        "details": serializer.errors
+    }, status=400)
+
+
+# Eager auth: a bad token must get a 401, not file the complaint anonymously
 @api_view(["POST"])
 def file_complaint(request):
     try:
@@ -31,63 +97,57 @@ def file_complaint(request):
  
         # Handle photo upload
         if photo:
-            filename = os.path.basename(photo.name)
-            save_path = os.path.join('backend', 'media', 'complaints', filename)
-            full_path = os.path.join(settings.BASE_DIR, 'media', 'complaints', filename)
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            with open(full_path, 'wb+') as destination:
-                for chunk in photo.chunks():
-                    destination.write(chunk)
-            data['photos'] = save_path.replace('\\', '/')
+            data['photos'] = _save_complaint_photo(photo)
 
         # Set default priority if not provided
         if 'priority' not in data or not data['priority']:
             data['priority'] = 'Medium'
 
-        # Handle user authentication
-        user_id = None
-        if hasattr(request, 'is_authenticated') and request.is_authenticated:
-            if hasattr(request, 'user_id') and request.user_id is not None:
-                user_id = request.user_id
-            elif hasattr(request, 'user') and request.user and hasattr(request.user, 'id'):
-                user_id = request.user.id
-            elif hasattr(request, 'firebase_uid') and request.firebase_uid:
-                from accounts.views import get_or_create_user
-                user, created = get_or_create_user(request)
-                if user:
-                    user_id = user.id
-        
         # Set user_id in data if available
+        user_id = _complaint_user_id(request)
         if user_id:
             data['user'] = user_id
-        
-        # Validate required fields
-        required_fields = ['type', 'description', 'train_number', 'pnr_number', 'location', 'date_of_incident']
-        missing_fields = [field for field in required_fields if not data.get(field)]
-        
-        if missing_fields:
-            return JsonResponse({
-                "error": f"Missing required fields: {', '.join(missing_fields)}"
-            }, status=400)
-        
-        serializer = ComplaintSerializer(data=data)
-        if serializer.is_valid():
-            complaint = serializer.save()
-            return JsonResponse({
-                "message": "Complaint filed successfully", 
-                "complaint_id": complaint.id
-            }, status=201)
-        
-        return JsonResponse({
-            "error": "Validation failed",
-            "details": serializer.errors
-        }, status=400)
+
+        return _create_complaint(data)
  
     except Exception as e:
         return JsonResponse({
             "error": f"Server error: {str(e)}"
         }, status=500)
  
+def _user_complaints_queryset(request):
+    """
+    The complaints user_complaints lists: all of them for admin/staff users,
+    only their own for regular users. None when the user id is unknown.
+    """
+    if request.is_admin or request.is_staff:
+        # Admin and staff can see all complaints
+        return Complaint.objects.all().order_by('-created_at')
+
+    # Regular users see only their own complaints
+    user_id = None
+    
+    # First try to get user_id from request attribute
+    if hasattr(request, 'user_id') and request.user_id is not None:
+        user_id = request.user_id
+    # Then try to get from user object
+    elif hasattr(request, 'user') and request.user and hasattr(request.user, 'id'):
+        user_id = request.user.id
+    
+    if user_id:
+        return Complaint.objects.filter(user=user_id).order_by('-created_at')
+    return None
+
+def _user_complaints_validators(request):
+    if not getattr(request, 'is_authenticated', False):
+        return None
+    complaints = _user_complaints_queryset(request)
+    if complaints is None:
+        return None
+    scope = 'all' if request.is_admin or request.is_staff else request.user_id
+    return list_validators(request, complaints, 'user_complaints', scope)
+
+@conditional(_user_complaints_validators)
 @api_view(['GET'])
 def user_complaints(request):
     """
@@ -100,37 +160,84 @@ def user_complaints(request):
         if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
             return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Determine if we need to filter by user
-        if request.is_admin or request.is_staff:
-            # Admin and staff can see all complaints
-            complaints = Complaint.objects.all().order_by('-created_at')
-        else:
-            # Regular users see only their own complaints
-            user_id = None
-            
-            # First try to get user_id from request attribute
-            if hasattr(request, 'user_id') and request.user_id is not None:
-                user_id = request.user_id
-            # Then try to get from user object
-            elif hasattr(request, 'user') and request.user and hasattr(request.user, 'id'):
-                user_id = request.user.id
-            
-            if user_id:
-                complaints = Complaint.objects.filter(user=user_id).order_by('-created_at')
-            else:
-                # If we can't determine user_id, return empty result
-                return Response({'error': 'User ID not found'}, status=status.HTTP_400_BAD_REQUEST)
+        complaints = _user_complaints_queryset(request)
+        if complaints is None:
+            # If we can't determine user_id, return empty result
+            return Response({'error': 'User ID not found'}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = ComplaintSerializer(complaints, many=True)
-        return Response(serializer.data)
+        # Newest first, of the requested fields: all of them, or a page whose Link header carries the cursors
+        try:
+            fields = parse_fields(request, ComplaintSerializer.field_names())
+            page = paginate(request, complaints.values(*complaint_rows.columns_for(fields, KEY_COLUMNS)))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return page.add_headers(Response(complaint_rows.render(page.rows, fields)), request)
     
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
  
+@api_view(['GET'])
+def complaint_changes(request):
+    """
+    Complaints changed since ``?since=<token>``, for clients that poll.
+
+    Returns the changed complaints (scoped like user_complaints, oldest change
+    first, at most ``page_size``), the ids deleted since the token and the
+    token for the next call. ``has_more`` asks the client to call again
+    straight away. Call it without ``since`` to get a starting token.
+    """
+    if not getattr(request, 'is_authenticated', False):
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    complaints = _user_complaints_queryset(request)
+    if complaints is None:
+        return Response({'error': 'User ID not found'}, status=status.HTTP_400_BAD_REQUEST)
+    tombstones = ComplaintTombstone.objects.all()
+    if not (request.is_admin or request.is_staff):
+        tombstones = tombstones.filter(user=request.user_id)
+
+    try:
+        fields = parse_fields(request, ComplaintSerializer.field_names())
+        columns = complaint_rows.columns_for(fields, ['updated_at', 'id'])
+        changes = sync.changes_since(
+            request.GET.get('since'), complaints.values(*columns), tombstones, get_page_size(request)
+        )
+    except sync.TokenExpired as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'changes': complaint_rows.render(changes.rows, fields),
+        'deleted': changes.deleted,
+        'since': changes.token,
+        'has_more': changes.has_more,
+    })
+
+def _complaint_detail_validators(request, complaint_id):
+    row = Complaint.objects.filter(id=complaint_id).values_list('user_id', 'updated_at').first()
+    if row is None:
+        return None
+    user_id, updated_at = row
+    if not (getattr(request, 'is_admin', False) or getattr(request, 'is_staff', False)
+            or user_id == getattr(request, 'user_id', None)):
+        return None
+    return make_etag(request, 'complaint', complaint_id, updated_at.isoformat()), updated_at
+
+@conditional(_complaint_detail_validators)
 @api_view(['GET', 'PUT'])
 def complaint_detail(request, complaint_id):
     try:
-        complaint = Complaint.objects.get(id=complaint_id)
+        fields = parse_fields(request, ComplaintSerializer.field_names()) if request.method == 'GET' else None
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        complaints = Complaint.objects.all()
+        if fields:
+            complaints = complaints.only(*ComplaintSerializer.only_columns(fields, extra=['user']))
+        complaint = complaints.get(id=complaint_id)
         
         # Check if user has permission to view this complaint
         if not (request.is_admin or request.is_staff):
@@ -141,7 +248,7 @@ def complaint_detail(request, complaint_id):
         return Response({'error': 'Complaint not found'}, status=status.HTTP_404_NOT_FOUND)
  
     if request.method == 'GET':
-        serializer = ComplaintSerializer(complaint)
+        serializer = ComplaintSerializer(complaint, fields=fields)
         return Response(serializer.data)
  
     elif request.method == 'PUT':
@@ -158,14 +265,22 @@ def complaint_detail(request, complaint_id):
         serializer = ComplaintSerializer(complaint, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            events.publish_complaint(complaint)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
  
  
+@lazy_auth
 @api_view(['GET'])
 def complaint_list(request):
-    complaints = list(Complaint.objects.values())
-    return JsonResponse(complaints, safe=False)
+    columns = export.EXPORT_FIELDS
+    try:
+        fields = parse_fields(request, columns)
+        page = paginate(request, Complaint.objects.values(*(fields or columns), *KEY_COLUMNS))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    rows = page.rows if fields is None else [{name: row[name] for name in fields} for row in page.rows]
+    return page.add_headers(JsonResponse(rows, safe=False), request)
  
  
 @api_view(['GET'])
@@ -190,6 +305,7 @@ def admin_profile(request):
         return Response(data)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+@lazy_auth
 @api_view(['POST'])
 def submit_feedback(request):
     serializer = FeedbackSerializer(data=request.data)
@@ -197,6 +313,7 @@ def submit_feedback(request):
         serializer.save()
         return Response({"message": "Feedback submitted successfully"}, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+@lazy_auth
 @api_view(['GET', 'POST'])
 def feedback_view(request):
     if request.method == 'POST':
@@ -214,12 +331,43 @@ def feedback_view(request):
         serializer = FeedbackSerializer(feedbacks, many=True)
         return Response(serializer.data, status=200)
 
+def _sparse_staff(request):
+    """Staff queryset limited to the ?fields= columns, and the field list (None for all)."""
+    fields = parse_fields(request, StaffSerializer.field_names())
+    staff = Staff.objects.all()
+    if fields:
+        staff = staff.only(*StaffSerializer.only_columns(fields))
+    return staff, fields
+
+def _staff_list_response(request):
+    try:
+        staff, fields = _sparse_staff(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = StaffSerializer(staff, many=True, fields=fields, context={'request': request})
+    return Response(serializer.data)
+
+def _staff_detail_response(request, pk):
+    try:
+        staff, fields = _sparse_staff(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    staff = get_object_or_404(staff, pk=pk)
+    serializer = StaffSerializer(staff, fields=fields, context={'request': request})
+    return Response(serializer.data)
+
+def _staff_list_validators(request):
+    return make_etag(request, 'staff', staff_version()), None
+
+def _staff_detail_validators(request, pk):
+    return make_etag(request, 'staff', pk, staff_version()), None
+
+@lazy_auth
+@conditional(_staff_list_validators)
 @api_view(['GET', 'POST'])
 def staff_list(request):
     if request.method == 'GET':
-        staffs = Staff.objects.all()
-        serializer = StaffSerializer(staffs, many=True, context={'request': request})
-        return Response(serializer.data)
+        return _staff_list_response(request)
     
     elif request.method == 'POST':
         print("Received staff data:", request.data)
@@ -232,18 +380,19 @@ def staff_list(request):
         print("Serializer errors:", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@lazy_auth
+@conditional(_staff_detail_validators)
 @api_view(['GET', 'PUT', 'DELETE'])
 def staff_detail(request, pk):
+    if request.method == 'GET':
+        return _staff_detail_response(request, pk)
+
     try:
         staff = Staff.objects.get(pk=pk)
     except Staff.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
-    if request.method == 'GET':
-        serializer = StaffSerializer(staff, context={'request': request})
-        return Response(serializer.data)
-
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         serializer = StaffSerializer(staff, data=request.data, context={'request': request})
         if serializer.is_valid():
             updated_staff = serializer.save()
@@ -256,6 +405,43 @@ def staff_detail(request, pk):
         staff.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+def _filter_admin_complaints(params):
+    """
+    Complaints matching the admin list filters (status, severity, type, staff).
+    ``staff`` is a Staff id or name. Raises ValueError for a staff value that
+    is neither.
+    """
+    status_filter = params.get('status')
+    severity_filter = params.get('severity')
+    type_filter = params.get('type')
+    staff_filter = params.get('staff')
+    
+    # Start with all complaints
+    complaints = Complaint.objects.all()
+    
+    # Apply filters if provided
+    if status_filter:
+        complaints = complaints.filter(status=status_filter)
+    
+    if severity_filter:
+        complaints = complaints.filter(severity=severity_filter)
+        
+    if type_filter:
+        complaints = complaints.filter(type=type_filter)
+    
+    if staff_filter:
+        if staff_filter.isdigit():
+            complaints = complaints.filter(assigned_staff_id=staff_filter)
+        else:
+            # A name, as callers passed before assigned_staff; it also matches complaints
+            # whose staff name has no Staff row
+            named_staff = Staff.objects.filter(name=staff_filter)
+            if not named_staff.exists() and not Complaint.objects.filter(staff=staff_filter).exists():
+                raise ValueError('staff must be a staff id or name')
+            complaints = complaints.filter(Q(assigned_staff__in=named_staff) | Q(staff=staff_filter))
+    
+    return complaints
+
 # Admin Complaints Management API Views
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -270,29 +456,64 @@ def admin_get_all_complaints(request):
         return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
     
     # Get query parameters for filtering
-    status_filter = request.query_params.get('status')
-    severity_filter = request.query_params.get('severity')
-    type_filter = request.query_params.get('type')
+    try:
+        complaints = _filter_admin_complaints(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Start with all complaints
-    complaints = Complaint.objects.all()
+    # Most recent first, of the requested fields; paged when the client asks (complaints.pagination)
+    try:
+        fields = parse_fields(request, ComplaintSerializer.field_names())
+        page = paginate(request, complaints.values(*complaint_rows.columns_for(fields, KEY_COLUMNS)))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Apply filters if provided
-    if status_filter:
-        complaints = complaints.filter(status=status_filter)
+    # Serialize and return the data
+    return page.add_headers(Response(complaint_rows.render(page.rows, fields)), request)
+
+@require_GET
+def admin_export_complaints(request):
+    """
+    Stream complaints for offline analysis as NDJSON (default) or CSV.
+    Accepts the admin list filters plus ``since``, an ISO date or datetime
+    matched against updated_at so repeated exports can pick up only changes.
+    """
+    if not getattr(request, 'is_authenticated', False):
+        return JsonResponse({'error': 'Authentication required'}, status=401)
     
-    if severity_filter:
-        complaints = complaints.filter(severity=severity_filter)
-        
-    if type_filter:
-        complaints = complaints.filter(type=type_filter)
+    if not (request.is_admin or request.is_staff):
+        return JsonResponse({'error': 'Admin access required'}, status=403)
     
-    # Order by most recent first
-    complaints = complaints.order_by('-created_at')
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in export.FORMATS:
+        return JsonResponse({'error': f'format must be one of: {", ".join(export.FORMATS)}'}, status=400)
     
-    # Serialize and return the data
-    serializer = ComplaintSerializer(complaints, many=True)
-    return Response(serializer.data)
+    try:
+        complaints = _filter_admin_complaints(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    since = request.GET.get('since')
+    if since:
+        try:
+            since_value = parse_datetime(since) or parse_date(since)
+        except ValueError:
+            since_value = None
+        if since_value is None:
+            return JsonResponse({'error': 'since must be an ISO date or datetime'}, status=400)
+        if not isinstance(since_value, datetime):
+            since_value = stats.day_start(since_value)
+        elif timezone.is_naive(since_value):
+            since_value = timezone.make_aware(since_value)
+        complaints = complaints.filter(updated_at__gte=since_value)
+    
+    response = StreamingHttpResponse(
+        export.stream(complaints, export_format),
+        content_type=export.FORMATS[export_format]
+    )
+    filename = f"complaints-{timezone.localdate().strftime('%Y%m%d')}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
@@ -332,6 +553,7 @@ def admin_update_complaint_status(request, complaint_id):
         complaint.resolved_by = user.username
     
     complaint.save()
+    events.publish_complaint(complaint)
     
     # Return updated complaint
     serializer = ComplaintSerializer(complaint)
@@ -363,9 +585,7 @@ def admin_staff_list(request):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
     if request.method == 'GET':
-        staff = Staff.objects.all()
-        serializer = StaffSerializer(staff, many=True, context={'request': request})
-        return Response(serializer.data)
+        return _staff_list_response(request)
     
     elif request.method == 'POST':
         print("Admin staff creation - received data:", request.data)
@@ -391,13 +611,12 @@ def admin_staff_detail(request, pk):
     if not (getattr(request, 'is_admin', False) or getattr(request, 'is_staff', False)):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
-    staff = get_object_or_404(Staff, pk=pk)
-    
     if request.method == 'GET':
-        serializer = StaffSerializer(staff, context={'request': request})
-        return Response(serializer.data)
+        return _staff_detail_response(request, pk)
     
-    elif request.method == 'PUT':
+    staff = get_object_or_404(Staff, pk=pk)
+    
+    if request.method == 'PUT':
         serializer = StaffSerializer(staff, data=request.data, context={'request': request})
         if serializer.is_valid():
             updated_staff = serializer.save()
@@ -411,6 +630,7 @@ def admin_staff_detail(request, pk):
 
 # Admin Dashboard Statistics API View
 @api_view(['GET'])
+@cached_response
 def admin_dashboard_stats(request):
     """
     Get dashboard statistics for admin
@@ -423,120 +643,44 @@ def admin_dashboard_stats(request):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        from django.db.models import Count
-        from datetime import timedelta
-        import logging
-        
-        logger = logging.getLogger(__name__)
         logger.info(f"Admin dashboard stats requested by user: {request.firebase_email}")
         
-        # Basic complaint counts
-        total_complaints = Complaint.objects.count()
-        open_complaints = Complaint.objects.filter(status='Open').count()
-        in_progress_complaints = Complaint.objects.filter(status='In Progress').count()
-        closed_complaints = Complaint.objects.filter(status='Closed').count()
-        
-        # Today's statistics
-        today = timezone.now().date()
-        today_complaints = Complaint.objects.filter(created_at__date=today).count()
-        today_resolved = Complaint.objects.filter(
-            status='Closed', 
-            resolved_at__date=today
-        ).count()
+        # Status counts, today's activity, escalations and average resolution time
+        summary = stats.complaint_summary()
+        total_complaints = summary['total']
+        closed_complaints = summary['closed']
         
         # Staff statistics - fetch from Staff model and User model
-        from .models import Staff
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        # Get staff count from Staff model
-        total_staff_from_staff_model = Staff.objects.count()
-        active_staff_from_staff_model = Staff.objects.filter(status='active').count()
-        
-        # Get staff count from User model (users with staff or admin role)
-        total_staff_from_users = User.objects.filter(
-            user_type__in=['admin', 'staff']
-        ).count()
-        active_staff_from_users = User.objects.filter(
-            user_type__in=['admin', 'staff'],
-            is_active=True
-        ).count()
+        from_staff, from_users = stats.staff_summary()
         
         # Use the higher count between both models
-        total_staff = max(total_staff_from_staff_model, total_staff_from_users, 1)  # Ensure at least 1
-        active_staff = max(active_staff_from_staff_model, active_staff_from_users, 1)  # Ensure at least 1
+        total_staff = max(from_staff['total'], from_users['total'], 1)  # Ensure at least 1
+        active_staff = max(from_staff['active'], from_users['active'], 1)  # Ensure at least 1
         
         # Resolution statistics
         resolution_rate = round((closed_complaints / total_complaints * 100), 2) if total_complaints > 0 else 0
+        average_resolution_time = stats.format_hours(summary['average_resolution'])
         
-        # Calculate average resolution time
-        resolved_complaints = Complaint.objects.filter(
-            status='Closed',
-            resolved_at__isnull=False,
-            created_at__isnull=False
-        )
-        
-        if resolved_complaints.exists():
-            total_resolution_time = 0
-            count = 0
-            for complaint in resolved_complaints:
-                if complaint.resolved_at and complaint.created_at:
-                    diff = complaint.resolved_at - complaint.created_at
-                    total_resolution_time += diff.total_seconds()
-                    count += 1
-            
-            if count > 0:
-                avg_seconds = total_resolution_time / count
-                avg_hours = avg_seconds / 3600
-                average_resolution_time = f"{avg_hours:.1f}h"
-            else:
-                average_resolution_time = "0h"
-        else:
-            average_resolution_time = "0h"
-        
-        # Pending escalations (complaints open for more than 48 hours)
-        forty_eight_hours_ago = timezone.now() - timedelta(hours=48)
-        pending_escalations = Complaint.objects.filter(
-            status__in=['Open', 'In Progress'],
-            created_at__lt=forty_eight_hours_ago
-        ).count()
-        
-        # Generate complaint trends data for the last 30 days
-        complaint_trends = []
-        for i in range(30):
-            date = today - timedelta(days=29-i)
-            day_open = Complaint.objects.filter(
-                created_at__date=date,
-                status='Open'
-            ).count()
-            day_progress = Complaint.objects.filter(
-                created_at__date=date,
-                status='In Progress'
-            ).count()
-            day_closed = Complaint.objects.filter(
-                resolved_at__date=date,
-                status='Closed'
-            ).count()
-            
-            complaint_trends.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': day_open,
-                'in_progress': day_progress,
-                'closed': day_closed
-            })
+        # Complaint trends data for the last 30 days
+        complaint_trends = [{
+            'date': day['date'].strftime('%Y-%m-%d'),
+            'open': day['open'],
+            'in_progress': day['in_progress'],
+            'closed': day['closed']
+        } for day in stats.daily_trends(30)]
         
         response_data = {
             'totalComplaints': total_complaints,
-            'openComplaints': open_complaints,
-            'inProgressComplaints': in_progress_complaints,
+            'openComplaints': summary['open'],
+            'inProgressComplaints': summary['in_progress'],
             'closedComplaints': closed_complaints,
-            'todayComplaints': today_complaints,
-            'todayResolved': today_resolved,
+            'todayComplaints': summary['today'],
+            'todayResolved': summary['today_resolved'],
             'totalStaff': total_staff,
             'activeStaff': active_staff,
             'resolutionRate': resolution_rate,
             'averageResolutionTime': average_resolution_time,
-            'pendingEscalations': pending_escalations,
+            'pendingEscalations': summary['pending_escalations'],
             'complaintTrends': complaint_trends
         }
         
@@ -636,26 +780,31 @@ def admin_performance_metrics(request):
     week_ago = today - timedelta(days=7)
     month_ago = today - timedelta(days=30)
     
-    # Daily stats for the last 30 days
-    daily_stats = []
-    for i in range(30):
-        date = today - timedelta(days=i)
-        day_complaints = Complaint.objects.filter(created_at__date=date).count()
-        day_resolved = Complaint.objects.filter(resolved_at__date=date).count()
-        daily_stats.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'new_complaints': day_complaints,
-            'resolved_complaints': day_resolved
-        })
+    # Daily stats for the last 30 days, newest first
+    daily_stats = [{
+        'date': day['date'].strftime('%Y-%m-%d'),
+        'new_complaints': day['total_created'],
+        'resolved_complaints': day['resolved']
+    } for day in reversed(stats.daily_trends(30))]
+    
+    # Complaint counts per assignee, shared by the staff and department tables
+    staff_members = Staff.objects.only('id', 'name', 'department', 'status', 'rating')
+    complaint_counts = stats.complaints_by_staff()
+    no_complaints = {'assigned': 0, 'resolved': 0}
     
     # Staff performance
     staff_performance = []
-    for staff in Staff.objects.filter(status='active'):
-        assigned_complaints = Complaint.objects.filter(staff=staff.name).count()
-        resolved_complaints = Complaint.objects.filter(
-            staff=staff.name, 
-            status='Closed'
-        ).count()
+    dept_totals = {}
+    for staff in staff_members:
+        counts = complaint_counts.get(staff.id, no_complaints)
+        assigned_complaints = counts['assigned']
+        resolved_complaints = counts['resolved']
+        
+        dept_handled, dept_resolved = dept_totals.get(staff.department, (0, 0))
+        dept_totals[staff.department] = (dept_handled + assigned_complaints, dept_resolved + resolved_complaints)
+        
+        if staff.status != 'active':
+            continue
         
         resolution_rate = 0
         if assigned_complaints > 0:
@@ -675,29 +824,18 @@ def admin_performance_metrics(request):
     staff_performance.sort(key=lambda x: x['resolution_rate'], reverse=True)
     
     # Department performance
-    departments = Staff.objects.values_list('department', flat=True).distinct()
     department_stats = []
-    
-    for dept in departments:
-        dept_staff = Staff.objects.filter(department=dept)
-        total_staff = dept_staff.count()
-        active_staff = dept_staff.filter(status='active').count()
-        
-        # Get complaints handled by this department
-        dept_complaints = 0
-        dept_resolved = 0
-        for staff in dept_staff:
-            dept_complaints += Complaint.objects.filter(staff=staff.name).count()
-            dept_resolved += Complaint.objects.filter(staff=staff.name, status='Closed').count()
+    for dept in stats.department_summary():
+        dept_complaints, dept_resolved = dept_totals.get(dept['department'], (0, 0))
         
         dept_resolution_rate = 0
         if dept_complaints > 0:
             dept_resolution_rate = round((dept_resolved / dept_complaints) * 100, 2)
         
         department_stats.append({
-            'department': dept,
-            'total_staff': total_staff,
-            'active_staff': active_staff,
+            'department': dept['department'],
+            'total_staff': dept['total_staff'],
+            'active_staff': dept['active_staff'],
             'complaints_handled': dept_complaints,
             'complaints_resolved': dept_resolved,
             'resolution_rate': dept_resolution_rate
@@ -754,6 +892,7 @@ def admin_settings(request):
         return Response({'message': 'Settings updated successfully'})
 
 @api_view(['GET'])
+@cached_response
 def admin_complaint_trends(request):
     """
     Get complaint trends data for charts
@@ -766,32 +905,17 @@ def admin_complaint_trends(request):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        from datetime import timedelta
-        
         # Get date range from query params (default to 30 days)
         days = int(request.GET.get('days', 30))
-        today = timezone.now().date()
         
         # Generate trends data
-        trends_data = []
-        for i in range(days):
-            date = today - timedelta(days=days-1-i)
-            
-            # Count complaints created on this date by status
-            day_complaints = Complaint.objects.filter(created_at__date=date)
-            day_resolved = Complaint.objects.filter(resolved_at__date=date, status='Closed')
-            
-            open_count = day_complaints.filter(status='Open').count()
-            progress_count = day_complaints.filter(status='In Progress').count()
-            closed_count = day_resolved.count()
-            
-            trends_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': open_count,
-                'in_progress': progress_count,
-                'closed': closed_count,
-                'total_created': day_complaints.count()
-            })
+        trends_data = [{
+            'date': day['date'].strftime('%Y-%m-%d'),
+            'open': day['open'],
+            'in_progress': day['in_progress'],
+            'closed': day['closed'],
+            'total_created': day['total_created']
+        } for day in stats.daily_trends(days)]
         
         # Also get complaint type distribution
         type_distribution = list(
@@ -817,201 +941,6 @@ def admin_complaint_trends(request):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['GET'])
-def smart_classification_stats(request):
-    """
-    Get smart classification system statistics
-    """
-    # Check authentication using custom middleware attributes
-    if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
-        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-    
-    if not (request.is_admin or request.is_staff):
-        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    
-    try:
-        from datetime import timedelta
-        import random
-        
-        today = timezone.now().date()
-        yesterday = today - timedelta(days=1)
-        
-        # Get total complaints processed today
-        total_complaints = Complaint.objects.filter(created_at__date=today).count()
-        
-        # For demo purposes, we'll calculate some stats
-        # In a real implementation, you'd have actual ML classification data
-        
-        # Classification accuracy (simulate based on complaint resolution rates)
-        resolved_complaints = Complaint.objects.filter(status='Closed').count()
-        total_all_complaints = Complaint.objects.count()
-        
-        if total_all_complaints > 0:
-            base_accuracy = (resolved_complaints / total_all_complaints) * 100
-            # Add some variance to make it realistic
-            accuracy = min(95, max(85, base_accuracy + random.uniform(-5, 5)))
-        else:
-            accuracy = 92.5  # Default accuracy
-        
-        # Pending review (complaints that need manual classification)
-        pending_review = Complaint.objects.filter(
-            status='Open',
-            created_at__gte=today - timedelta(days=2)
-        ).count()
-        
-        # Get category distribution
-        category_distribution = list(
-            Complaint.objects.values('type')
-            .annotate(count=Count('id'))
-            .order_by('-count')[:10]
-        )
-        
-        # Simulate confidence trends for the last 7 days
-        confidence_trends = []
-        for i in range(7):
-            date = today - timedelta(days=6-i)
-            # Simulate confidence based on complaint volume and resolution
-            day_complaints = Complaint.objects.filter(created_at__date=date).count()
-            day_resolved = Complaint.objects.filter(resolved_at__date=date).count()
-            
-            if day_complaints > 0:
-                confidence = min(95, max(80, (day_resolved / day_complaints) * 100 + random.uniform(-3, 3)))
-            else:
-                confidence = random.uniform(88, 95)
-            
-            confidence_trends.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'confidence': round(confidence, 1)
-            })
-        
-        return Response({
-            'accuracy': round(accuracy, 1),
-            'processed_today': total_complaints,
-            'pending_review': pending_review,
-            'category_distribution': category_distribution,
-            'confidence_trends': confidence_trends
-        })
-        
-    except Exception as e:
-        logger.error(f"Error in smart_classification_stats: {str(e)}")
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-@api_view(['GET'])
-def smart_classification_complaints(request):
-    """
-    Get complaints with classification data
-    """
-    # Check authentication using custom middleware attributes
-    if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
-        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-    
-    if not (request.is_admin or request.is_staff):
-        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    
-    try:
-        import random
-        
-        # Get query parameters
-        search = request.GET.get('search', '')
-        category_filter = request.GET.get('category', 'all')
-        status_filter = request.GET.get('status', 'all')
-        
-        # Start with all complaints
-        complaints = Complaint.objects.all()
-        
-        # Apply search filter
-        if search:
-            complaints = complaints.filter(
-                Q(description__icontains=search) | 
-                Q(type__icontains=search)
-            )
-        
-        # Apply category filter
-        if category_filter != 'all':
-            complaints = complaints.filter(type=category_filter)
-        
-        # Apply status filter for classification status
-        if status_filter == 'classified':
-            complaints = complaints.filter(status__in=['In Progress', 'Closed'])
-        elif status_filter == 'pending':
-            complaints = complaints.filter(status='Open')
-        
-        # Order by most recent first
-        complaints = complaints.order_by('-created_at')[:100]  # Limit to 100 for performance
-        
-        # Transform complaints to include classification data
-        classified_complaints = []
-        for complaint in complaints:
-            # Simulate confidence score and classification status
-            confidence = random.uniform(0.75, 0.98)
-            
-            # Determine classification status based on complaint status
-            if complaint.status == 'Open':
-                classification_status = 'Pending Review' if confidence < 0.85 else 'Auto-Classified'
-            else:
-                classification_status = 'Classified'
-            
-            classified_complaints.append({
-                'id': str(complaint.id),
-                'text': complaint.description[:200] + ('...' if len(complaint.description) > 200 else ''),
-                'category': complaint.type,
-                'confidence': round(confidence, 3),
-                'timestamp': complaint.created_at.strftime('%Y-%m-%d %H:%M'),
-                'status': classification_status,
-                'severity': complaint.severity,
-                'actual_status': complaint.status
-            })
-        
-        # Get available categories
-        categories = list(
-            Complaint.objects.values_list('type', flat=True)
-            .distinct()
-            .order_by('type')
-        )
-        
-        return Response({
-            'complaints': classified_complaints,
-            'categories': categories,
-            'total_count': len(classified_complaints)
-        })
-        
-    except Exception as e:
-        logger.error(f"Error in smart_classification_complaints: {str(e)}")
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-@api_view(['POST'])
-def update_classification(request, complaint_id):
-    """
-    Update the classification of a complaint
-    """
-    # Check authentication using custom middleware attributes
-    if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
-        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-    
-    if not (request.is_admin or request.is_staff):
-        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
-    
-    try:
-        complaint = get_object_or_404(Complaint, id=complaint_id)
-        
-        new_category = request.data.get('category')
-        if not new_category:
-            return Response({'error': 'Category is required'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update the complaint category/type
-        complaint.type = new_category
-        complaint.save()
-        
-        return Response({
-            'message': 'Classification updated successfully',
-            'complaint_id': complaint.id,
-            'new_category': new_category
-        })
-        
-    except Exception as e:
-        logger.error(f"Error in update_classification: {str(e)}")
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
 @api_view(['GET'])
 def search_user_complaints(request):
     """
@@ -1039,40 +968,27 @@ def search_user_complaints(request):
         if not user_id:
             return Response({'error': 'User ID not found'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Build search filters
         complaints = Complaint.objects.filter(user=user_id)
         
-        # Search across multiple fields
-        search_filters = Q()
-        
-        # Search by PNR number (exact or partial match)
-        if search_query.isdigit() or search_query.isalnum():
-            search_filters |= Q(pnr_number__icontains=search_query)
-        
-        # Search by train number
-        search_filters |= Q(train_number__icontains=search_query)
+        # PNR and train numbers through their indexes, then full-text matches over
+        # type, description, train, PNR and location, best first
+        # (limited to prevent performance issues)
+        ids = lookup.identifier_ids(complaints, search_query, limit=50)
+        ids += [
+            complaint_id for complaint_id in search.search_ids(complaints, search_query, limit=50)
+            if complaint_id not in ids
+        ][:50 - len(ids)]
         
-        # Search by complaint ID (if it's a number)
+        # A number may also be the complaint ID itself, which outranks any other match
         if search_query.isdigit():
-            search_filters |= Q(id=int(search_query))
-        
-        # Search by description
-        search_filters |= Q(description__icontains=search_query)
-        
-        # Search by complaint type
-        search_filters |= Q(type__icontains=search_query)
-        
-        # Apply search filters
-        complaints = complaints.filter(search_filters).order_by('-created_at')
-        
-        # Limit results to prevent performance issues
-        complaints = complaints[:50]
+            complaint_id = int(search_query)
+            if complaint_id in ids or complaints.filter(id=complaint_id).exists():
+                ids = [complaint_id, *(other for other in ids if other != complaint_id)][:50]
         
-        serializer = ComplaintSerializer(complaints, many=True)
-        
-        # Format response data
+        # Format response data straight from the row values, in ranking order
+        rows = {row['id']: row for row in complaint_rows.serialize(complaints.filter(id__in=ids))}
         formatted_complaints = []
-        for complaint_data in serializer.data:
+        for complaint_data in (rows[complaint_id] for complaint_id in ids if complaint_id in rows):
             formatted_complaints.append({
                 'id': f"CMP{complaint_data['id']:03d}",
                 'complaint_id': complaint_data['id'],
@@ -1098,11 +1014,52 @@ def search_user_complaints(request):
         logger.error(f"Error in search_user_complaints: {str(e)}")
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def complaint_suggestions(request):
+    """
+    Typeahead for complaint forms and filters: ``?field=type|train|location``
+    and ``?q=<prefix>``, answered from the in-memory tries of complaints.suggest
+    with the most frequent values first. Passengers only get the categories
+    and the values of their own complaints.
+    """
+    if not getattr(request, 'is_authenticated', False):
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    field = request.GET.get('field', 'type')
+    if field not in suggest.FIELDS:
+        return Response(
+            {'error': f"field must be one of: {', '.join(suggest.FIELDS)}"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = max(1, min(int(request.GET.get('limit', settings.COMPLAINTS_SUGGEST_LIMIT)),
+                           settings.COMPLAINTS_SUGGEST_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    query = request.GET.get('q', '')
+    if request.is_admin or request.is_staff:
+        suggestions = suggest.suggestions.complete(field, query, limit)
+    else:
+        suggestions = suggest.own_tries(_complaint_user_id(request))[field].complete(query, limit)
+    return Response({
+        'field': field,
+        'query': query,
+        'suggestions': [{'value': value, 'count': count} for value, count in suggestions],
+    })
+
 # Smart Classification API Endpoints
+def _unreviewed(complaints):
+    """``complaints`` whose category nobody has set or confirmed by hand."""
+    return complaints.filter(~Exists(ClassificationCorrection.objects.filter(complaint=OuterRef('pk'))))
+
 @api_view(['GET'])
+@cached_response
 def smart_classification_stats(request):
     """
-    Get smart classification statistics for admin dashboard
+    Get smart classification statistics for admin dashboard.
+    Confidence and pending review come from the classifier's predictions
+    (complaints.classifier); accuracy was measured on held-out complaints
+    when the model was trained.
     """
     # Check authentication using custom middleware attributes
     if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
@@ -1117,48 +1074,54 @@ def smart_classification_stats(request):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        from datetime import datetime, timedelta
-        import random
-        
-        # For demo purposes, we'll generate realistic stats
-        # In production, you would calculate these from your ML classification system
-        total_classified = Complaint.objects.count()
-        today_classified = Complaint.objects.filter(created_at__date=timezone.now().date()).count()
-        
-        # Generate category distribution based on actual complaints
-        categories = [
-            'Unreserved / Reserved Ticketing',
-            'Coach - Cleanliness', 
-            'Passenger Amenities',
-            'Staff Behaviour',
-            'Refund of Tickets',
-            'Security',
-            'Medical Assistance',
-            'Catering / Vending Services'
-        ]
+        model = classifier.current_model()
+        today = timezone.localdate()
+        today_classified = Complaint.objects.filter(created_at__date=today).count()
+        
+        # Open complaints nobody has reviewed need a human when the model is unsure or
+        # disagrees with the filed category; without a model they all do. Stored predictions
+        # are aggregated, after predicting the complaints filed or edited since the last look.
+        unreviewed = _unreviewed(Complaint.objects.filter(status__in=stats.OPEN_STATUSES))
+        if model is None:
+            pending_review = unreviewed.count()
+        else:
+            classifier.predict_missing(model, unreviewed)
+            pending_review = (
+                ComplaintPrediction.objects.filter(complaint__in=unreviewed)
+                .annotate(filed_type=Trim(Coalesce('complaint__type', Value(''))))
+                .filter(Q(confidence__lt=settings.COMPLAINTS_CLASSIFIER_REVIEW_THRESHOLD) | ~Q(type=F('filed_type')))
+                .count()
+            )
         
-        category_distribution = []
-        for cat in categories:
-            count = Complaint.objects.filter(type__icontains=cat.split()[0]).count()
-            if count > 0:
-                category_distribution.append({'type': cat, 'count': count})
+        category_distribution = list(
+            Complaint.objects.values('type')
+            .annotate(count=Count('id'))
+            .order_by('-count')[:10]
+        )
         
-        # Generate confidence trends for last 7 days
+        # Mean confidence of the predictions for each of the last 7 days' complaints
         confidence_trends = []
-        for i in range(7):
-            date = timezone.now().date() - timedelta(days=6-i)
-            confidence = round(85 + random.uniform(-5, 10), 1)  # 85-95% range
-            confidence_trends.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'confidence': confidence
-            })
+        if model is not None:
+            recent = Complaint.objects.filter(created_at__date__gte=today - timedelta(days=6))
+            classifier.predict_missing(model, recent)
+            days = (
+                ComplaintPrediction.objects.filter(complaint__in=recent)
+                .annotate(day=TruncDate('complaint__created_at')).values('day')
+                .annotate(confidence=Avg('confidence')).order_by('day')
+            )
+            confidence_trends = [
+                {'date': row['day'].strftime('%Y-%m-%d'), 'confidence': round(100 * row['confidence'], 1)}
+                for row in days
+            ]
         
         return Response({
-            'accuracy': 91.5,
+            'accuracy': round(100 * model.metadata['accuracy'], 1) if model else 0.0,
+            'model_available': model is not None,
             'processed_today': today_classified,
-            'pending_review': max(0, total_classified - today_classified),
+            'pending_review': pending_review,
             'category_distribution': category_distribution,
-            'confidence_trends': confidence_trends
+            'confidence_trends': confidence_trends,
+            'model_version': model.version if model else None
         })
         
     except Exception as e:
@@ -1168,7 +1131,8 @@ def smart_classification_stats(request):
 @api_view(['GET'])
 def smart_classification_complaints(request):
     """
-    Get complaints for smart classification review
+    Get complaints for smart classification review, with the classifier's
+    predicted category and its confidence (0-1)
     """
     # Check authentication using custom middleware attributes
     if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
@@ -1178,41 +1142,55 @@ def smart_classification_complaints(request):
         return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
-        import random
-        
-        # Get recent complaints for classification
-        complaints = Complaint.objects.all().order_by('-created_at')[:20]
+        # Get recent complaints for classification, or the best matches for ?search=
+        search_query = request.GET.get('search', '').strip()
+        if search_query:
+            ids = search.search_ids(Complaint.objects.all(), search_query, limit=20)
+            matched = Complaint.objects.in_bulk(ids)
+            complaints = [matched[complaint_id] for complaint_id in ids if complaint_id in matched]
+        else:
+            complaints = list(Complaint.objects.all().order_by('-created_at')[:20])
         
-        categories = [
-            'Unreserved / Reserved Ticketing',
-            'Coach - Cleanliness', 
-            'Passenger Amenities',
-            'Staff Behaviour',
-            'Refund of Tickets',
-            'Security',
-            'Medical Assistance',
-            'Catering / Vending Services'
-        ]
+        model = classifier.current_model()
+        if model is not None:
+            predictions = model.predict([complaint.description for complaint in complaints])
+        else:
+            # No prediction: the filed category at zero confidence, all left for review
+            predictions = [(complaint.type, 0.0) for complaint in complaints]
+        reviewed = set(
+            ClassificationCorrection.objects.filter(complaint__in=[complaint.id for complaint in complaints])
+            .values_list('complaint_id', flat=True)
+        )
         
         classified_complaints = []
-        for complaint in complaints:
-            # Assign random classification data for demo
-            predicted_category = random.choice(categories)
-            confidence = round(random.uniform(75, 95), 1)
+        for complaint, (category, confidence) in zip(complaints, predictions):
+            if complaint.id in reviewed:
+                classification_status = 'Classified'
+            elif model is None or classifier.needs_review(category, confidence, complaint.type):
+                classification_status = 'Pending Review'
+            else:
+                classification_status = 'Auto-Classified'
             
             classified_complaints.append({
                 'id': str(complaint.id),
                 'text': complaint.description[:200] + '...' if len(complaint.description) > 200 else complaint.description,
-                'category': predicted_category,
-                'confidence': confidence,
+                'category': category,
+                'filed_category': complaint.type,
+                'confidence': round(confidence, 3),
                 'timestamp': complaint.created_at.isoformat(),
-                'status': 'Pending Review' if confidence < 85 else 'Classified',
-                'severity': complaint.priority if hasattr(complaint, 'priority') else 'Medium'
+                'status': classification_status,
+                'severity': complaint.priority if hasattr(complaint, 'priority') else 'Medium',
+                'actual_status': complaint.status
             })
         
+        # The filing form's categories, then any others the model has learnt
+        labels = model.labels if model is not None else []
+        categories = COMPLAINT_CATEGORIES + [label for label in labels if label not in COMPLAINT_CATEGORIES]
+        
         return Response({
             'complaints': classified_complaints,
-            'categories': categories
+            'categories': categories,
+            'model_available': model is not None
         })
         
     except Exception as e:
@@ -1222,7 +1200,8 @@ def smart_classification_complaints(request):
 @api_view(['POST'])
 def update_classification(request, complaint_id):
     """
-    Update complaint classification
+    Update complaint classification. The category is recorded as a confirmed
+    label for the next classifier training.
     """
     # Check authentication using custom middleware attributes
     if not hasattr(request, 'is_authenticated') or not request.is_authenticated:
@@ -1237,8 +1216,14 @@ def update_classification(request, complaint_id):
         
         if new_category:
             # Update complaint type/category
-            complaint.type = new_category
-            complaint.save()
+            with transaction.atomic():
+                ClassificationCorrection.objects.create(
+                    complaint=complaint, previous_type=complaint.type, type=new_category,
+                    corrected_by_id=getattr(request, 'user_id', None)
+                )
+                complaint.type = new_category
+                complaint.save()
+                events.publish_complaint(complaint)
             
             return Response({
                 'success': True,
@@ -1255,6 +1240,7 @@ def update_classification(request, complaint_id):
 
 # Quick Resolution API Endpoints
 @api_view(['GET'])
+@cached_response
 def quick_resolution_stats(request):
     """
     Get quick resolution statistics